@@ -1,10 +1,18 @@
 #!/usr/bin/env python3
 # Copyright 2019-2022, Collabora, Ltd.
 # SPDX-License-Identifier: BSL-1.0
-"""Simple script to update vk_helpers.{c,h}."""
+"""Simple script to update vk_helpers.{c,h}.
 
+Pass the path to the vk.xml of the Khronos registry with --registry to check
+the commands against it.
+"""
+
+import argparse
+import re
+import sys
+import xml.etree.ElementTree as ET
 from pathlib import Path
-from typing import Callable, Iterable, List, Optional
+from typing import Callable, Dict, Iterable, List, Optional, Tuple
 
 
 def get_device_cmds():
@@ -312,6 +320,93 @@ class Cmd:
         return "Function({})".format(", ".join(args))
 
 
+class Registry:
+    """The commands of a vk.xml and what provides them."""
+
+    def __init__(self, path: Path):
+        root = ET.parse(str(path)).getroot()
+
+        self.commands = set()
+        for command in root.findall("commands/command"):
+            # Aliases only have a name attribute.
+            name = command.get("name") or command.findtext("proto/name")
+            self.commands.add(name)
+
+        protect = {
+            platform.get("name"): platform.get("protect")
+            for platform in root.findall("platforms/platform")
+        }
+
+        # Command name to the guard it needs, empty for core commands.
+        self.guards: Dict[str, Tuple[str, ...]] = {}
+        for feature in root.findall("feature"):
+            if "vulkan" not in feature.get("api", "vulkan").split(","):
+                continue
+            for command in feature.findall("require/command"):
+                self.guards.setdefault(command.get("name"), ())
+
+        for ext in root.findall("extensions/extension"):
+            if "vulkan" not in ext.get("supported", "").split(","):
+                continue
+            # The platform headers define the extension names, so the
+            # platform define is enough for those.
+            platform = ext.get("platform")
+            guard = (protect[platform],) if platform else (ext.get("name"),)
+            for command in ext.findall("require/command"):
+                self.guards.setdefault(command.get("name"), guard)
+
+    def guard(self, name: str) -> Optional[Tuple[str, ...]]:
+        """Get the guard a command needs, None if nothing provides it."""
+        return self.guards.get(name)
+
+
+def check_commands(registry: Registry, commands: List[Cmd]) -> bool:
+    """Check the commands against the registry, returns False on errors."""
+    ok = True
+    for cmd in commands:
+        if not cmd:
+            continue
+        if cmd.name not in registry.commands:
+            print("error: {} is not in the registry".format(cmd.name))
+            ok = False
+            continue
+
+        guard = registry.guard(cmd.name)
+        if guard is None:
+            print("error: {} is not provided by anything".format(cmd.name))
+            ok = False
+            continue
+
+        # Some guards are choices, like the fd functions not on Windows.
+        requires = tuple(cmd.requires) if cmd.requires else ()
+        if requires != guard:
+            print(
+                "note: {} has requires={}, the registry says {}".format(
+                    cmd.name, requires, guard
+                )
+            )
+    return ok
+
+
+def find_unused(commands: List[Cmd]) -> List[Cmd]:
+    """Get the commands that no code uses, besides the generated code."""
+    generated = re.compile(
+        r"// beginning of GENERATED .*?// end of GENERATED", re.DOTALL
+    )
+    sources = []
+    for path in (ROOT / "src").rglob("*"):
+        if path.suffix in (".c", ".h", ".cpp", ".hpp") and path.is_file():
+            text = path.read_text(encoding="utf-8", errors="ignore")
+            sources.append(generated.sub("", text))
+    text = "\n".join(sources)
+
+    return [
+        cmd
+        for cmd in commands
+        if cmd and not re.search(r"\b{}\b".format(cmd.member_name), text)
+    ]
+
+
 def wrap_condition(condition):
     if "defined" in condition:
         return condition
@@ -554,7 +649,27 @@ def process_bundle_init_c():
         fp.write("\n")
 
 
-if __name__ == "__main__":
+def main():
+    parser = argparse.ArgumentParser(description="Update vk_helpers.{c,h}.")
+    parser.add_argument(
+        "--registry",
+        type=Path,
+        help="vk.xml of the Khronos registry to check the commands against",
+    )
+    args = parser.parse_args()
+
+    commands = get_instance_cmds() + get_device_cmds()
+
+    if args.registry and not check_commands(Registry(args.registry), commands):
+        sys.exit(1)
+
+    for cmd in find_unused(commands):
+        print("note: {} is loaded but never used".format(cmd.member_name))
+
     process_helpers_h()
     process_bundle_init_c()
     process_function_loaders_c()
+
+
+if __name__ == "__main__":
+    main()
@@ -6,6 +6,13 @@ bindings."""
 
 import argparse
 import json
+import os
+import sys
+
+# The output handling is shared with the IPC protocol generator.
+sys.path.append(os.path.join(os.path.dirname(os.path.abspath(__file__)),
+                             "..", "..", "ipc", "shared"))
+from ipcproto.common import GeneratedFile  # noqa: E402
 
 
 def find_component_in_list_by_name(name, component_list, subaction_path=None, identifier_json_path=None):
@@ -56,6 +63,235 @@ class PathsByLengthCollector:
             ret[length] = list(set_per_length)
         return ret
 
+def paths_from_dict_of_lists(dict_of_lists):
+    """Flatten a dict of paths by length into a sorted list of paths."""
+    return sorted(path for paths in dict_of_lists.values() for path in paths)
+
+PATH_HASH_OFFSET = 0xcbf29ce484222325
+PATH_HASH_PRIME = 0x100000001b3
+
+def path_hash(path):
+    """64 bit FNV-1a hash of a path, must match hash_path in the C code."""
+    h = PATH_HASH_OFFSET
+    for c in path.encode():
+        h ^= c
+        h = (h * PATH_HASH_PRIME) & 0xffffffffffffffff
+    return h
+
+def path_hash_index(h, displacement, slot_count):
+    """Turn a path hash and a displacement into a slot index, must match
+    lookup_path in the C code."""
+    lo = h & 0xffffffff
+    hi = h >> 32
+    return ((hi + displacement * (lo | 1)) & 0xffffffff) % slot_count
+
+class PerfectHash:
+    """Minimal perfect hash over a set of paths, built with the hash and
+    displace method. The low bits of a path's hash select a bucket, the
+    bucket's displacement then moves every path in it to a slot of its own.
+    """
+
+    MAX_DISPLACEMENT = 0x3ff
+
+    def __init__(self, paths):
+        self.slots = []
+        self.displacements = []
+
+        paths = sorted(set(paths))
+        if not paths:
+            return
+
+        hashes = {path: path_hash(path) for path in paths}
+        if len(set(hashes.values())) != len(paths):
+            raise RuntimeError("Path hash collision in " + str(paths))
+
+        bucket_count = (len(paths) + 1) // 2
+        while not self._build(paths, hashes, bucket_count):
+            bucket_count += 1
+
+    def _build(self, paths, hashes, bucket_count):
+        slot_count = len(paths)
+        buckets = [[] for _ in range(bucket_count)]
+        for path in paths:
+            buckets[(hashes[path] & 0xffffffff) % bucket_count].append(path)
+
+        slots = [None] * slot_count
+        displacements = [0] * bucket_count
+
+        # Place the biggest buckets first, while there are free slots.
+        order = sorted(range(bucket_count), key=lambda b: (-len(buckets[b]), b))
+        for b in order:
+            if not buckets[b]:
+                continue
+
+            for displacement in range(self.MAX_DISPLACEMENT + 1):
+                indices = {path_hash_index(hashes[path], displacement, slot_count)
+                           for path in buckets[b]}
+                if len(indices) != len(buckets[b]):
+                    continue
+                if any(slots[i] is not None for i in indices):
+                    continue
+
+                for path in buckets[b]:
+                    slots[path_hash_index(hashes[path], displacement, slot_count)] = path
+                displacements[b] = displacement
+                break
+            else:
+                return False
+
+        self.slots = slots
+        self.displacements = displacements
+        return True
+
+    def contains(self, path):
+        """Look up a path the same way the generated code does."""
+        if not self.slots:
+            return False
+        h = path_hash(path)
+        displacement = self.displacements[(h & 0xffffffff) % len(self.displacements)]
+        return self.slots[path_hash_index(h, displacement, len(self.slots))] == path
+
+VERIFY_PATH_KINDS = ("subpath", "dpad_path", "dpad_emulator")
+
+def profile_paths(profile, kind):
+    """Sorted list of paths of the given verify kind for a profile."""
+    return paths_from_dict_of_lists(getattr(profile, kind + "s_by_length"))
+
+class PathTrie:
+    """Trie over the slash separated segments of every path of every profile.
+    Each node records, per verify kind, a bitmask of the profiles that accept
+    the path ending at that node, so one walk of a path answers for all
+    profiles at once. Children of a node are stored next to each other so
+    the whole trie can be emitted as flat arrays.
+    """
+
+    def __init__(self, profiles):
+        if len(profiles) > 64:
+            raise RuntimeError("Too many profiles for a 64 bit profile mask")
+
+        # Node: [segment, children dict, masks list indexed by kind]
+        root = ["", {}, [0] * len(VERIFY_PATH_KINDS)]
+        for index, profile in enumerate(profiles):
+            for kind_index, kind in enumerate(VERIFY_PATH_KINDS):
+                for path in profile_paths(profile, kind):
+                    node = root
+                    for segment in path.split("/")[1:]:
+                        node = node[1].setdefault(segment, [segment, {}, [0] * len(VERIFY_PATH_KINDS)])
+                    node[2][kind_index] |= 1 << index
+
+        # Flatten breadth first so that siblings are contiguous.
+        self.nodes = []
+        queue = [root]
+        while queue:
+            self.nodes.extend(queue)
+            queue = [child for node in queue for _, child in sorted(node[1].items())]
+        index_of = {id(node): i for i, node in enumerate(self.nodes)}
+
+        self.segments = ""
+        segment_offsets = {}
+        self.masks = [tuple([0] * len(VERIFY_PATH_KINDS))]
+        self.flat = []
+        for node in self.nodes:
+            segment = node[0]
+            if segment not in segment_offsets:
+                segment_offsets[segment] = len(self.segments)
+                self.segments += segment
+            children = [child for _, child in sorted(node[1].items())]
+            first_child = index_of[id(children[0])] if children else 0
+            masks = tuple(node[2])
+            if masks not in self.masks:
+                self.masks.append(masks)
+            accept = self.masks.index(masks)
+            self.flat.append((first_child, len(children), segment_offsets[segment], len(segment), accept))
+
+    def match(self, path):
+        """Walk the flattened trie the same way the generated code does."""
+        if not path.startswith("/"):
+            return self.masks[0]
+        node = 0
+        for segment in path.split("/")[1:]:
+            first_child, child_count, _, _, _ = self.flat[node]
+            for i in range(first_child, first_child + child_count):
+                _, _, offset, length, _ = self.flat[i]
+                if self.segments[offset:offset + length] == segment:
+                    node = i
+                    break
+            else:
+                return self.masks[0]
+        return self.masks[self.flat[node][4]]
+
+PATHS_PER_BINDING_TEMPLATE = 16
+
+class StringPool:
+    """Deduplicated blob of nul terminated strings addressed by offset.
+    A string that is the tail of another string shares its storage, so
+    "/input/x/click" costs nothing next to "/user/hand/left/input/x/click".
+    """
+
+    def __init__(self, strings):
+        # Sorting on the reversed strings puts every string directly after
+        # a string it is the tail of, if there is any such string.
+        ordered = sorted(set(strings), key=lambda s: s[::-1], reverse=True)
+
+        self.strings = []
+        self.offsets = {}
+        self.size = 0
+        prev = None
+        for s in ordered:
+            if prev is not None and prev.endswith(s):
+                self.offsets[s] = self.offsets[prev] + len(prev) - len(s)
+            else:
+                self.offsets[s] = self.size
+                self.strings.append(s)
+                self.size += len(s) + 1
+            prev = s
+
+        if self.size > 0xffff:
+            raise RuntimeError("String pool too large for 16 bit offsets")
+
+    def offset(self, s):
+        """Offset of the string in the blob."""
+        return self.offsets[s]
+
+def binding_steamvr_path(component):
+    """SteamVR path of a component, with the component name appended."""
+    steamvr_path = component.steamvr_path # @todo Doesn't handle pose yet.
+    if component.component_name in ["click", "touch", "force", "value"]:
+        steamvr_path += "/" + component.component_name
+    return steamvr_path
+
+def binding_template_strings(p):
+    """Every string referenced by the binding and dpad templates."""
+    strings = []
+    for profile in p.profiles:
+        for component in profile.components:
+            strings.append(component.subaction_path)
+            strings.append(binding_steamvr_path(component))
+            strings.append(component.subpath_localized_name)
+        for identifier in profile.identifiers:
+            if identifier.dpad:
+                strings.append(identifier.subaction_path)
+    return strings
+
+def binding_template_path_list(p):
+    """Sorted unique OpenXR paths, subaction paths included, that the
+    binding and dpad templates refer to by index."""
+    paths = set()
+    for profile in p.profiles:
+        for component in profile.components:
+            paths.add(component.subaction_path)
+            paths.update(component.get_full_openxr_paths())
+        for identifier in profile.identifiers:
+            if identifier.dpad:
+                paths.add(identifier.subaction_path)
+                paths.update(identifier.dpad.paths)
+    return sorted(paths)
+
+def near_miss_paths(path):
+    """Strings that almost match the given path, for the self-check table."""
+    last = chr(ord(path[-1]) + 1) if path[-1] != "z" else "a"
+    return [path[:-1], path[:-1] + last, path + "/"]
+
 def dpad_paths(identifier_path, center):
     paths = [
         identifier_path + "/dpad_up",
@@ -337,50 +573,334 @@ header = '''// Copyright 2020-2022, Collabora, Ltd.
  */
 '''
 
+hash_funcs = '''
+static inline uint64_t
+hash_path(const char *str, size_t length)
+{{
+\tuint64_t h = 0x{offset:x}ULL;
+\tfor (size_t i = 0; i < length; i++) {{
+\t\th ^= (uint8_t)str[i];
+\t\th *= 0x{prime:x}ULL;
+\t}}
+\treturn h;
+}}
+
+static inline uint32_t
+hash_path_index(const char *str, size_t length, const uint16_t *displacements, uint32_t bucket_count, uint32_t slot_count)
+{{
+\tuint64_t h = hash_path(str, length);
+\tuint32_t lo = (uint32_t)h;
+\tuint32_t hi = (uint32_t)(h >> 32);
+\tuint32_t displacement = displacements[lo % bucket_count];
+
+\treturn (hi + displacement * (lo | 1)) % slot_count;
+}}
+'''
+
+lookup_func = '''
+static inline bool
+lookup_path(const char *str,
+            size_t length,
+            const uint16_t *displacements,
+            uint32_t bucket_count,
+            const char *const *paths,
+            const uint16_t *lengths,
+            uint32_t path_count)
+{
+\tuint32_t index = hash_path_index(str, length, displacements, bucket_count, path_count);
+
+\treturn lengths[index] == length && memcmp(paths[index], str, length) == 0;
+}
+'''
+
 func_start = '''
 bool
 {name}(const char *str, size_t length)
 {{
-\tswitch (length) {{
 '''
 
-if_strcmp = '''if (strcmp(str, "{check}") == 0) {{
-\t\t\treturn true;
-\t\t}} else '''
 
-
-def write_verify_func(f, name, dict_of_lists):
+def write_verify_func(f, name, paths):
     """Generate function to check if a string is in a set of strings.
-    Input is a file to write the code into, a dict where keys are length and
-    the values are lists of strings of that length. And a suffix if any."""
+    Input is a file to write the code into and the sorted list of strings.
+    The strings are placed in a minimal perfect hash so a lookup is one hash
+    and one memcmp."""
+
+    table = PerfectHash(paths)
 
     f.write(func_start.format(name=name))
-    for length in dict_of_lists:
-        f.write("\tcase " + str(length) + ":\n\t\t")
-        for path in dict_of_lists[length]:
-            f.write(if_strcmp.format(check=path))
-        f.write("{\n\t\t\treturn false;\n\t\t}\n")
-    f.write("\tdefault:\n\t\treturn false;\n\t}\n}\n")
+    if not table.slots:
+        f.write("\t(void)str;\n\t(void)length;\n\treturn false;\n}\n")
+        return
+
+    bucket_count = len(table.displacements)
+    path_count = len(table.slots)
+    f.write(f"\tstatic const uint16_t displacements[{bucket_count}] = {{")
+    f.write(", ".join(str(d) for d in table.displacements))
+    f.write("};\n")
+    f.write(f"\tstatic const char *const paths[{path_count}] = {{\n")
+    for path in table.slots:
+        f.write(f'\t\t"{path}",\n')
+    f.write("\t};\n")
+    f.write(f"\tstatic const uint16_t lengths[{path_count}] = {{")
+    f.write(", ".join(str(len(path)) for path in table.slots))
+    f.write("};\n\n")
+    f.write(f"\treturn lookup_path(str, length, displacements, {bucket_count}, "
+            f"paths, lengths, {path_count});\n}}\n")
+
+
+def verify_funcs(p):
+    """List the generated verify functions as (name, profile index, kind,
+    paths) tuples."""
+    funcs = []
+    for index, profile in enumerate(p.profiles):
+        for kind in VERIFY_PATH_KINDS:
+            name = "oxr_verify_" + profile.validation_func_name + "_" + kind
+            funcs.append((name, index, kind, profile_paths(profile, kind)))
+    return funcs
+
+
+def verify_checks(p):
+    """List (function name, profile index, kind, string, expected result)
+    tuples that exercise every verify function with all of its paths and
+    their near misses."""
+    checks = []
+    for name, index, kind, paths in verify_funcs(p):
+        for path in paths:
+            checks.append((name, index, kind, path, True))
+        for path in paths:
+            for miss in near_miss_paths(path):
+                if miss not in paths:
+                    checks.append((name, index, kind, miss, False))
+    return checks
+
+
+trie_func = '''
+struct path_profile_masks
+oxr_verify_path_profiles(const char *str, size_t length)
+{{
+\tif (length == 0 || str[0] != '/') {{
+\t\treturn path_trie_masks[0];
+\t}}
+
+\tuint32_t node = 0;
+\tsize_t start = 1;
+\twhile (true) {{
+\t\tsize_t end = start;
+\t\twhile (end < length && str[end] != '/') {{
+\t\t\tend++;
+\t\t}}
+
+\t\tconst struct path_trie_node *n = &path_trie_nodes[node];
+\t\tuint32_t next = 0;
+\t\tfor (uint32_t i = n->first_child; i < (uint32_t)n->first_child + n->child_count; i++) {{
+\t\t\tconst struct path_trie_node *c = &path_trie_nodes[i];
+\t\t\tif (c->segment_length == end - start &&
+\t\t\t    memcmp(&path_trie_segments[c->segment_offset], &str[start], end - start) == 0) {{
+\t\t\t\tnext = i;
+\t\t\t\tbreak;
+\t\t\t}}
+\t\t}}
+
+\t\t// Node zero is the root, it is never a child.
+\t\tif (next == 0) {{
+\t\t\treturn path_trie_masks[0];
+\t\t}}
+
+\t\tnode = next;
+\t\tif (end == length) {{
+\t\t\tbreak;
+\t\t}}
+\t\tstart = end + 1;
+\t}}
+
+\treturn path_trie_masks[path_trie_nodes[node].accept];
+}}
+'''
+
+
+def write_path_trie(f, p):
+    """Generate the path trie tables and the function that walks them."""
+    trie = PathTrie(p.profiles)
+
+    f.write('''
+struct path_trie_node
+{
+\tuint16_t first_child;
+\tuint16_t child_count;
+\tuint16_t segment_offset;
+\tuint8_t segment_length;
+\tuint16_t accept;
+};
+''')
+    f.write(f"\nstatic const char path_trie_segments[{len(trie.segments) + 1}] =")
+    for i in range(0, len(trie.segments), 96):
+        f.write(f'\n\t"{trie.segments[i:i + 96]}"')
+    f.write(";\n")
+
+    f.write(f"\nstatic const struct path_trie_node path_trie_nodes[{len(trie.flat)}] = {{\n")
+    for first_child, child_count, offset, length, accept in trie.flat:
+        f.write(f"\t{{{first_child}, {child_count}, {offset}, {length}, {accept}}},\n")
+    f.write("};\n")
+
+    f.write(f"\nstatic const struct path_profile_masks path_trie_masks[{len(trie.masks)}] = {{\n")
+    for masks in trie.masks:
+        f.write("\t{" + ", ".join(f"0x{m:x}" for m in masks) + "},\n")
+    f.write("};\n")
+
+    f.write(trie_func.format())
+
+
+def write_profile_template_find(f, p):
+    """Generate a hashed lookup from profile path to profile template."""
+    table = PerfectHash(profile.name for profile in p.profiles)
+    index_of = {profile.name: idx for idx, profile in enumerate(p.profiles)}
+
+    bucket_count = len(table.displacements)
+    slot_count = len(table.slots)
+    f.write(f"static const uint16_t profile_template_displacements[{bucket_count}] = {{")
+    f.write(", ".join(str(d) for d in table.displacements))
+    f.write("};\n")
+    f.write(f"static const uint8_t profile_template_slots[{slot_count}] = {{")
+    f.write(", ".join(str(index_of[path]) for path in table.slots))
+    f.write("};\n")
+    f.write(f'''
+struct profile_template *
+profile_template_find_by_path(const char *str, size_t length)
+{{
+\tuint32_t slot = hash_path_index(str, length, profile_template_displacements, {bucket_count}, {slot_count});
+\tstruct profile_template *templ = &profile_templates[profile_template_slots[slot]];
+
+\tif (templ->path_length != length || memcmp(templ->path, str, length) != 0) {{
+\t\treturn NULL;
+\t}}
+
+\treturn templ;
+}}
+
+''')
+
+
+name_lookup = '''
+#define {upper}_NAME_COUNT {count}
+
+static const char *const {kind}_names[{upper}_NAME_COUNT] = {{
+{names}}};
+
+static const enum xrt_{kind}_name {kind}_name_values[{upper}_NAME_COUNT] = {{
+{values}}};
+
+const char *
+xrt_{kind}_name_string(enum xrt_{kind}_name {kind})
+{{
+\tswitch ({kind}) {{
+{cases}\tdefault: return "UNKNOWN";
+\t}}
+}}
+
+enum xrt_{kind}_name
+xrt_{kind}_name_enum(const char *{kind})
+{{
+\tsize_t low = 0;
+\tsize_t high = {upper}_NAME_COUNT;
+\twhile (low < high) {{
+\t\tsize_t mid = low + (high - low) / 2;
+\t\tint cmp = strcmp({kind}, {kind}_names[mid]);
+\t\tif (cmp == 0) {{
+\t\t\treturn {kind}_name_values[mid];
+\t\t}}
+\t\tif (cmp < 0) {{
+\t\t\thigh = mid;
+\t\t}} else {{
+\t\t\tlow = mid + 1;
+\t\t}}
+\t}}
+
+\treturn {default};
+}}
+'''
 
 
-def generate_bindings_c(file, p):
+def write_string_pool(f, pool):
+    """Write the pooled binding template strings as one char array."""
+    f.write(f'\n\nconst char binding_strings[{pool.size}] =\n')
+    for i, s in enumerate(pool.strings):
+        # The last string gets its nul from the literal itself.
+        nul = '\\0' if i + 1 < len(pool.strings) else ''
+        f.write(f'\t/* {pool.offset(s)} */ "{s}{nul}"\n')
+    f.write(';\n')
+
+
+def write_path_table(f, paths):
+    """Write the template paths as one array of length prefixed strings."""
+    f.write('\n\nconst char binding_template_path_table[] =\n')
+    for index, path in enumerate(paths):
+        if len(path) > 0xff:
+            raise RuntimeError("Path too long for a one byte length: " + path)
+        f.write(f'\t/* {index} */ "\\{len(path):03o}" "{path}"\n')
+    f.write(';\n')
+
+
+def write_name_lookup(f, kind, names, default):
+    """Generate the string and enum conversion functions for the input or
+    output names. The names are sorted, so the output is reproducible and
+    the enum lookup is a binary search over one shared string table."""
+    f.write(name_lookup.format(
+        kind=kind,
+        upper=kind.upper(),
+        count=len(names),
+        default=default,
+        names="".join(f'\t"{name}",\n' for name in names),
+        values="".join(f"\t{name},\n" for name in names),
+        cases="".join(f"\tcase {name}: return {kind}_names[{idx}];\n" for idx, name in enumerate(names))))
+
+
+def generate_bindings_c(file, p, pooled=False):
     """Generate the file to verify subpaths on a interaction profile."""
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated bindings data', group='oxr_main'))
     f.write('''
 #include "b_generated_bindings.h"
+#include <stdint.h>
 #include <string.h>
 
 // clang-format off
 ''')
+    f.write(hash_funcs.format(offset=PATH_HASH_OFFSET, prime=PATH_HASH_PRIME))
 
-    for profile in p.profiles:
-        name = "oxr_verify_" + profile.validation_func_name + "_subpath"
-        write_verify_func(f, name, profile.subpaths_by_length)
-        name = "oxr_verify_" + profile.validation_func_name + "_dpad_path"
-        write_verify_func(f, name, profile.dpad_paths_by_length)
-        name = "oxr_verify_" + profile.validation_func_name + "_dpad_emulator"
-        write_verify_func(f, name, profile.dpad_emulators_by_length)
+    write_path_trie(f, p)
+
+    template_paths = binding_template_path_list(p)
+    if len(template_paths) > 0xffff:
+        raise RuntimeError("Too many template paths for 16 bit indices")
+    path_index = {path: index for index, path in enumerate(template_paths)}
+    write_path_table(f, template_paths)
+
+    if pooled:
+        pool = StringPool(binding_template_strings(p))
+        write_string_pool(f, pool)
+    path_indices = []
+
+    def write_string(indent, field, s):
+        if pooled:
+            f.write(f'{indent}.{field} = {pool.offset(s)}, // "{s}"\n')
+        else:
+            f.write(f'{indent}.{field} = "{s}",\n')
+
+    def write_subaction_path(indent, subaction_path):
+        write_string(indent, 'subaction_path', subaction_path)
+        f.write(f'{indent}.subaction_path_index = {path_index[subaction_path]},\n')
+
+    def write_paths(indent, paths):
+        if len(paths) > PATHS_PER_BINDING_TEMPLATE:
+            raise RuntimeError("Too many paths for a binding template")
+        indices = [str(path_index[path]) for path in paths]
+        if pooled:
+            f.write(f'{indent}.first_path = {len(path_indices)},\n')
+            path_indices.extend(indices)
+        else:
+            f.write(f'{indent}.path_indices = {{{", ".join(indices)}}}, // {", ".join(paths)}\n')
+        f.write(f'{indent}.path_count = {len(paths)},\n')
 
     f.write(
         f'\n\nstruct profile_template profile_templates[{len(p.profiles)}] = {{ // array of profile_template\n')
@@ -394,6 +914,7 @@ def generate_bindings_c(file, p):
         f.write(f'\t{{ // profile_template\n')
         f.write(f'\t\t.name = {profile.monado_device_enum},\n')
         f.write(f'\t\t.path = "{profile.name}",\n')
+        f.write(f'\t\t.path_length = {len(profile.name)},\n')
         f.write(f'\t\t.localized_name = "{profile.localized_name}",\n')
         f.write(f'\t\t.steamvr_input_profile_path = "{fname}",\n')
         f.write(f'\t\t.steamvr_controller_type = "{controller_type}",\n')
@@ -404,21 +925,11 @@ def generate_bindings_c(file, p):
         component: Component
         for idx, component in enumerate(profile.components):
 
-            steamvr_path = component.steamvr_path # @todo Doesn't handle pose yet.
-            if component.component_name in ["click", "touch", "force", "value"]:
-                steamvr_path += "/" + component.component_name
-
             f.write(f'\t\t\t{{ // binding_template {idx}\n')
-            f.write(f'\t\t\t\t.subaction_path = "{component.subaction_path}",\n')
-            f.write(f'\t\t\t\t.steamvr_path = "{steamvr_path}",\n')
-            f.write(
-                f'\t\t\t\t.localized_name = "{component.subpath_localized_name}",\n')
-
-            f.write('\t\t\t\t.paths = { // array of paths\n')
-            for path in component.get_full_openxr_paths():
-                f.write(f'\t\t\t\t\t"{path}",\n')
-            f.write('\t\t\t\t\tNULL\n')
-            f.write('\t\t\t\t}, // /array of paths\n')
+            write_subaction_path('\t\t\t\t', component.subaction_path)
+            write_string('\t\t\t\t', 'steamvr_path', binding_steamvr_path(component))
+            write_string('\t\t\t\t', 'localized_name', component.subpath_localized_name)
+            write_paths('\t\t\t\t', component.get_full_openxr_paths())
 
             # print("component", component.__dict__)
 
@@ -469,11 +980,8 @@ def generate_bindings_c(file, p):
                 f'\t\t.dpads = (struct dpad_emulation[]){{ // array of dpad_emulation\n')
             for idx, identifier in enumerate(dpads):
                 f.write('\t\t\t{\n')
-                f.write(f'\t\t\t\t.subaction_path = "{identifier.subaction_path}",\n')
-                f.write('\t\t\t\t.paths = {\n')
-                for path in identifier.dpad.paths:
-                    f.write(f'\t\t\t\t\t"{path}",\n')
-                f.write('\t\t\t\t},\n')
+                write_subaction_path('\t\t\t\t', identifier.subaction_path)
+                write_paths('\t\t\t\t', identifier.dpad.paths)
                 f.write(f'\t\t\t\t.position = {identifier.dpad.position_component.monado_binding},\n')
                 if identifier.dpad.activate_component:
                     f.write(f'\t\t\t\t.activate = {identifier.dpad.activate_component.monado_binding},\n')
@@ -487,6 +995,16 @@ def generate_bindings_c(file, p):
 
     f.write('}; // /array of profile_template\n\n')
 
+    if pooled:
+        if len(path_indices) > 0xffff:
+            raise RuntimeError("Too many binding paths for 16 bit indices")
+        f.write(f'const uint16_t binding_path_indices[{len(path_indices)}] = {{\n')
+        for i in range(0, len(path_indices), 12):
+            f.write('\t' + ' '.join(f'{o},' for o in path_indices[i:i + 12]) + '\n')
+        f.write('};\n\n')
+
+    write_profile_template_find(f, p)
+
     inputs = set()
     outputs = set()
     for profile in p.profiles:
@@ -508,107 +1026,248 @@ def generate_bindings_c(file, p):
     inputs.add("XRT_INPUT_GENERIC_HAND_TRACKING_RIGHT")
     inputs.add("XRT_INPUT_GENERIC_TRACKER_POSE")
 
-    f.write('const char *\n')
-    f.write('xrt_input_name_string(enum xrt_input_name input)\n')
-    f.write('{\n')
-    f.write('\tswitch(input)\n')
-    f.write('\t{\n')
-    for input in inputs:
-        f.write(f'\tcase {input}: return "{input}";\n')
-    f.write(f'\tdefault: return "UNKNOWN";\n')
-    f.write('\t}\n')
-    f.write('}\n')
+    write_name_lookup(f, "input", sorted(inputs), "XRT_INPUT_GENERIC_TRACKER_POSE")
+    write_name_lookup(f, "output", sorted(outputs), "XRT_OUTPUT_NAME_SIMPLE_VIBRATION")
 
-    f.write('enum xrt_input_name\n')
-    f.write('xrt_input_name_enum(const char *input)\n')
-    f.write('{\n')
-    for input in inputs:
-        f.write(f'\tif(strcmp("{input}", input) == 0) return {input};\n')
-    f.write(f'\treturn XRT_INPUT_GENERIC_TRACKER_POSE;\n')
-    f.write('}\n')
+    f.write("\n// clang-format on\n")
 
-    f.write('const char *\n')
-    f.write('xrt_output_name_string(enum xrt_output_name output)\n')
-    f.write('{\n')
-    f.write('\tswitch(output)\n')
-    f.write('\t{\n')
-    for output in outputs:
-        f.write(f'\tcase {output}: return "{output}";\n')
-    f.write(f'\tdefault: return "UNKNOWN";\n')
-    f.write('\t}\n')
-    f.write('}\n')
+    f.close()
 
-    f.write('enum xrt_output_name\n')
-    f.write('xrt_output_name_enum(const char *output)\n')
-    f.write('{\n')
-    for output in outputs:
-        f.write(f'\tif(strcmp("{output}", output) == 0) return {output};\n')
-    f.write(f'\treturn XRT_OUTPUT_NAME_SIMPLE_VIBRATION;\n')
-    f.write('}\n')
 
-    f.write("\n// clang-format on\n")
+def generate_bindings_checks_c(file, p):
+    """Generate the per profile path verify functions and the self-check
+    table for them and the path trie, only used by the tests."""
+    checks = verify_checks(p)
+
+    # Catch any disagreement between the tables and the checks at build time.
+    tables = {name: PerfectHash(paths) for name, _, _, paths in verify_funcs(p)}
+    trie = PathTrie(p.profiles)
+    for name, index, kind, path, accept in checks:
+        if tables[name].contains(path) != accept:
+            raise RuntimeError("Self-check failed for " + name + " \"" + path + "\"")
+        mask = trie.match(path)[VERIFY_PATH_KINDS.index(kind)]
+        if bool(mask & (1 << index)) != accept:
+            raise RuntimeError("Trie self-check failed for " + name + " \"" + path + "\"")
+
+    f = GeneratedFile(file)
+    f.write(header.format(brief='Generated bindings self-check data', group='oxr_main'))
+    f.write('''
+#include "b_generated_bindings_checks.h"
+#include <stdint.h>
+#include <string.h>
+
+// clang-format off
+''')
+    f.write(hash_funcs.format(offset=PATH_HASH_OFFSET, prime=PATH_HASH_PRIME))
+    f.write(lookup_func)
+
+    for name, _, _, paths in verify_funcs(p):
+        write_verify_func(f, name, paths)
+
+    f.write('''
+const struct verify_path_check verify_path_checks[NUM_VERIFY_PATH_CHECKS] = {
+''')
+    for name, index, kind, path, accept in checks:
+        f.write(f'\t{{{name}, {index}, VERIFY_PATH_KIND_{kind.upper()}, "{path}", {"true" if accept else "false"}}},\n')
+    f.write("};\n\n// clang-format on\n")
 
     f.close()
 
 
-def generate_bindings_h(file, p):
-    """Generate header for the verify subpaths functions."""
-    f = open(file, "w")
-    f.write(header.format(brief='Generated bindings data header',
-                          group='oxr_api'))
+def generate_bindings_checks_h(file, p):
+    """Generate the header for the per profile verify functions and the
+    self-check table, only used by the tests."""
+    f = GeneratedFile(file)
+    f.write(header.format(brief='Generated bindings self-check header', group='oxr_main'))
     f.write('''
 #pragma once
 
-#include <stddef.h>
-
-#include "xrt/xrt_defines.h"
+#include "b_generated_bindings.h"
 
 // clang-format off
 ''')
 
-    for profile in p.profiles:
-        f.write("\nbool\noxr_verify_" + profile.validation_func_name +
-                "_subpath(const char *str, size_t length);\n")
-        f.write("\nbool\noxr_verify_" + profile.validation_func_name +
-                "_dpad_path(const char *str, size_t length);\n")
-        f.write("\nbool\noxr_verify_" + profile.validation_func_name +
-                "_dpad_emulator(const char *str, size_t length);\n")
+    for name, _, _, _ in verify_funcs(p):
+        f.write("\nbool\n" + name + "(const char *str, size_t length);\n")
 
     f.write(f'''
-#define PATHS_PER_BINDING_TEMPLATE 16
 
-enum oxr_dpad_binding_point
+enum verify_path_kind
 {{
-\tOXR_DPAD_BINDING_POINT_NONE,
-\tOXR_DPAD_BINDING_POINT_UP,
-\tOXR_DPAD_BINDING_POINT_DOWN,
-\tOXR_DPAD_BINDING_POINT_LEFT,
-\tOXR_DPAD_BINDING_POINT_RIGHT,
+\tVERIFY_PATH_KIND_SUBPATH,
+\tVERIFY_PATH_KIND_DPAD_PATH,
+\tVERIFY_PATH_KIND_DPAD_EMULATOR,
+}};
+
+struct verify_path_check
+{{
+\tbool (*verify)(const char *str, size_t length);
+\tsize_t profile_index;
+\tenum verify_path_kind kind;
+\tconst char *str;
+\tbool accept;
 }};
 
+#define NUM_VERIFY_PATH_CHECKS {len(verify_checks(p))}
+extern const struct verify_path_check verify_path_checks[NUM_VERIFY_PATH_CHECKS];
+
+// clang-format on
+''')
+
+    f.close()
+
+
+def binding_structs_h(p, pooled):
+    """Template structs and their accessors, in either string layout."""
+    ret = f'''
+#define NUM_BINDING_TEMPLATE_PATHS {len(binding_template_path_list(p))}
+
+/*!
+ * Every path used by the binding and dpad templates, each string prefixed by
+ * its length in one byte and not nul terminated. The templates refer to the
+ * paths by their index in this table, so all of them can be turned into
+ * XrPaths once up front.
+ */
+extern const char binding_template_path_table[];
+'''
+
+    if pooled:
+        string_type = "uint16_t"
+        string_ref = "binding_strings + {}"
+        paths_field = "\tuint16_t first_path;\n\tuint8_t path_count;"
+        path_index_ref = "binding_path_indices[{}->first_path + index]"
+        ret += '''
+/*!
+ * All strings of the binding and dpad templates, nul terminated and
+ * addressed by offset, a string may be the tail of another.
+ */
+extern const char binding_strings[];
+
+//! Indices into @ref binding_template_path_table of the paths of all templates.
+extern const uint16_t binding_path_indices[];
+'''
+    else:
+        string_type = "const char *"
+        string_ref = "{}"
+        paths_field = ("\tuint16_t path_indices[PATHS_PER_BINDING_TEMPLATE];\n"
+                       "\tsize_t path_count;")
+        path_index_ref = "{}->path_indices[index]"
+
+    if not string_type.endswith("*"):
+        string_type += " "
+
+    ret += f'''
 struct dpad_emulation
 {{
-\tconst char *subaction_path;
-\tconst char *paths[PATHS_PER_BINDING_TEMPLATE];
+\t{string_type}subaction_path;
+\tuint16_t subaction_path_index;
+{paths_field}
 \tenum xrt_input_name position;
 \tenum xrt_input_name activate; // Can be zero
 }};
 
 struct binding_template
 {{
-\tconst char *subaction_path;
-\tconst char *steamvr_path;
-\tconst char *localized_name;
-\tconst char *paths[PATHS_PER_BINDING_TEMPLATE];
+\t{string_type}subaction_path;
+\tuint16_t subaction_path_index;
+\t{string_type}steamvr_path;
+\t{string_type}localized_name;
+{paths_field}
 \tenum xrt_input_name input;
 \tenum xrt_input_name dpad_activate;
 \tenum xrt_output_name output;
 }};
+'''
 
+    for struct, fields in (("dpad_emulation", ["subaction_path"]),
+                           ("binding_template", ["subaction_path", "steamvr_path", "localized_name"])):
+        for field in fields:
+            ret += f'''
+static inline const char *
+{struct}_{field}(const struct {struct} *t)
+{{
+\treturn {string_ref.format("t->" + field)};
+}}
+'''
+        ret += f'''
+static inline size_t
+{struct}_path_count(const struct {struct} *t)
+{{
+\treturn t->path_count;
+}}
+
+static inline size_t
+{struct}_subaction_path_index(const struct {struct} *t)
+{{
+\treturn t->subaction_path_index;
+}}
+
+static inline size_t
+{struct}_path_index(const struct {struct} *t, size_t index)
+{{
+\treturn {path_index_ref.format("t")};
+}}
+'''
+    return ret
+
+
+def generate_bindings_h(file, p, pooled=False):
+    """Generate header for the verify subpaths functions."""
+    f = GeneratedFile(file)
+    f.write(header.format(brief='Generated bindings data header',
+                          group='oxr_api'))
+    f.write('''
+#pragma once
+
+#include <stdbool.h>
+#include <stddef.h>
+#include <stdint.h>
+
+#include "xrt/xrt_defines.h"
+
+// clang-format off
+''')
+
+    binding_structs = binding_structs_h(p, pooled)
+
+    profile_indices = ""
+    for idx, profile in enumerate(p.profiles):
+        profile_indices += f"#define PROFILE_TEMPLATE_INDEX_{profile.validation_func_name.upper()} {idx}\n"
+
+    f.write(f'''
+/*!
+ * Bitmasks of the profiles accepting a path, bit N is profile_templates[N].
+ */
+struct path_profile_masks
+{{
+\tuint64_t subpath;
+\tuint64_t dpad_path;
+\tuint64_t dpad_emulator;
+}};
+
+#define PROFILE_TEMPLATE_BIT(INDEX) (UINT64_C(1) << (INDEX))
+
+{profile_indices}
+struct path_profile_masks
+oxr_verify_path_profiles(const char *str, size_t length);
+
+#define PATHS_PER_BINDING_TEMPLATE {PATHS_PER_BINDING_TEMPLATE}
+
+enum oxr_dpad_binding_point
+{{
+\tOXR_DPAD_BINDING_POINT_NONE,
+\tOXR_DPAD_BINDING_POINT_UP,
+\tOXR_DPAD_BINDING_POINT_DOWN,
+\tOXR_DPAD_BINDING_POINT_LEFT,
+\tOXR_DPAD_BINDING_POINT_RIGHT,
+}};
+
+{binding_structs}
 struct profile_template
 {{
 \tenum xrt_device_name name;
 \tconst char *path;
+\tsize_t path_length;
 \tconst char *localized_name;
 \tconst char *steamvr_input_profile_path;
 \tconst char *steamvr_controller_type;
@@ -621,6 +1280,13 @@ struct profile_template
 #define NUM_PROFILE_TEMPLATES {len(p.profiles)}
 extern struct profile_template profile_templates[NUM_PROFILE_TEMPLATES];
 
+/*!
+ * Find the profile template for a interaction profile path, without needing
+ * to turn any of the template paths into XrPaths, returns NULL if none.
+ */
+struct profile_template *
+profile_template_find_by_path(const char *str, size_t length);
+
 ''')
 
     f.write('const char *\n')
@@ -647,15 +1313,22 @@ def main():
     parser.add_argument(
         'output', type=str, nargs='+',
         help='Output file, uses the name to choose output type')
+    parser.add_argument(
+        '--pooled-strings', action='store_true',
+        help='Store the binding template strings in one deduplicated pool')
     args = parser.parse_args()
 
     bindings = Bindings.load_and_parse(args.bindings)
 
     for output in args.output:
         if output.endswith("generated_bindings.c"):
-            generate_bindings_c(output, bindings)
+            generate_bindings_c(output, bindings, args.pooled_strings)
+        if output.endswith("generated_bindings_checks.c"):
+            generate_bindings_checks_c(output, bindings)
+        if output.endswith("generated_bindings_checks.h"):
+            generate_bindings_checks_h(output, bindings)
         if output.endswith("generated_bindings.h"):
-            generate_bindings_h(output, bindings)
+            generate_bindings_h(output, bindings, args.pooled_strings)
 
 
 if __name__ == "__main__":
@@ -73,6 +73,13 @@ xrt_ipc_handle_close(xrt_ipc_handle_t handle)
  */
 typedef int xrt_ipc_handle_t;
 
+/*!
+ * Defined to allow detection of the underlying type.
+ *
+ * @relates xrt_ipc_handle_t
+ */
+#define XRT_IPC_HANDLE_IS_FD 1
+
 /*!
  * An invalid value for an IPC handle.
  *
@@ -208,7 +208,8 @@ public class Client implements ServiceConnection {
         ParcelFileDescriptor theirs;
         ParcelFileDescriptor ours;
         try {
-            ParcelFileDescriptor[] fds = ParcelFileDescriptor.createSocketPair();
+            // Reliable pairs are packet based, keeping message boundaries.
+            ParcelFileDescriptor[] fds = ParcelFileDescriptor.createReliableSocketPair();
             ours = fds[0];
             theirs = fds[1];
             monado.connect(theirs);
@@ -43,6 +43,51 @@
 struct xrt_compositor_native;
 
 
+/*!
+ * A call started with one of the generated ipc_call_*_begin functions whose
+ * reply has not been handed out yet, lives in the token of the call.
+ */
+struct ipc_pending_call
+{
+	struct ipc_pending_call *next;
+
+	//! Where the reply is received to, it must be exactly this big.
+	void *reply;
+	size_t reply_size;
+
+	//! Set once the reply has been received, or receiving it failed.
+	bool done;
+	xrt_result_t result;
+};
+
+/*!
+ * Replies still to come on a channel, in the order the calls were sent. Must
+ * be emptied before receiving the reply of any other call on the channel.
+ */
+struct ipc_pending_fifo
+{
+	struct ipc_pending_call *first;
+	struct ipc_pending_call *last;
+};
+
+/*!
+ * An extra channel of a connection, calls on it don't wait for calls on other
+ * channels.
+ */
+struct ipc_client_channel
+{
+	struct ipc_message_channel imc;
+
+	//! Held while a call is in flight on this channel.
+	struct os_mutex mutex;
+
+	//! Replies to calls started but not ended on this channel.
+	struct ipc_pending_fifo pending;
+
+	//! Calls on this channel use the main one if this is not set.
+	bool connected;
+};
+
 /*!
  * Connection.
  */
@@ -53,8 +98,21 @@ struct ipc_connection
 	struct ipc_shared_memory *ism;
 	xrt_shmem_handle_t ism_handle;
 
+	//! Ring used for calls marked with the shmem transport, NULL if not enabled.
+	struct ipc_shared_ring *ring;
+	xrt_shmem_handle_t ring_handle;
+
+	//! Slot in @ref ism with errors from calls without a reply.
+	xrt_atomic_s32_t *deferred_result;
+
+	//! Extra channels, index 0 is unused as the main channel is @ref imc.
+	struct ipc_client_channel channels[IPC_MAX_CHANNELS];
+
 	struct os_mutex mutex;
 
+	//! Replies to calls started but not ended on the main channel.
+	struct ipc_pending_fifo pending;
+
 #ifdef XRT_OS_ANDROID
 	struct ipc_client_android *ica;
 #endif // XRT_OS_ANDROID
@@ -95,6 +153,54 @@ ipc_client_xdev(struct xrt_device *xdev)
 	return (struct ipc_client_xdev *)xdev;
 }
 
+/*!
+ * Get and clear the first error of any earlier call without a reply, called
+ * by the generated code for those calls but can also be used to check for
+ * errors after the last one.
+ *
+ * @ingroup ipc_client
+ */
+static inline xrt_result_t
+ipc_client_take_deferred_result(struct ipc_connection *ipc_c)
+{
+	if (ipc_c->deferred_result == NULL) {
+		return XRT_SUCCESS;
+	}
+
+	int32_t result = *ipc_c->deferred_result;
+	while (result != XRT_SUCCESS) {
+		int32_t prev = xrt_atomic_s32_cmpxchg(ipc_c->deferred_result, result, XRT_SUCCESS);
+		if (prev == result) {
+			break;
+		}
+		result = prev;
+	}
+
+	return (xrt_result_t)result;
+}
+
+/*!
+ * Add a call that has just been sent to the end of @p fifo, the channel mutex
+ * must be held.
+ *
+ * @ingroup ipc_client
+ */
+void
+ipc_client_pending_push(struct ipc_pending_fifo *fifo, struct ipc_pending_call *pc, void *reply, size_t reply_size);
+
+/*!
+ * Receive the replies in @p fifo up to and including the one for @p until, or
+ * all of them if it is NULL, the channel mutex must be held. If receiving fails
+ * every call still in the fifo fails with the same error.
+ *
+ * @return The result of receiving the reply of @p until, or of all of them.
+ * @ingroup ipc_client
+ */
+xrt_result_t
+ipc_client_pending_receive(struct ipc_message_channel *imc,
+                           struct ipc_pending_fifo *fifo,
+                           struct ipc_pending_call *until);
+
 /*!
  * Create an IPC client system compositor.
  *
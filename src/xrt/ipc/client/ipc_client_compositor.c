@@ -18,6 +18,7 @@
 
 #include "util/u_misc.h"
 #include "util/u_wait.h"
+#include "util/u_debug.h"
 #include "util/u_handles.h"
 #include "util/u_trace_marker.h"
 
@@ -49,6 +50,12 @@
 //! Define to test the loopback allocator.
 #undef IPC_USE_LOOPBACK_IMAGE_ALLOCATOR
 
+/*
+ * Predict the next frame as soon as a frame has been committed, so the round
+ * trip overlaps with what the app does before calling wait frame.
+ */
+DEBUG_GET_ONCE_BOOL_OPTION(ipc_early_predict, "IPC_EARLY_PREDICT", false)
+
 /*!
  * Client proxy for an xrt_compositor_native implementation over IPC.
  * @implements xrt_compositor_native
@@ -79,6 +86,23 @@ struct ipc_client_compositor
 	//! To get better wake up in wait frame.
 	struct os_precise_sleeper sleeper;
 
+	//! Predict frame call begun after the last commit, see IPC_EARLY_PREDICT.
+	struct ipc_compositor_predict_frame_token predict_token;
+	bool predict_pending;
+
+	/*!
+	 * Swapchain releases, nobody waits for their results. Sent together
+	 * with the next frame call or the next call that depends on them, see
+	 * @ref flush_batch_locked.
+	 */
+	struct
+	{
+		//! Protects @ref batch, the frame calls can come from different threads.
+		struct os_mutex mutex;
+
+		struct ipc_batch batch;
+	} pending;
+
 #ifdef IPC_USE_LOOPBACK_IMAGE_ALLOCATOR
 	//! To test image allocator.
 	struct xrt_image_native_allocator loopback_xina;
@@ -136,6 +160,84 @@ ipc_client_compositor_semaphore(struct xrt_compositor_semaphore *xcsem)
 	return (struct ipc_client_compositor_semaphore *)xcsem;
 }
 
+static void
+begin_early_predict(struct ipc_client_compositor *icc)
+{
+	if (!debug_get_bool_option_ipc_early_predict() || icc->predict_pending) {
+		return;
+	}
+
+	xrt_result_t xret = ipc_call_compositor_predict_frame_begin(icc->ipc_c, &icc->predict_token);
+	icc->predict_pending = xret == XRT_SUCCESS;
+}
+
+//! The reply must be picked up even if nobody is going to wait for the frame.
+static void
+drop_early_predict(struct ipc_client_compositor *icc)
+{
+	if (!icc->predict_pending) {
+		return;
+	}
+
+	int64_t frame_id;
+	uint64_t wake_up_time_ns, predicted_display_time_ns, predicted_display_period_ns;
+
+	icc->predict_pending = false;
+	ipc_call_compositor_predict_frame_end( //
+	    icc->ipc_c,                        //
+	    &icc->predict_token,               //
+	    &frame_id,                         //
+	    &wake_up_time_ns,                  //
+	    &predicted_display_time_ns,        //
+	    &predicted_display_period_ns);     //
+}
+
+
+/*!
+ * Send the queued calls, if there are any. Their callers have already
+ * returned, so the first error of them is returned here instead.
+ */
+static xrt_result_t
+flush_batch_locked(struct ipc_client_compositor *icc)
+{
+	if (icc->pending.batch.call_count == 0) {
+		return XRT_SUCCESS;
+	}
+
+	struct ipc_batch_results results;
+	xrt_result_t xret = ipc_call_batch(icc->ipc_c, &icc->pending.batch, &results);
+
+	icc->pending.batch.call_count = 0;
+	icc->pending.batch.size = 0;
+
+	return xret;
+}
+
+static xrt_result_t
+flush_batch(struct ipc_client_compositor *icc)
+{
+	os_mutex_lock(&icc->pending.mutex);
+	xrt_result_t xret = flush_batch_locked(icc);
+	os_mutex_unlock(&icc->pending.mutex);
+
+	return xret;
+}
+
+/*!
+ * Add a call to the pending batch with the given ipc_batch_* function,
+ * sending the batch first if the call doesn't fit. Must hold the mutex.
+ */
+#define QUEUE_CALL_LOCKED(ICC, XRET, BATCH_FUNC, ...)                                                                 \
+	do {                                                                                                           \
+		XRET = BATCH_FUNC(&(ICC)->pending.batch, __VA_ARGS__);                                                 \
+		if (XRET != XRT_SUCCESS) {                                                                             \
+			XRET = flush_batch_locked(ICC);                                                                \
+			if (XRET == XRT_SUCCESS) {                                                                     \
+				XRET = BATCH_FUNC(&(ICC)->pending.batch, __VA_ARGS__);                                 \
+			}                                                                                              \
+		}                                                                                                      \
+	} while (false)
+
 
 /*
  *
@@ -186,6 +288,9 @@ ipc_compositor_swapchain_destroy(struct xrt_swapchain *xsc)
 	struct ipc_client_swapchain *ics = ipc_client_swapchain(xsc);
 	struct ipc_client_compositor *icc = ics->icc;
 
+	// Queued releases might refer to this swapchain.
+	flush_batch(icc);
+
 	IPC_CALL_CHK(ipc_call_swapchain_destroy(icc->ipc_c, ics->id));
 
 	free(xsc);
@@ -197,6 +302,16 @@ ipc_compositor_swapchain_wait_image(struct xrt_swapchain *xsc, uint64_t timeout_
 	struct ipc_client_swapchain *ics = ipc_client_swapchain(xsc);
 	struct ipc_client_compositor *icc = ics->icc;
 
+	/*
+	 * Not added to the batch, the wait can take long and would block other
+	 * threads queueing calls. Queued calls still go first to keep the order.
+	 */
+	xrt_result_t xret = flush_batch(icc);
+	if (xret != XRT_SUCCESS) {
+		IPC_ERROR(icc->ipc_c, "Call error '%i'!", xret);
+		return xret;
+	}
+
 	IPC_CALL_CHK(ipc_call_swapchain_wait_image(icc->ipc_c, ics->id, timeout_ns, index));
 
 	return res;
@@ -208,6 +323,13 @@ ipc_compositor_swapchain_acquire_image(struct xrt_swapchain *xsc, uint32_t *out_
 	struct ipc_client_swapchain *ics = ipc_client_swapchain(xsc);
 	struct ipc_client_compositor *icc = ics->icc;
 
+	// Images released by queued calls must be back in the service's queue.
+	xrt_result_t xret = flush_batch(icc);
+	if (xret != XRT_SUCCESS) {
+		IPC_ERROR(icc->ipc_c, "Call error '%i'!", xret);
+		return xret;
+	}
+
 	IPC_CALL_CHK(ipc_call_swapchain_acquire_image(icc->ipc_c, ics->id, out_index));
 
 	return res;
@@ -219,7 +341,13 @@ ipc_compositor_swapchain_release_image(struct xrt_swapchain *xsc, uint32_t index
 	struct ipc_client_swapchain *ics = ipc_client_swapchain(xsc);
 	struct ipc_client_compositor *icc = ics->icc;
 
-	IPC_CALL_CHK(ipc_call_swapchain_release_image(icc->ipc_c, ics->id, index));
+	// Nothing waits for the release, send it with the next call that needs it.
+	os_mutex_lock(&icc->pending.mutex);
+	xrt_result_t xret;
+	QUEUE_CALL_LOCKED(icc, xret, ipc_batch_swapchain_release_image, ics->id, index);
+	os_mutex_unlock(&icc->pending.mutex);
+
+	IPC_CALL_CHK(xret);
 
 	return res;
 }
@@ -503,6 +631,9 @@ ipc_compositor_end_session(struct xrt_compositor *xc)
 
 	IPC_TRACE(icc->ipc_c, "Compositor end session.");
 
+	drop_early_predict(icc);
+	flush_batch(icc);
+
 	IPC_CALL_CHK(ipc_call_session_end(icc->ipc_c));
 
 	return res;
@@ -518,12 +649,27 @@ ipc_compositor_wait_frame(struct xrt_compositor *xc,
 	struct ipc_client_compositor *icc = ipc_client_compositor(xc);
 
 	uint64_t wake_up_time_ns = 0;
-
-	IPC_CALL_CHK(ipc_call_compositor_predict_frame(icc->ipc_c,                     // Connection
-	                                               out_frame_id,                   // Frame id
-	                                               &wake_up_time_ns,               // When we should wake up
-	                                               out_predicted_display_time,     // Display time
-	                                               out_predicted_display_period)); // Current period
+	xrt_result_t res;
+
+	if (icc->predict_pending) {
+		// Begun when the last frame was committed, only the reply is left.
+		icc->predict_pending = false;
+		res = ipc_call_compositor_predict_frame_end(icc->ipc_c,                    // Connection
+		                                            &icc->predict_token,           // Begun call
+		                                            out_frame_id,                  // Frame id
+		                                            &wake_up_time_ns,              // When we should wake up
+		                                            out_predicted_display_time,    // Display time
+		                                            out_predicted_display_period); // Current period
+	} else {
+		res = ipc_call_compositor_predict_frame(icc->ipc_c,                    // Connection
+		                                        out_frame_id,                  // Frame id
+		                                        &wake_up_time_ns,              // When we should wake up
+		                                        out_predicted_display_time,    // Display time
+		                                        out_predicted_display_period); // Current period
+	}
+	if (res != XRT_SUCCESS) {
+		IPC_ERROR(icc->ipc_c, "Call error '%i'!", res);
+	}
 
 	// Wait until the given wake up time.
 	u_wait_until(&icc->sleeper, wake_up_time_ns);
@@ -539,7 +685,19 @@ ipc_compositor_begin_frame(struct xrt_compositor *xc, int64_t frame_id)
 {
 	struct ipc_client_compositor *icc = ipc_client_compositor(xc);
 
-	IPC_CALL_CHK(ipc_call_compositor_begin_frame(icc->ipc_c, frame_id));
+	/*
+	 * Sent right away, the service takes the begin time of the frame from
+	 * when it handles the call. Any queued releases go along with it.
+	 */
+	os_mutex_lock(&icc->pending.mutex);
+	xrt_result_t xret;
+	QUEUE_CALL_LOCKED(icc, xret, ipc_batch_compositor_begin_frame, frame_id);
+	if (xret == XRT_SUCCESS) {
+		xret = flush_batch_locked(icc);
+	}
+	os_mutex_unlock(&icc->pending.mutex);
+
+	IPC_CALL_CHK(xret);
 
 	return res;
 }
@@ -708,6 +866,16 @@ ipc_compositor_layer_commit(struct xrt_compositor *xc, xrt_graphics_sync_handle_
 	// Last bit of data to put in the shared memory area.
 	slot->layer_count = icc->layers.layer_count;
 
+	xrt_result_t xret = flush_batch(icc);
+	if (xret != XRT_SUCCESS) {
+		IPC_ERROR(icc->ipc_c, "Call error '%i'!", xret);
+		icc->layers.layer_count = 0;
+		if (valid_sync) {
+			u_graphics_sync_unref(&sync_handle);
+		}
+		return xret;
+	}
+
 	IPC_CALL_CHK(ipc_call_compositor_layer_sync( //
 	    icc->ipc_c,                              //
 	    icc->layers.slot_id,                     //
@@ -723,6 +891,10 @@ ipc_compositor_layer_commit(struct xrt_compositor *xc, xrt_graphics_sync_handle_
 		u_graphics_sync_unref(&sync_handle);
 	}
 
+	if (res == XRT_SUCCESS) {
+		begin_early_predict(icc);
+	}
+
 	return res;
 }
 
@@ -740,6 +912,13 @@ ipc_compositor_layer_commit_with_semaphore(struct xrt_compositor *xc,
 	// Last bit of data to put in the shared memory area.
 	slot->layer_count = icc->layers.layer_count;
 
+	xrt_result_t xret = flush_batch(icc);
+	if (xret != XRT_SUCCESS) {
+		IPC_ERROR(icc->ipc_c, "Call error '%i'!", xret);
+		icc->layers.layer_count = 0;
+		return xret;
+	}
+
 	IPC_CALL_CHK(ipc_call_compositor_layer_sync_with_semaphore( //
 	    icc->ipc_c,                                             //
 	    icc->layers.slot_id,                                    //
@@ -750,6 +929,10 @@ ipc_compositor_layer_commit_with_semaphore(struct xrt_compositor *xc,
 	// Reset.
 	icc->layers.layer_count = 0;
 
+	if (res == XRT_SUCCESS) {
+		begin_early_predict(icc);
+	}
+
 	return res;
 }
 
@@ -758,7 +941,16 @@ ipc_compositor_discard_frame(struct xrt_compositor *xc, int64_t frame_id)
 {
 	struct ipc_client_compositor *icc = ipc_client_compositor(xc);
 
-	IPC_CALL_CHK(ipc_call_compositor_discard_frame(icc->ipc_c, frame_id));
+	// Ends the frame, so send it and everything queued before it now.
+	os_mutex_lock(&icc->pending.mutex);
+	xrt_result_t xret;
+	QUEUE_CALL_LOCKED(icc, xret, ipc_batch_compositor_discard_frame, frame_id);
+	if (xret == XRT_SUCCESS) {
+		xret = flush_batch_locked(icc);
+	}
+	os_mutex_unlock(&icc->pending.mutex);
+
+	IPC_CALL_CHK(xret);
 
 	return res;
 }
@@ -770,9 +962,13 @@ ipc_compositor_destroy(struct xrt_compositor *xc)
 
 	assert(icc->compositor_created);
 
+	drop_early_predict(icc);
+	flush_batch(icc);
+
 	IPC_CALL_CHK(ipc_call_session_destroy(icc->ipc_c));
 
 	os_precise_sleeper_deinit(&icc->sleeper);
+	os_mutex_destroy(&icc->pending.mutex);
 
 	icc->compositor_created = false;
 }
@@ -805,6 +1001,8 @@ ipc_compositor_init(struct ipc_client_compositor *icc, struct xrt_compositor_nat
 	// Using in wait frame.
 	os_precise_sleeper_init(&icc->sleeper);
 
+	os_mutex_init(&icc->pending.mutex);
+
 	// Fetch info from the compositor, among it the format format list.
 	get_info(&(icc->base.base), &icc->base.base.info);
 
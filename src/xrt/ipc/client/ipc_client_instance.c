@@ -24,6 +24,9 @@
 #include "util/u_system_helpers.h"
 
 #include "shared/ipc_protocol.h"
+#include "shared/ipc_ring.h"
+#include "shared/ipc_shmem.h"
+#include "shared/ipc_stats.h"
 #include "client/ipc_client.h"
 
 #include "ipc_client_generated.h"
@@ -41,6 +44,7 @@
 #include <unistd.h>
 #endif
 #include <limits.h>
+#include <inttypes.h>
 
 #ifdef XRT_GRAPHICS_BUFFER_HANDLE_IS_AHARDWAREBUFFER
 #include "android/android_ahardwarebuffer_allocator.h"
@@ -53,6 +57,7 @@
 
 DEBUG_GET_ONCE_LOG_OPTION(ipc_log, "IPC_LOG", U_LOGGING_WARN)
 DEBUG_GET_ONCE_BOOL_OPTION(ipc_ignore_version, "IPC_IGNORE_VERSION", false)
+DEBUG_GET_ONCE_BOOL_OPTION(ipc_ring, "IPC_RING", true)
 
 /*
  *
@@ -248,7 +253,8 @@ ipc_connect(struct ipc_connection *ipc_c)
 
 	// create our IPC socket
 
-	ret = socket(PF_UNIX, SOCK_STREAM, 0);
+	// Must match the server, see ipc_server_mainloop_linux.c.
+	ret = socket(PF_UNIX, SOCK_SEQPACKET, 0);
 	if (ret < 0) {
 		IPC_ERROR(ipc_c, "Socket Create Error!");
 		return false;
@@ -282,6 +288,42 @@ ipc_connect(struct ipc_connection *ipc_c)
 }
 #endif
 
+static void
+open_channels(struct ipc_connection *ipc_c)
+{
+	// Zero if the protocol was generated without channels.
+	for (uint32_t i = 1; i < IPC_CHANNEL_COUNT; i++) {
+		struct ipc_client_channel *ch = &ipc_c->channels[i];
+
+		xrt_ipc_handle_t handle = XRT_IPC_HANDLE_INVALID;
+		xrt_result_t xret = ipc_call_instance_open_channel(ipc_c, i, &handle, 1);
+		if (xret != XRT_SUCCESS) {
+			IPC_WARN(ipc_c, "Failed to open channel %u, using the main one for its calls.", i);
+			continue;
+		}
+
+		ch->imc.ipc_handle = handle;
+		ch->imc.log_level = ipc_c->log_level;
+		os_mutex_init(&ch->mutex);
+		ch->connected = true;
+	}
+}
+
+static void
+close_channels(struct ipc_connection *ipc_c)
+{
+	for (uint32_t i = 1; i < IPC_CHANNEL_COUNT; i++) {
+		struct ipc_client_channel *ch = &ipc_c->channels[i];
+		if (!ch->connected) {
+			continue;
+		}
+
+		ipc_message_channel_close(&ch->imc);
+		os_mutex_destroy(&ch->mutex);
+		ch->connected = false;
+	}
+}
+
 static xrt_result_t
 create_system_compositor(struct ipc_client_instance *ii,
                          struct xrt_device *xdev,
@@ -389,9 +431,25 @@ ipc_client_instance_destroy(struct xrt_instance *xinst)
 {
 	struct ipc_client_instance *ii = ipc_client_instance(xinst);
 
+#ifdef XRT_FEATURE_IPC_INSTRUMENTATION
+	ipc_stats_dump(stderr);
+#endif
+
+	close_channels(&ii->ipc_c);
+
 	// service considers us to be connected until fd is closed
 	ipc_message_channel_close(&ii->ipc_c.imc);
 
+	if (ii->ipc_c.ring != NULL) {
+#ifdef XRT_OS_WINDOWS
+		UnmapViewOfFile(ii->ipc_c.ring);
+#else
+		munmap(ii->ipc_c.ring, sizeof(struct ipc_shared_ring));
+#endif
+		ii->ipc_c.ring = NULL;
+	}
+	ipc_shmem_destroy(&ii->ipc_c.ring_handle);
+
 	for (size_t i = 0; i < ii->xtrack_count; i++) {
 		u_var_remove_root(ii->xtracks[i]);
 		free(ii->xtracks[i]);
@@ -430,6 +488,7 @@ ipc_instance_create(struct xrt_instance_info *i_info, struct xrt_instance **out_
 
 	ii->ipc_c.imc.ipc_handle = XRT_IPC_HANDLE_INVALID;
 	ii->ipc_c.ism_handle = XRT_SHMEM_HANDLE_INVALID;
+	ii->ipc_c.ring_handle = XRT_SHMEM_HANDLE_INVALID;
 
 	os_mutex_init(&ii->ipc_c.mutex);
 
@@ -450,7 +509,9 @@ ipc_instance_create(struct xrt_instance_info *i_info, struct xrt_instance **out_
 	}
 
 	// get our xdev shm from the server and mmap it
-	xrt_result_t xret = ipc_call_instance_get_shm_fd(&ii->ipc_c, &ii->ipc_c.ism_handle, 1);
+	uint64_t service_fingerprint = 0;
+	xrt_result_t xret = ipc_call_instance_get_shm_fd( //
+	    &ii->ipc_c, ipc_protocol_fingerprint(), &service_fingerprint, &ii->ipc_c.ism_handle, 1);
 	if (xret != XRT_SUCCESS) {
 		IPC_ERROR((&ii->ipc_c), "Failed to retrieve shm fd!");
 		free(ii);
@@ -484,16 +545,50 @@ ipc_instance_create(struct xrt_instance_info *i_info, struct xrt_instance **out_
 		return XRT_ERROR_IPC_FAILURE;
 	}
 
-	if (strncmp(u_git_tag, ii->ipc_c.ism->u_git_tag, IPC_VERSION_NAME_LEN) != 0) {
-		IPC_ERROR((&ii->ipc_c), "Monado client library version %s does not match service version %s", u_git_tag,
-		          ii->ipc_c.ism->u_git_tag);
+	// Builds from different commits work together as long as the protocol is the same.
+	if (service_fingerprint != ipc_protocol_fingerprint()) {
+		IPC_ERROR((&ii->ipc_c),
+		          "Monado client library protocol %016" PRIx64 " (version %s) does not match service protocol %016" PRIx64
+		          " (version %s)",
+		          ipc_protocol_fingerprint(), u_git_tag, service_fingerprint, ii->ipc_c.ism->u_git_tag);
 		if (!debug_get_bool_option_ipc_ignore_version()) {
 			IPC_ERROR((&ii->ipc_c), "Set IPC_IGNORE_VERSION=1 to ignore this version conflict");
 			free(ii);
 			return XRT_ERROR_IPC_FAILURE;
 		}
+	} else if (strncmp(u_git_tag, ii->ipc_c.ism->u_git_tag, IPC_VERSION_NAME_LEN) != 0) {
+		IPC_INFO((&ii->ipc_c), "Monado client library version %s and service version %s use the same protocol",
+		         u_git_tag, ii->ipc_c.ism->u_git_tag);
+	}
+
+	uint32_t client_id = 0;
+	xret = ipc_call_instance_get_client_id(&ii->ipc_c, &client_id);
+	if (xret != XRT_SUCCESS || client_id >= IPC_MAX_CLIENTS) {
+		IPC_ERROR((&ii->ipc_c), "Failed to get client id!");
+		free(ii);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	// Where the service puts errors from calls without a reply.
+	ii->ipc_c.deferred_result = &ii->ipc_c.ism->deferred_results[client_id];
+
+	// Hot calls go over a ring in the shared memory if possible, not fatal.
+	if (debug_get_bool_option_ipc_ring() && ipc_ring_is_supported()) {
+		xret = ipc_call_instance_enable_ring(&ii->ipc_c, &ii->ipc_c.ring_handle, 1);
+		if (xret == XRT_SUCCESS) {
+			xret = ipc_shmem_map(ii->ipc_c.ring_handle, sizeof(struct ipc_shared_ring),
+			                     (void **)&ii->ipc_c.ring);
+		}
+		if (xret != XRT_SUCCESS) {
+			ii->ipc_c.ring = NULL;
+			ipc_shmem_destroy(&ii->ipc_c.ring_handle);
+			IPC_WARN((&ii->ipc_c), "Failed to enable ring, using the socket for all calls.");
+		}
 	}
 
+	// Let calls on other channels run without waiting for the main one.
+	open_channels(&ii->ipc_c);
+
 	uint32_t count = 0;
 	struct xrt_tracking_origin *xtrack = NULL;
 	struct ipc_shared_memory *ism = ii->ipc_c.ism;
@@ -0,0 +1,95 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Replies to calls started with the generated begin functions.
+ * @author agent <agent@local>
+ * @ingroup ipc_client
+ */
+
+#include "client/ipc_client.h"
+
+#include <assert.h>
+
+
+/*
+ *
+ * Helpers.
+ *
+ */
+
+static struct ipc_pending_call *
+pop(struct ipc_pending_fifo *fifo)
+{
+	struct ipc_pending_call *pc = fifo->first;
+
+	fifo->first = pc->next;
+	if (fifo->first == NULL) {
+		fifo->last = NULL;
+	}
+	pc->next = NULL;
+
+	return pc;
+}
+
+
+/*
+ *
+ * 'Exported' functions.
+ *
+ */
+
+void
+ipc_client_pending_push(struct ipc_pending_fifo *fifo, struct ipc_pending_call *pc, void *reply, size_t reply_size)
+{
+	pc->next = NULL;
+	pc->reply = reply;
+	pc->reply_size = reply_size;
+	pc->done = false;
+	pc->result = XRT_SUCCESS;
+
+	if (fifo->last != NULL) {
+		fifo->last->next = pc;
+	} else {
+		fifo->first = pc;
+	}
+	fifo->last = pc;
+}
+
+xrt_result_t
+ipc_client_pending_receive(struct ipc_message_channel *imc,
+                           struct ipc_pending_fifo *fifo,
+                           struct ipc_pending_call *until)
+{
+	// Already picked up while receiving the reply of another call.
+	if (until != NULL && until->done) {
+		return until->result;
+	}
+
+	while (fifo->first != NULL) {
+		struct ipc_pending_call *pc = pop(fifo);
+
+		// The service replies to the calls on a channel in order.
+		pc->result = ipc_receive(imc, pc->reply, pc->reply_size);
+		pc->done = true;
+
+		if (pc->result != XRT_SUCCESS) {
+			// Can't tell which reply is which anymore, fail them all.
+			while (fifo->first != NULL) {
+				struct ipc_pending_call *rest = pop(fifo);
+				rest->result = pc->result;
+				rest->done = true;
+			}
+			return pc->result;
+		}
+
+		if (pc == until) {
+			return XRT_SUCCESS;
+		}
+	}
+
+	// Not in the fifo, the call was never started.
+	assert(until == NULL);
+
+	return XRT_SUCCESS;
+}
@@ -71,6 +71,32 @@ struct ipc_swapchain_data
 	bool active;
 };
 
+/*!
+ * An extra channel of a client, serviced by its own thread.
+ *
+ * @ingroup ipc_server
+ */
+struct ipc_server_channel
+{
+	//! The client this is a channel of.
+	volatile struct ipc_client_state *ics;
+
+	//! Server end of the socket pair, the client has the other end.
+	struct ipc_message_channel imc;
+
+	/*!
+	 * Client end of the socket pair, only closed with the channel as it is
+	 * sent to the client after the handler opening the channel returns.
+	 */
+	xrt_ipc_handle_t client_handle;
+
+	//! Thread servicing @ref imc.
+	struct os_thread thread;
+
+	//! Is @ref thread running.
+	bool open;
+};
+
 /*!
  * Holds the state for a single client.
  *
@@ -122,6 +148,32 @@ struct ipc_client_state
 	struct ipc_app_state client_state;
 
 	int server_thread_index;
+
+	//! Ring for calls with the shmem transport, NULL if the client hasn't enabled it.
+	struct ipc_shared_ring *ring;
+
+	//! Shared memory holding @ref ring, only this client gets it.
+	xrt_shmem_handle_t ring_handle;
+
+	//! Thread servicing @ref ring.
+	struct os_thread ring_thread;
+
+	//! Cleared to stop @ref ring_thread.
+	bool ring_running;
+
+	//! Extra channels, index 0 is unused as the main channel is @ref imc.
+	struct ipc_server_channel channels[IPC_MAX_CHANNELS];
+
+	/*!
+	 * Only the main channel thread changes @ref xc, it holds this while
+	 * doing so. Calls on other channels and the ring hold it while they use
+	 * @ref xc. Never held across a call that can block, so the main thread
+	 * can wait for swapchain images without stalling the other threads.
+	 */
+	struct os_mutex compositor_lock;
+
+	//! Like @ref compositor_lock but for @ref xspcs.
+	struct os_mutex spaces_lock;
 };
 
 enum ipc_thread_state
@@ -349,6 +401,17 @@ struct ipc_server
 
 		struct os_mutex lock;
 	} global_state;
+
+	//! Calls that went over their budget, see @ref ipc_server_record_slow_call.
+	struct
+	{
+		struct ipc_slow_call calls[IPC_MAX_SLOW_CALLS];
+
+		//! Number of calls recorded so far, the oldest ones get overwritten.
+		uint32_t total;
+
+		struct os_mutex lock;
+	} slow_calls;
 };
 
 
@@ -424,6 +487,42 @@ ipc_server_client_thread(void *_ics);
 void
 ipc_server_client_destroy_compositor(volatile struct ipc_client_state *ics);
 
+/*!
+ * Start servicing the shared memory ring of this client on a new thread.
+ *
+ * @ingroup ipc_server
+ */
+xrt_result_t
+ipc_server_client_start_ring(volatile struct ipc_client_state *ics);
+
+/*!
+ * Stop servicing the shared memory ring of this client, safe to call if it
+ * was never started.
+ *
+ * @ingroup ipc_server
+ */
+void
+ipc_server_client_stop_ring(volatile struct ipc_client_state *ics);
+
+/*!
+ * Open an extra channel for this client, serviced by a new thread. The handle
+ * for the client end of it is returned in @p out_handle.
+ *
+ * @ingroup ipc_server
+ */
+xrt_result_t
+ipc_server_client_open_channel(volatile struct ipc_client_state *ics,
+                               uint32_t channel_id,
+                               xrt_ipc_handle_t *out_handle);
+
+/*!
+ * Close all of the extra channels of this client and stop their threads.
+ *
+ * @ingroup ipc_server
+ */
+void
+ipc_server_client_close_channels(volatile struct ipc_client_state *ics);
+
 /*!
  * @defgroup ipc_server_internals Server Internals
  * @brief These are only called by the platform-specific mainloop polling code.
@@ -478,6 +577,53 @@ get_idev(volatile struct ipc_client_state *ics, uint32_t device_id)
 	return &ics->server->idevs[device_id];
 }
 
+static inline void
+ipc_server_counter_add(volatile uint64_t *p, uint64_t value)
+{
+#if defined(__GNUC__)
+	__sync_fetch_and_add(p, value);
+#elif defined(_MSC_VER)
+	InterlockedExchangeAdd64((volatile LONG64 *)p, (LONG64)value);
+#else
+#error "compiler not supported"
+#endif
+}
+
+/*!
+ * Update the counters in shared memory for a handled call, called by the
+ * generated dispatch code. Atomic as the ring and channel threads of a client
+ * can handle calls at the same time.
+ */
+static inline void
+ipc_server_count_call(volatile struct ipc_client_state *ics,
+                      uint32_t cmd,
+                      xrt_result_t result,
+                      uint64_t handler_ns)
+{
+	struct ipc_call_counter *counter = &ics->server->ism->call_counters[ics->server_thread_index].calls[cmd];
+
+	ipc_server_counter_add(&counter->count, 1);
+	if (result != XRT_SUCCESS) {
+		ipc_server_counter_add(&counter->errors, 1);
+	}
+	ipc_server_counter_add(&counter->handler_ns, handler_ns);
+}
+
+/*!
+ * Record a call that went over its budget, called by the generated dispatch
+ * code. Only the last @ref IPC_MAX_SLOW_CALLS calls are kept.
+ *
+ * @memberof ipc_server
+ */
+void
+ipc_server_record_slow_call(volatile struct ipc_client_state *ics,
+                            uint32_t cmd,
+                            uint64_t timestamp_ns,
+                            const void *msg,
+                            size_t msg_size,
+                            uint64_t handler_ns,
+                            uint64_t budget_ns);
+
 
 #ifdef __cplusplus
 }
@@ -17,6 +17,7 @@
 
 #ifdef XRT_GRAPHICS_SYNC_HANDLE_IS_FD
 #include <unistd.h>
+#include <inttypes.h>
 #endif
 
 
@@ -132,7 +133,9 @@ track_space(volatile struct ipc_client_state *ics, struct xrt_space *xs, uint32_
 
 	// Remove volatile
 	struct xrt_space **xs_ptr = (struct xrt_space **)&ics->xspcs[id];
+	os_mutex_lock((struct os_mutex *)&ics->spaces_lock);
 	xrt_space_reference(xs_ptr, xs);
+	os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
 
 	*out_id = id;
 
@@ -148,6 +151,8 @@ track_space(volatile struct ipc_client_state *ics, struct xrt_space *xs, uint32_
 
 xrt_result_t
 ipc_handle_instance_get_shm_fd(volatile struct ipc_client_state *ics,
+                               uint64_t fingerprint,
+                               uint64_t *out_service_fingerprint,
                                uint32_t max_handle_capacity,
                                xrt_shmem_handle_t *out_handles,
                                uint32_t *out_handle_count)
@@ -156,12 +161,71 @@ ipc_handle_instance_get_shm_fd(volatile struct ipc_client_state *ics,
 
 	assert(max_handle_capacity >= 1);
 
+	// The client decides if it carries on, it might ignore the mismatch.
+	*out_service_fingerprint = ipc_protocol_fingerprint();
+	if (fingerprint != *out_service_fingerprint) {
+		IPC_WARN(ics->server, "Client protocol fingerprint %016" PRIx64 " does not match service %016" PRIx64,
+		         fingerprint, *out_service_fingerprint);
+	}
+
 	out_handles[0] = ics->server->ism_handle;
 	*out_handle_count = 1;
 
 	return XRT_SUCCESS;
 }
 
+xrt_result_t
+ipc_handle_instance_get_client_id(volatile struct ipc_client_state *ics, uint32_t *out_client_id)
+{
+	IPC_TRACE_MARKER();
+
+	*out_client_id = (uint32_t)ics->server_thread_index;
+
+	return XRT_SUCCESS;
+}
+
+xrt_result_t
+ipc_handle_instance_enable_ring(volatile struct ipc_client_state *ics,
+                                uint32_t max_handle_capacity,
+                                xrt_shmem_handle_t *out_handles,
+                                uint32_t *out_handle_count)
+{
+	IPC_TRACE_MARKER();
+
+	assert(max_handle_capacity >= 1);
+
+	xrt_result_t xret = ipc_server_client_start_ring(ics);
+	if (xret != XRT_SUCCESS) {
+		return xret;
+	}
+
+	out_handles[0] = ics->ring_handle;
+	*out_handle_count = 1;
+
+	return XRT_SUCCESS;
+}
+
+xrt_result_t
+ipc_handle_instance_open_channel(volatile struct ipc_client_state *ics,
+                                 uint32_t channel_id,
+                                 uint32_t max_handle_capacity,
+                                 xrt_ipc_handle_t *out_handles,
+                                 uint32_t *out_handle_count)
+{
+	IPC_TRACE_MARKER();
+
+	assert(max_handle_capacity >= 1);
+
+	xrt_result_t xret = ipc_server_client_open_channel(ics, channel_id, &out_handles[0]);
+	if (xret != XRT_SUCCESS) {
+		return xret;
+	}
+
+	*out_handle_count = 1;
+
+	return XRT_SUCCESS;
+}
+
 xrt_result_t
 ipc_handle_system_compositor_get_info(volatile struct ipc_client_state *ics,
                                       struct xrt_system_compositor_info *out_info)
@@ -192,7 +256,10 @@ ipc_handle_session_create(volatile struct ipc_client_state *ics, const struct xr
 	ics->client_state.session_overlay = xsi->is_overlay;
 	ics->client_state.z_order = xsi->z_order;
 
+	// Calls on other channels look at it.
+	os_mutex_lock((struct os_mutex *)&ics->compositor_lock);
 	ics->xc = &xcn->base;
+	os_mutex_unlock((struct os_mutex *)&ics->compositor_lock);
 
 	xrt_syscomp_set_state(ics->server->xsysc, ics->xc, ics->client_state.session_visible,
 	                      ics->client_state.session_focused);
@@ -371,19 +438,24 @@ ipc_handle_space_locate_space(volatile struct ipc_client_state *ics,
 	struct xrt_space *space = NULL;
 	xrt_result_t xret;
 
+	// Keeps the spaces alive, space_destroy can run on the main channel.
+	os_mutex_lock((struct os_mutex *)&ics->spaces_lock);
+
 	xret = validate_space_id(ics, base_space_id, &base_space);
 	if (xret != XRT_SUCCESS) {
+		os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
 		U_LOG_E("Invalid base_space_id!");
 		return xret;
 	}
 
 	xret = validate_space_id(ics, space_id, &space);
 	if (xret != XRT_SUCCESS) {
+		os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
 		U_LOG_E("Invalid space_id!");
 		return xret;
 	}
 
-	return xrt_space_overseer_locate_space( //
+	xret = xrt_space_overseer_locate_space( //
 	    xso,                                //
 	    base_space,                         //
 	    base_offset,                        //
@@ -391,6 +463,10 @@ ipc_handle_space_locate_space(volatile struct ipc_client_state *ics,
 	    space,                              //
 	    offset,                             //
 	    out_relation);                      //
+
+	os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
+
+	return xret;
 }
 
 xrt_result_t
@@ -408,25 +484,33 @@ ipc_handle_space_locate_device(volatile struct ipc_client_state *ics,
 	struct xrt_device *xdev = NULL;
 	xrt_result_t xret;
 
-	xret = validate_space_id(ics, base_space_id, &base_space);
+	xret = validate_device_id(ics, xdev_id, &xdev);
 	if (xret != XRT_SUCCESS) {
-		U_LOG_E("Invalid base_space_id!");
+		U_LOG_E("Invalid device_id!");
 		return xret;
 	}
 
-	xret = validate_device_id(ics, xdev_id, &xdev);
+	// Keeps the space alive, space_destroy can run on the main channel.
+	os_mutex_lock((struct os_mutex *)&ics->spaces_lock);
+
+	xret = validate_space_id(ics, base_space_id, &base_space);
 	if (xret != XRT_SUCCESS) {
-		U_LOG_E("Invalid device_id!");
+		os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
+		U_LOG_E("Invalid base_space_id!");
 		return xret;
 	}
 
-	return xrt_space_overseer_locate_device( //
+	xret = xrt_space_overseer_locate_device( //
 	    xso,                                 //
 	    base_space,                          //
 	    base_offset,                         //
 	    at_timestamp,                        //
 	    xdev,                                //
 	    out_relation);                       //
+
+	os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
+
+	return xret;
 }
 
 xrt_result_t
@@ -444,9 +528,11 @@ ipc_handle_space_destroy(volatile struct ipc_client_state *ics, uint32_t space_i
 	assert(xs != NULL);
 	xs = NULL;
 
-	// Remove volatile
+	// Remove volatile, a locate on another channel might be using it.
 	struct xrt_space **xs_ptr = (struct xrt_space **)&ics->xspcs[space_id];
+	os_mutex_lock((struct os_mutex *)&ics->spaces_lock);
 	xrt_space_reference(xs_ptr, NULL);
+	os_mutex_unlock((struct os_mutex *)&ics->spaces_lock);
 
 	return XRT_SUCCESS;
 }
@@ -474,7 +560,11 @@ ipc_handle_compositor_predict_frame(volatile struct ipc_client_state *ics,
 {
 	IPC_TRACE_MARKER();
 
+	// On the hot channel, the main channel might destroy the session.
+	os_mutex_lock((struct os_mutex *)&ics->compositor_lock);
+
 	if (ics->xc == NULL) {
+		os_mutex_unlock((struct os_mutex *)&ics->compositor_lock);
 		return XRT_ERROR_IPC_SESSION_NOT_CREATED;
 	}
 
@@ -485,13 +575,17 @@ ipc_handle_compositor_predict_frame(volatile struct ipc_client_state *ics,
 	ipc_server_activate_session(ics);
 
 	uint64_t gpu_time_ns = 0;
-	return xrt_comp_predict_frame(        //
-	    ics->xc,                          //
-	    out_frame_id,                     //
-	    out_wake_up_time_ns,              //
-	    &gpu_time_ns,                     //
-	    out_predicted_display_time_ns,    //
-	    out_predicted_display_period_ns); //
+	xrt_result_t xret = xrt_comp_predict_frame( //
+	    ics->xc,                                //
+	    out_frame_id,                           //
+	    out_wake_up_time_ns,                    //
+	    &gpu_time_ns,                           //
+	    out_predicted_display_time_ns,          //
+	    out_predicted_display_period_ns);       //
+
+	os_mutex_unlock((struct os_mutex *)&ics->compositor_lock);
+
+	return xret;
 }
 
 xrt_result_t
@@ -530,6 +624,16 @@ ipc_handle_compositor_discard_frame(volatile struct ipc_client_state *ics, int64
 	return xrt_comp_discard_frame(ics->xc, frame_id);
 }
 
+xrt_result_t
+ipc_handle_batch(volatile struct ipc_client_state *ics,
+                 const struct ipc_batch *batch,
+                 struct ipc_batch_results *out_results)
+{
+	IPC_TRACE_MARKER();
+
+	return ipc_dispatch_batch(ics, batch, out_results);
+}
+
 static bool
 _update_projection_layer(struct xrt_compositor *xc,
                          volatile struct ipc_client_state *ics,
@@ -957,11 +1061,39 @@ ipc_handle_system_set_client_info(volatile struct ipc_client_state *ics, const s
 }
 
 xrt_result_t
-ipc_handle_system_get_clients(volatile struct ipc_client_state *_ics, struct ipc_client_list *list)
+ipc_handle_system_get_clients(volatile struct ipc_client_state *_ics, uint32_t *out_id_count, int32_t *out_ids)
 {
+	uint32_t count = 0;
 	for (uint32_t i = 0; i < IPC_MAX_CLIENTS; i++) {
-		list->ids[i] = _ics->server->threads[i].ics.server_thread_index;
+		int32_t id = _ics->server->threads[i].ics.server_thread_index;
+		if (id < 0) {
+			continue;
+		}
+		out_ids[count++] = id;
 	}
+	*out_id_count = count;
+	return XRT_SUCCESS;
+}
+
+xrt_result_t
+ipc_handle_system_get_slow_calls(volatile struct ipc_client_state *ics,
+                                 uint32_t *out_call_count,
+                                 struct ipc_slow_call *out_calls)
+{
+	struct ipc_server *s = ics->server;
+
+	os_mutex_lock(&s->slow_calls.lock);
+
+	// Oldest first.
+	uint32_t total = s->slow_calls.total;
+	uint32_t count = total < IPC_MAX_SLOW_CALLS ? total : IPC_MAX_SLOW_CALLS;
+	for (uint32_t i = 0; i < count; i++) {
+		out_calls[i] = s->slow_calls.calls[(total - count + i) % IPC_MAX_SLOW_CALLS];
+	}
+	*out_call_count = count;
+
+	os_mutex_unlock(&s->slow_calls.lock);
+
 	return XRT_SUCCESS;
 }
 
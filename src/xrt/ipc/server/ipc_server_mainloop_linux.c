@@ -79,7 +79,8 @@ create_listen_socket(struct ipc_server_mainloop *ml, int *out_fd)
 	int fd;
 	int ret;
 
-	fd = socket(PF_UNIX, SOCK_STREAM, 0);
+	// Packets keep message boundaries, calls without a reply are not waited on.
+	fd = socket(PF_UNIX, SOCK_SEQPACKET, 0);
 	if (fd < 0) {
 		U_LOG_E("Message Socket Create Error!");
 		return fd;
@@ -29,6 +29,7 @@
 
 #include "shared/ipc_shmem.h"
 #include "server/ipc_server.h"
+#include "ipc_protocol_generated.h"
 
 #include <conio.h>
 
@@ -54,8 +55,8 @@ create_pipe_instance(struct ipc_server_mainloop *ml, bool first)
 	    dwOpenMode,                     //
 	    dwPipeMode,                     //
 	    IPC_MAX_CLIENTS,                //
-	    IPC_BUF_SIZE,                   //
-	    IPC_BUF_SIZE,                   //
+	    IPC_MAX_REPLY_SIZE,             //
+	    IPC_MAX_MSG_SIZE,               //
 	    0,                              //
 	    nullptr);                       //
 	if (ml->pipe_handle != INVALID_HANDLE_VALUE) {
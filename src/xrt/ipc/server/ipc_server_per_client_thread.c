@@ -9,8 +9,11 @@
  */
 
 #include "util/u_misc.h"
+#include "util/u_time.h"
 #include "util/u_trace_marker.h"
 
+#include "shared/ipc_ring.h"
+#include "shared/ipc_shmem.h"
 #include "server/ipc_server.h"
 #include "ipc_server_generated.h"
 
@@ -20,10 +23,12 @@
 #include <fcntl.h>
 #include <errno.h>
 #include <stdio.h>
+#include <string.h>
 #include <sys/stat.h>
 #include <sys/types.h>
 #include <sys/epoll.h>
 #include <sys/socket.h>
+#include <sys/mman.h>
 
 
 /*
@@ -65,6 +70,54 @@ setup_epoll(volatile struct ipc_client_state *ics)
  *
  */
 
+/*!
+ * Receive one message along with any fds sent with it and dispatch it, returns
+ * false if the channel should be closed.
+ */
+static bool
+receive_and_dispatch(volatile struct ipc_client_state *ics,
+                     struct ipc_message_channel *imc,
+                     uint8_t *buf,
+                     size_t buf_size)
+{
+	size_t len = 0;
+	int fds[XRT_MAX_IPC_HANDLES];
+	uint32_t fd_count = 0;
+	xrt_result_t xret = ipc_receive_message_fds(imc, buf, buf_size, &len, fds, XRT_MAX_IPC_HANDLES, &fd_count);
+	if (xret == XRT_SUCCESS && len == 0 && fd_count == 0) {
+		IPC_INFO(ics->server, "Channel closed by the other end.");
+		return false;
+	}
+	if (xret != XRT_SUCCESS || len < 4) {
+		for (uint32_t i = 0; i < fd_count; i++) {
+			close(fds[i]);
+		}
+		IPC_ERROR(ics->server, "Invalid packet received, disconnecting client.");
+		return false;
+	}
+
+	// Check the first 4 bytes of the message and dispatch.
+	ipc_command_t *ipc_command = (ipc_command_t *)buf;
+
+	IPC_TRACE_BEGIN(ipc_dispatch);
+	xrt_result_t result = ipc_dispatch(ics, imc, ipc_command, len, fds, fd_count);
+	IPC_TRACE_END(ipc_dispatch);
+
+	// Close any fds the call did not take ownership of.
+	for (uint32_t i = 0; i < fd_count; i++) {
+		if (fds[i] >= 0) {
+			close(fds[i]);
+		}
+	}
+
+	if (result != XRT_SUCCESS) {
+		IPC_ERROR(ics->server, "During packet handling, disconnecting client.");
+		return false;
+	}
+
+	return true;
+}
+
 static void
 client_loop(volatile struct ipc_client_state *ics)
 {
@@ -78,7 +131,7 @@ client_loop(volatile struct ipc_client_state *ics)
 		return;
 	}
 
-	uint8_t buf[IPC_BUF_SIZE] = {0};
+	uint8_t buf[IPC_MAX_MSG_SIZE] = {0};
 
 	while (ics->server->running) {
 		const int half_a_second_ms = 500;
@@ -103,22 +156,7 @@ client_loop(volatile struct ipc_client_state *ics)
 		}
 
 		// Finally get the data that is waiting for us.
-		//! @todo replace this call
-		ssize_t len = recv(ics->imc.ipc_handle, &buf, IPC_BUF_SIZE, 0);
-		if (len < 4) {
-			IPC_ERROR(ics->server, "Invalid packet received, disconnecting client.");
-			break;
-		}
-
-		// Check the first 4 bytes of the message and dispatch.
-		ipc_command_t *ipc_command = (ipc_command_t *)buf;
-
-		IPC_TRACE_BEGIN(ipc_dispatch);
-		xrt_result_t result = ipc_dispatch(ics, ipc_command);
-		IPC_TRACE_END(ipc_dispatch);
-
-		if (result != XRT_SUCCESS) {
-			IPC_ERROR(ics->server, "During packet handling, disconnecting client.");
+		if (!receive_and_dispatch(ics, (struct ipc_message_channel *)&ics->imc, buf, sizeof(buf))) {
 			break;
 		}
 	}
@@ -126,6 +164,10 @@ client_loop(volatile struct ipc_client_state *ics)
 	close(epoll_fd);
 	epoll_fd = -1;
 
+	// The ring and channel threads call into the compositor and spaces, stop them first.
+	ipc_server_client_stop_ring(ics);
+	ipc_server_client_close_channels(ics);
+
 	// Multiple threads might be looking at these fields.
 	os_mutex_lock(&ics->server->global_state.lock);
 
@@ -162,7 +204,7 @@ client_loop(volatile struct ipc_client_state *ics)
 
 	IPC_INFO(ics->server, "Client connected");
 
-	uint8_t buf[IPC_BUF_SIZE];
+	uint8_t buf[IPC_MAX_MSG_SIZE];
 
 	while (ics->server->running) {
 		DWORD len;
@@ -183,7 +225,8 @@ client_loop(volatile struct ipc_client_state *ics)
 			ipc_command_t *ipc_command = (ipc_command_t *)buf;
 
 			IPC_TRACE_BEGIN(ipc_dispatch);
-			xrt_result_t result = ipc_dispatch(ics, ipc_command);
+			xrt_result_t result =
+			    ipc_dispatch(ics, (struct ipc_message_channel *)&ics->imc, ipc_command, len, NULL, 0);
 			IPC_TRACE_END(ipc_dispatch);
 
 			if (result != XRT_SUCCESS) {
@@ -193,6 +236,10 @@ client_loop(volatile struct ipc_client_state *ics)
 		}
 	}
 
+	// The ring and channel threads call into the compositor and spaces, stop them first.
+	ipc_server_client_stop_ring(ics);
+	ipc_server_client_close_channels(ics);
+
 	// Multiple threads might be looking at these fields.
 	os_mutex_lock(&ics->server->global_state.lock);
 
@@ -222,12 +269,237 @@ client_loop(volatile struct ipc_client_state *ics)
 
 #endif // XRT_OS_WINDOWS
 
+
+/*
+ *
+ * Ring loop.
+ *
+ */
+
+static void *
+ring_loop(void *_ics)
+{
+	volatile struct ipc_client_state *ics = (volatile struct ipc_client_state *)_ics;
+
+	U_TRACE_SET_THREAD_NAME("IPC Client Ring");
+
+	uint8_t buf[IPC_MAX_MSG_SIZE] = {0};
+
+	while (ics->ring_running && ics->server->running) {
+		size_t size = 0;
+
+		// Time out to be able to notice the server stopping.
+		xrt_result_t xret = ipc_ring_server_receive(ics->ring, buf, sizeof(buf), &size, 500 * U_TIME_1MS_IN_NS);
+		if (xret == XRT_TIMEOUT) {
+			continue;
+		}
+		if (xret != XRT_SUCCESS || size < sizeof(ipc_command_t)) {
+			IPC_ERROR(ics->server, "Invalid message on ring, closing it.");
+			break;
+		}
+
+		// Check the first 4 bytes of the message and dispatch.
+		ipc_command_t *ipc_command = (ipc_command_t *)buf;
+
+		IPC_TRACE_BEGIN(ipc_dispatch);
+		xret = ipc_dispatch_ring(ics, ipc_command, size);
+		IPC_TRACE_END(ipc_dispatch);
+
+		if (xret != XRT_SUCCESS) {
+			IPC_ERROR(ics->server, "During ring message handling, closing it.");
+			break;
+		}
+	}
+
+	// Makes the client fail any call waiting on the ring.
+	ipc_ring_close(ics->ring);
+
+	return NULL;
+}
+
+static void
+destroy_ring(volatile struct ipc_client_state *ics)
+{
+#ifdef XRT_OS_WINDOWS
+	UnmapViewOfFile(ics->ring);
+#else
+	munmap(ics->ring, sizeof(struct ipc_shared_ring));
+#endif
+	ics->ring = NULL;
+
+	// Cast away volatile, the client keeps its own reference to the region.
+	ipc_shmem_destroy((xrt_shmem_handle_t *)&ics->ring_handle);
+}
+
+
+/*
+ *
+ * Channel loop.
+ *
+ */
+
+#ifndef XRT_OS_WINDOWS
+
+static void *
+channel_loop(void *_ch)
+{
+	struct ipc_server_channel *ch = (struct ipc_server_channel *)_ch;
+	volatile struct ipc_client_state *ics = ch->ics;
+
+	U_TRACE_SET_THREAD_NAME("IPC Client Channel");
+
+	uint8_t buf[IPC_MAX_MSG_SIZE] = {0};
+
+	// Blocks until a message arrives, the socket is shut down to stop us.
+	while (ics->server->running) {
+		if (!receive_and_dispatch(ics, &ch->imc, buf, sizeof(buf))) {
+			break;
+		}
+	}
+
+	return NULL;
+}
+
+#endif // !XRT_OS_WINDOWS
+
+
 /*
  *
  * 'Exported' functions.
  *
  */
 
+xrt_result_t
+ipc_server_client_start_ring(volatile struct ipc_client_state *ics)
+{
+	if (!ipc_ring_is_supported()) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	// Already started.
+	if (ics->ring != NULL) {
+		return XRT_SUCCESS;
+	}
+
+	// Each client gets its own region so it can't touch the rings of others.
+	struct ipc_shared_ring *ring = NULL;
+	xrt_shmem_handle_t handle = XRT_SHMEM_HANDLE_INVALID;
+	xrt_result_t xret = ipc_shmem_create(sizeof(struct ipc_shared_ring), &handle, (void **)&ring);
+	if (xret != XRT_SUCCESS) {
+		IPC_ERROR(ics->server, "Failed to create ring shared memory.");
+		return xret;
+	}
+
+	ipc_ring_reset(ring);
+
+	ics->ring = ring;
+	ics->ring_handle = handle;
+	ics->ring_running = true;
+
+	// Cast away volatile.
+	os_thread_init((struct os_thread *)&ics->ring_thread);
+	int ret = os_thread_start((struct os_thread *)&ics->ring_thread, ring_loop, (void *)ics);
+	if (ret != 0) {
+		IPC_ERROR(ics->server, "Failed to start ring thread '%i'.", ret);
+		os_thread_destroy((struct os_thread *)&ics->ring_thread);
+		ics->ring_running = false;
+		destroy_ring(ics);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	return XRT_SUCCESS;
+}
+
+void
+ipc_server_client_stop_ring(volatile struct ipc_client_state *ics)
+{
+	if (ics->ring == NULL) {
+		return;
+	}
+
+	ics->ring_running = false;
+	ipc_ring_wake_server(ics->ring);
+
+	// Cast away volatile.
+	os_thread_join((struct os_thread *)&ics->ring_thread);
+	os_thread_destroy((struct os_thread *)&ics->ring_thread);
+
+	destroy_ring(ics);
+}
+
+xrt_result_t
+ipc_server_client_open_channel(volatile struct ipc_client_state *ics,
+                               uint32_t channel_id,
+                               xrt_ipc_handle_t *out_handle)
+{
+#ifdef XRT_OS_WINDOWS
+	// Would need a second named pipe instance.
+	return XRT_ERROR_IPC_FAILURE;
+#else
+	if (channel_id == 0 || channel_id >= IPC_CHANNEL_COUNT) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	// Cast away volatile.
+	struct ipc_server_channel *ch = (struct ipc_server_channel *)&ics->channels[channel_id];
+	if (ch->open) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	int fds[2];
+	int ret = socketpair(AF_UNIX, SOCK_SEQPACKET | SOCK_CLOEXEC, 0, fds);
+	if (ret < 0) {
+		IPC_ERROR(ics->server, "Failed to create channel socket pair: '%s'", strerror(errno));
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	ch->ics = ics;
+	ch->imc.ipc_handle = fds[0];
+	ch->imc.log_level = ics->imc.log_level;
+	ch->client_handle = fds[1];
+
+	os_thread_init(&ch->thread);
+	ret = os_thread_start(&ch->thread, channel_loop, ch);
+	if (ret != 0) {
+		IPC_ERROR(ics->server, "Failed to start channel thread '%i'.", ret);
+		os_thread_destroy(&ch->thread);
+		ipc_message_channel_close(&ch->imc);
+		close(ch->client_handle);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	ch->open = true;
+	*out_handle = ch->client_handle;
+
+	return XRT_SUCCESS;
+#endif
+}
+
+void
+ipc_server_client_close_channels(volatile struct ipc_client_state *ics)
+{
+#ifndef XRT_OS_WINDOWS
+	for (uint32_t i = 1; i < IPC_MAX_CHANNELS; i++) {
+		// Cast away volatile.
+		struct ipc_server_channel *ch = (struct ipc_server_channel *)&ics->channels[i];
+		if (!ch->open) {
+			continue;
+		}
+
+		// Wakes the thread up with an end of stream.
+		shutdown(ch->imc.ipc_handle, SHUT_RDWR);
+
+		os_thread_join(&ch->thread);
+		os_thread_destroy(&ch->thread);
+
+		ipc_message_channel_close(&ch->imc);
+		close(ch->client_handle);
+		ch->client_handle = XRT_IPC_HANDLE_INVALID;
+		ch->open = false;
+	}
+#endif
+}
+
 void
 ipc_server_client_destroy_compositor(volatile struct ipc_client_state *ics)
 {
@@ -252,8 +524,14 @@ ipc_server_client_destroy_compositor(volatile struct ipc_client_state *ics)
 
 	os_mutex_unlock(&ics->server->global_state.lock);
 
-	// Cast away volatile.
-	xrt_comp_destroy((struct xrt_compositor **)&ics->xc);
+	// Calls on other channels might be using it, take it away from them first.
+	os_mutex_lock((struct os_mutex *)&ics->compositor_lock);
+	struct xrt_compositor *xc = (struct xrt_compositor *)ics->xc;
+	ics->xc = NULL;
+	os_mutex_unlock((struct os_mutex *)&ics->compositor_lock);
+
+	// Can take a while, so not done with the lock held.
+	xrt_comp_destroy(&xc);
 }
 
 void *
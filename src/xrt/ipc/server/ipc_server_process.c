@@ -28,6 +28,8 @@
 #include "util/u_git_tag.h"
 
 #include "shared/ipc_shmem.h"
+#include "shared/ipc_stats.h"
+#include "shared/ipc_capture.h"
 #include "server/ipc_server.h"
 
 #include <stdlib.h>
@@ -49,6 +51,9 @@
 
 DEBUG_GET_ONCE_BOOL_OPTION(exit_on_disconnect, "IPC_EXIT_ON_DISCONNECT", false)
 DEBUG_GET_ONCE_LOG_OPTION(ipc_log, "IPC_LOG", U_LOGGING_WARN)
+#ifdef XRT_FEATURE_IPC_CAPTURE
+DEBUG_GET_ONCE_OPTION(ipc_capture, "IPC_CAPTURE", NULL)
+#endif
 
 
 /*
@@ -125,6 +130,14 @@ teardown_idevs(struct ipc_server *s)
 static void
 teardown_all(struct ipc_server *s)
 {
+#ifdef XRT_FEATURE_IPC_INSTRUMENTATION
+	ipc_stats_dump(stderr);
+#endif
+
+#ifdef XRT_FEATURE_IPC_CAPTURE
+	ipc_capture_stop();
+#endif
+
 	u_var_remove_root(s);
 
 	xrt_syscomp_destroy(&s->xsysc);
@@ -141,6 +154,13 @@ teardown_all(struct ipc_server *s)
 	u_process_destroy(s->process);
 
 	os_mutex_destroy(&s->global_state.lock);
+	os_mutex_destroy(&s->slow_calls.lock);
+
+	for (uint32_t i = 0; i < IPC_MAX_CLIENTS; i++) {
+		// Cast away volatile.
+		os_mutex_destroy((struct os_mutex *)&s->threads[i].ics.compositor_lock);
+		os_mutex_destroy((struct os_mutex *)&s->threads[i].ics.spaces_lock);
+	}
 }
 
 static int
@@ -430,6 +450,8 @@ ipc_server_start_client_listener_thread(struct ipc_server *vs, xrt_ipc_handle_t
 	ics->server = vs;
 	ics->server_thread_index = cs_index;
 	ics->io_active = true;
+	vs->ism->deferred_results[cs_index] = XRT_SUCCESS;
+	memset(&vs->ism->call_counters[cs_index], 0, sizeof(vs->ism->call_counters[cs_index]));
 	os_thread_start(&it->thread, ipc_server_client_thread, (void *)ics);
 
 	// Unlock when we are done.
@@ -449,6 +471,26 @@ init_all(struct ipc_server *s)
 		return ret;
 	}
 
+	ret = os_mutex_init(&s->slow_calls.lock);
+	if (ret < 0) {
+		IPC_ERROR(s, "Slow calls lock mutex failed to init!");
+		teardown_all(s);
+		return ret;
+	}
+
+	for (uint32_t i = 0; i < IPC_MAX_CLIENTS; i++) {
+		// Cast away volatile.
+		ret = os_mutex_init((struct os_mutex *)&s->threads[i].ics.compositor_lock);
+		if (ret == 0) {
+			ret = os_mutex_init((struct os_mutex *)&s->threads[i].ics.spaces_lock);
+		}
+		if (ret < 0) {
+			IPC_ERROR(s, "Client lock mutexes failed to init!");
+			teardown_all(s);
+			return ret;
+		}
+	}
+
 	s->process = u_process_create_if_not_running();
 
 	if (!s->process) {
@@ -462,6 +504,14 @@ init_all(struct ipc_server *s)
 	s->exit_on_disconnect = debug_get_bool_option_exit_on_disconnect();
 	s->log_level = debug_get_log_option_ipc_log();
 
+#ifdef XRT_FEATURE_IPC_CAPTURE
+	const char *capture_path = debug_get_option_ipc_capture();
+	if (capture_path != NULL) {
+		// Not fatal, the service works fine without it.
+		ipc_capture_start(capture_path);
+	}
+#endif
+
 	xret = xrt_instance_create(NULL, &s->xinst);
 	if (xret != XRT_SUCCESS) {
 		IPC_ERROR(s, "Failed to create instance!");
@@ -538,6 +588,7 @@ init_server_state(struct ipc_server *s)
 		volatile struct ipc_client_state *ics = &s->threads[i].ics;
 		ics->server = s;
 		ics->server_thread_index = -1;
+		ics->ring_handle = XRT_SHMEM_HANDLE_INVALID;
 	}
 }
 
@@ -771,6 +822,38 @@ ipc_server_update_state(struct ipc_server *s)
 	os_mutex_unlock(&s->global_state.lock);
 }
 
+void
+ipc_server_record_slow_call(volatile struct ipc_client_state *ics,
+                            uint32_t cmd,
+                            uint64_t timestamp_ns,
+                            const void *msg,
+                            size_t msg_size,
+                            uint64_t handler_ns,
+                            uint64_t budget_ns)
+{
+	struct ipc_server *s = ics->server;
+
+	// Only taken for calls over budget, so not on the fast path.
+	os_mutex_lock(&s->slow_calls.lock);
+
+	struct ipc_slow_call *sc = &s->slow_calls.calls[s->slow_calls.total % IPC_MAX_SLOW_CALLS];
+	s->slow_calls.total++;
+
+	U_ZERO(sc);
+	sc->timestamp_ns = timestamp_ns;
+	sc->handler_ns = handler_ns;
+	sc->budget_ns = budget_ns;
+	sc->client_id = (uint32_t)ics->server_thread_index;
+	sc->cmd = cmd;
+	sc->msg_size = (uint32_t)msg_size;
+	memcpy(sc->msg, msg, msg_size < sizeof(sc->msg) ? msg_size : sizeof(sc->msg));
+
+	os_mutex_unlock(&s->slow_calls.lock);
+
+	IPC_DEBUG(s, "%s took %" PRIu64 "us, budget %" PRIu64 "us", ipc_cmd_to_str((ipc_command_t)cmd),
+	          handler_ns / 1000, budget_ns / 1000);
+}
+
 #ifndef XRT_OS_ANDROID
 int
 ipc_server_main(int argc, char **argv)
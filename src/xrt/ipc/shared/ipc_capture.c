@@ -0,0 +1,310 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Capture of the IPC calls made to the service, for replaying later.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#include "xrt/xrt_compiler.h"
+
+#include "os/os_time.h"
+#include "os/os_threading.h"
+
+#include "util/u_misc.h"
+#include "util/u_logging.h"
+#include "util/u_time.h"
+
+#include "shared/ipc_capture.h"
+
+#include <stdio.h>
+#include <string.h>
+
+
+/*
+ *
+ * Structs and defines.
+ *
+ */
+
+//! Must be a power of two.
+#define CAPTURE_SLOT_COUNT 1024
+
+/*!
+ * One record in the queue, the sequence number tells producers and the
+ * writer thread who owns the slot, see @ref capture_push.
+ */
+struct capture_slot
+{
+	volatile uint32_t seq;
+	struct ipc_capture_record record;
+	uint8_t data[IPC_MAX_MSG_SIZE + IPC_MAX_REPLY_SIZE];
+};
+
+struct capture
+{
+	struct os_thread_helper oth;
+
+	FILE *file;
+
+	struct capture_slot *slots;
+
+	//! Next sequence number to hand out to a producer.
+	volatile uint32_t push_seq;
+
+	//! Next sequence number for the writer thread, only touched by it.
+	uint32_t pop_seq;
+
+	volatile uint32_t dropped;
+
+	//! Set once everything is set up, records are dropped until then.
+	volatile uint32_t running;
+};
+
+static struct capture capture;
+
+
+/*
+ *
+ * Helpers.
+ *
+ */
+
+static inline uint32_t
+atomic_load_u32(volatile uint32_t *p)
+{
+#if defined(__GNUC__)
+	return __atomic_load_n(p, __ATOMIC_ACQUIRE);
+#elif defined(_MSC_VER)
+	uint32_t value = *p;
+	MemoryBarrier();
+	return value;
+#else
+#error "compiler not supported"
+#endif
+}
+
+static inline void
+atomic_store_u32(volatile uint32_t *p, uint32_t value)
+{
+#if defined(__GNUC__)
+	__atomic_store_n(p, value, __ATOMIC_RELEASE);
+#elif defined(_MSC_VER)
+	MemoryBarrier();
+	*p = value;
+#else
+#error "compiler not supported"
+#endif
+}
+
+static inline uint32_t
+atomic_cmpxchg_u32(volatile uint32_t *p, uint32_t old_, uint32_t new_)
+{
+#if defined(__GNUC__)
+	return __sync_val_compare_and_swap(p, old_, new_);
+#elif defined(_MSC_VER)
+	return (uint32_t)InterlockedCompareExchange((volatile LONG *)p, (LONG)new_, (LONG)old_);
+#else
+#error "compiler not supported"
+#endif
+}
+
+static inline void
+atomic_inc_u32(volatile uint32_t *p)
+{
+#if defined(__GNUC__)
+	__sync_fetch_and_add(p, 1);
+#elif defined(_MSC_VER)
+	InterlockedIncrement((volatile LONG *)p);
+#else
+#error "compiler not supported"
+#endif
+}
+
+/*!
+ * Bounded multiple producer queue: a slot is free for the producer holding
+ * sequence number N when its seq is N, and ready for the writer when it is
+ * N + 1. The writer hands it back by setting it to N + CAPTURE_SLOT_COUNT.
+ */
+static bool
+capture_push(uint32_t client_id,
+             uint64_t timestamp_ns,
+             const void *msg,
+             uint32_t msg_size,
+             const void *reply,
+             uint32_t reply_size)
+{
+	struct capture_slot *slot;
+	uint32_t pos = atomic_load_u32(&capture.push_seq);
+
+	while (true) {
+		slot = &capture.slots[pos & (CAPTURE_SLOT_COUNT - 1)];
+		int32_t diff = (int32_t)(atomic_load_u32(&slot->seq) - pos);
+
+		if (diff < 0) {
+			// The writer has not gotten to this slot yet, full.
+			return false;
+		}
+
+		if (diff == 0) {
+			uint32_t prev = atomic_cmpxchg_u32(&capture.push_seq, pos, pos + 1);
+			if (prev == pos) {
+				break;
+			}
+			pos = prev;
+		} else {
+			pos = atomic_load_u32(&capture.push_seq);
+		}
+	}
+
+	slot->record.timestamp_ns = timestamp_ns;
+	slot->record.client_id = client_id;
+	slot->record.cmd = msg_size >= sizeof(uint32_t) ? *(const uint32_t *)msg : 0;
+	slot->record.msg_size = msg_size;
+	slot->record.reply_size = reply_size;
+	memcpy(slot->data, msg, msg_size);
+	if (reply_size > 0) {
+		memcpy(slot->data + msg_size, reply, reply_size);
+	}
+
+	atomic_store_u32(&slot->seq, pos + 1);
+
+	return true;
+}
+
+//! Write out all ready records, returns the number written.
+static uint32_t
+capture_drain(void)
+{
+	uint32_t count = 0;
+
+	while (true) {
+		uint32_t pos = capture.pop_seq;
+		struct capture_slot *slot = &capture.slots[pos & (CAPTURE_SLOT_COUNT - 1)];
+		if (atomic_load_u32(&slot->seq) != pos + 1) {
+			break;
+		}
+
+		fwrite(&slot->record, sizeof(slot->record), 1, capture.file);
+		fwrite(slot->data, slot->record.msg_size + slot->record.reply_size, 1, capture.file);
+
+		atomic_store_u32(&slot->seq, pos + CAPTURE_SLOT_COUNT);
+		capture.pop_seq = pos + 1;
+		count++;
+	}
+
+	return count;
+}
+
+static void *
+capture_thread(void *ptr)
+{
+	os_thread_helper_name(&capture.oth, "IPC Capture");
+
+	while (os_thread_helper_is_running(&capture.oth)) {
+		if (capture_drain() == 0) {
+			fflush(capture.file);
+			os_nanosleep(U_TIME_1MS_IN_NS);
+		}
+	}
+
+	capture_drain();
+	fflush(capture.file);
+
+	return NULL;
+}
+
+
+/*
+ *
+ * 'Exported' functions.
+ *
+ */
+
+xrt_result_t
+ipc_capture_start(const char *path)
+{
+	if (capture.running) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	capture.file = fopen(path, "wb");
+	if (capture.file == NULL) {
+		U_LOG_E("Could not open IPC capture file '%s'", path);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	if (capture.slots == NULL) {
+		capture.slots = U_TYPED_ARRAY_CALLOC(struct capture_slot, CAPTURE_SLOT_COUNT);
+	}
+	for (uint32_t i = 0; i < CAPTURE_SLOT_COUNT; i++) {
+		capture.slots[i].seq = i;
+	}
+	capture.push_seq = 0;
+	capture.pop_seq = 0;
+	capture.dropped = 0;
+
+	struct ipc_capture_header header = {
+	    .version = IPC_CAPTURE_VERSION,
+	    .command_count = IPC_COMMAND_COUNT,
+	};
+	memcpy(header.magic, IPC_CAPTURE_MAGIC, sizeof(header.magic));
+	fwrite(&header, sizeof(header), 1, capture.file);
+	for (uint32_t i = 0; i < IPC_COMMAND_COUNT; i++) {
+		const char *name = ipc_cmd_to_str((ipc_command_t)i);
+		fwrite(name, strlen(name) + 1, 1, capture.file);
+	}
+
+	os_thread_helper_init(&capture.oth);
+	if (os_thread_helper_start(&capture.oth, capture_thread, NULL) != 0) {
+		os_thread_helper_destroy(&capture.oth);
+		fclose(capture.file);
+		capture.file = NULL;
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	atomic_store_u32(&capture.running, 1);
+
+	U_LOG_I("Capturing IPC calls to '%s'", path);
+
+	return XRT_SUCCESS;
+}
+
+void
+ipc_capture_stop(void)
+{
+	if (!capture.running) {
+		return;
+	}
+
+	// Nothing more gets pushed, the thread writes what is left when stopping.
+	atomic_store_u32(&capture.running, 0);
+	os_thread_helper_destroy(&capture.oth);
+
+	if (capture.dropped > 0) {
+		U_LOG_W("Dropped %u IPC capture records, the file is incomplete", capture.dropped);
+	}
+
+	// The slots are kept, client threads might still be finishing a push.
+	fclose(capture.file);
+	capture.file = NULL;
+}
+
+void
+ipc_capture_record(uint32_t client_id,
+                   uint64_t timestamp_ns,
+                   const void *msg,
+                   size_t msg_size,
+                   const void *reply,
+                   size_t reply_size)
+{
+	if (!atomic_load_u32(&capture.running)) {
+		return;
+	}
+
+	if (msg_size > IPC_MAX_MSG_SIZE || reply_size > IPC_MAX_REPLY_SIZE ||
+	    !capture_push(client_id, timestamp_ns, msg, (uint32_t)msg_size, reply, (uint32_t)reply_size)) {
+		atomic_inc_u32(&capture.dropped);
+	}
+}
@@ -0,0 +1,103 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Capture of the IPC calls made to the service, for replaying later.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#pragma once
+
+#include "shared/ipc_protocol.h"
+#include "ipc_protocol_generated.h"
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+
+/*!
+ * Magic at the start of a capture file.
+ *
+ * @ingroup ipc_shared
+ */
+#define IPC_CAPTURE_MAGIC "MNDIPCAP"
+
+/*!
+ * Bumped when the layout of the file changes, not when the protocol does.
+ *
+ * @ingroup ipc_shared
+ */
+#define IPC_CAPTURE_VERSION 1
+
+/*!
+ * Start of a capture file, all values are in host byte order. It is followed
+ * by @p command_count NUL terminated command names, indexed by the command,
+ * so that captures can be read even if the commands have been renumbered.
+ * After that come the records.
+ *
+ * @ingroup ipc_shared
+ */
+struct ipc_capture_header
+{
+	char magic[8];
+	uint32_t version;
+	uint32_t command_count;
+};
+
+/*!
+ * A single call, followed by @p msg_size bytes of message and @p reply_size
+ * bytes of reply. Handles are not captured. The calls in a batch are recorded
+ * one by one as they run, with their result as the reply, instead of the
+ * batch call itself.
+ *
+ * @ingroup ipc_shared
+ */
+struct ipc_capture_record
+{
+	//! When the message was received, monotonic time.
+	uint64_t timestamp_ns;
+	//! The client thread index of the client, stays the same for a connection.
+	uint32_t client_id;
+	uint32_t cmd;
+	uint32_t msg_size;
+	//! Zero for calls without a reply.
+	uint32_t reply_size;
+};
+
+/*!
+ * Open the file and start the thread writing to it, records are dropped until
+ * this has been called.
+ *
+ * @ingroup ipc_shared
+ */
+xrt_result_t
+ipc_capture_start(const char *path);
+
+/*!
+ * Write out everything recorded so far and close the file.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_capture_stop(void);
+
+/*!
+ * Record a call, safe to call from any thread and never blocks. The record is
+ * dropped if the writing thread can not keep up.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_capture_record(uint32_t client_id,
+                   uint64_t timestamp_ns,
+                   const void *msg,
+                   size_t msg_size,
+                   const void *reply,
+                   size_t reply_size);
+
+
+#ifdef __cplusplus
+}
+#endif
@@ -26,7 +26,7 @@
 
 
 #define IPC_CRED_SIZE 1    // auth not implemented
-#define IPC_BUF_SIZE 512   // must be >= largest message length in bytes
+#define IPC_BUF_SIZE 512   // ceiling for messages, use the generated IPC_MAX_MSG_SIZE for buffers
 #define IPC_MAX_VIEWS 8    // max views we will return configs for
 #define IPC_MAX_FORMATS 32 // max formats our server-side compositor supports
 #define IPC_MAX_DEVICES 8  // max number of devices we will map using shared mem
@@ -34,6 +34,13 @@
 #define IPC_MAX_SLOTS 128
 #define IPC_MAX_CLIENTS 8
 #define IPC_EVENT_QUEUE_SIZE 32
+#define IPC_RING_SIZE 2048 // bytes per direction, power of two and >= IPC_BUF_SIZE
+#define IPC_BATCH_MAX_CALLS 16
+#define IPC_BATCH_DATA_SIZE 448 // the batch call message must fit in IPC_BUF_SIZE
+#define IPC_MAX_CHANNELS 4 // including the main channel
+#define IPC_MAX_COMMANDS 128 // checked by the generated code
+#define IPC_MAX_SLOW_CALLS 16
+#define IPC_SLOW_CALL_MSG_SIZE 64 // longer messages are cut short
 
 #define IPC_SHARED_MAX_INPUTS 1024
 #define IPC_SHARED_MAX_OUTPUTS 128
@@ -166,6 +173,97 @@ struct ipc_layer_slot
 	struct ipc_layer_entry layers[IPC_MAX_LAYERS];
 };
 
+/*!
+ * One direction of a @ref ipc_shared_ring, a single producer single consumer
+ * byte ring. Each message is a uint32_t size followed by the message padded to
+ * four bytes. The counters only grow and wrap around at UINT32_MAX.
+ *
+ * @ingroup ipc
+ */
+struct ipc_shared_ring_buffer
+{
+	//! Bytes written by the producer, also the futex word the consumer sleeps on.
+	uint32_t head;
+
+	//! Bytes read by the consumer.
+	uint32_t tail;
+
+	//! Set by the consumer before it sleeps, so the producer knows to wake it.
+	uint32_t waiting;
+
+	uint32_t _pad;
+
+	uint8_t data[IPC_RING_SIZE];
+};
+
+/*!
+ * Ring used instead of the socket for calls marked with the shmem transport,
+ * each client gets its own in a separate shared memory region so it can not
+ * touch the rings of other clients, see @ref ipc_ring.h for the functions
+ * using it.
+ *
+ * @ingroup ipc
+ */
+struct ipc_shared_ring
+{
+	//! Client to server.
+	struct ipc_shared_ring_buffer requests;
+
+	//! Server to client.
+	struct ipc_shared_ring_buffer replies;
+
+	//! Set by the server when it stops servicing the ring.
+	uint32_t closed;
+};
+
+/*!
+ * Always on counters of one command for one client, kept up to date by the
+ * service so that tools can read them live.
+ *
+ * @ingroup ipc
+ */
+struct ipc_call_counter
+{
+	//! Number of calls handled.
+	uint64_t count;
+	//! Number of calls where the handler did not return XRT_SUCCESS.
+	uint64_t errors;
+	//! Total time spent in the handler.
+	uint64_t handler_ns;
+};
+
+/*!
+ * The call counters of a client, indexed by the command.
+ *
+ * @ingroup ipc
+ */
+struct ipc_client_call_counters
+{
+	struct ipc_call_counter calls[IPC_MAX_COMMANDS];
+};
+
+/*!
+ * A call where the handler took longer than the budget given in the protocol,
+ * recorded by a service built with XRT_FEATURE_IPC_BUDGETS.
+ *
+ * @ingroup ipc
+ */
+struct ipc_slow_call
+{
+	//! When the handler was called, monotonic time.
+	uint64_t timestamp_ns;
+	//! Time spent in the handler.
+	uint64_t handler_ns;
+	//! The budget of the call.
+	uint64_t budget_ns;
+	//! The client thread index of the client.
+	uint32_t client_id;
+	uint32_t cmd;
+	//! Size of the whole message, only the start of it is kept in @ref msg.
+	uint32_t msg_size;
+	uint8_t msg[IPC_SLOW_CALL_MSG_SIZE];
+};
+
 /*!
  * A big struct that contains all data that is shared to a client, no pointers
  * allowed in this. To get the inputs of a device you go:
@@ -184,7 +282,8 @@ struct ipc_layer_slot
 struct ipc_shared_memory
 {
 	/*!
-	 * The git revision of the service, used by clients to detect version mismatches.
+	 * The git revision of the service, only informational: clients detect
+	 * mismatches with the protocol fingerprint, see ipc_protocol_fingerprint.
 	 */
 	char u_git_tag[IPC_VERSION_NAME_LEN];
 
@@ -266,12 +365,16 @@ struct ipc_shared_memory
 
 	struct ipc_layer_slot slots[IPC_MAX_SLOTS];
 
-	uint64_t startup_timestamp;
-};
+	/*!
+	 * Per client the first error from a call without a reply, an
+	 * xrt_result_t, cleared when the client picks it up.
+	 */
+	xrt_atomic_s32_t deferred_results[IPC_MAX_CLIENTS];
 
-struct ipc_client_list
-{
-	int32_t ids[IPC_MAX_CLIENTS];
+	//! Per client counters of every call, cleared when a client connects.
+	struct ipc_client_call_counters call_counters[IPC_MAX_CLIENTS];
+
+	uint64_t startup_timestamp;
 };
 
 /*!
@@ -310,3 +413,32 @@ struct ipc_info_get_view_poses_2
 	struct xrt_pose poses[2];
 	struct xrt_space_relation head_relation;
 };
+
+/*!
+ * Several calls packed back to back, built with the generated ipc_batch_*
+ * functions and sent with ipc_call_batch. Only calls marked batchable in the
+ * protocol can be added. The server runs them in order and stops at the
+ * first call that fails.
+ */
+struct ipc_batch
+{
+	//! Number of calls in @ref data.
+	uint32_t call_count;
+
+	//! Number of bytes used in @ref data.
+	uint32_t size;
+
+	//! The message structs of the calls.
+	uint8_t data[IPC_BATCH_DATA_SIZE];
+};
+
+/*!
+ * Results of the calls in a @ref ipc_batch.
+ */
+struct ipc_batch_results
+{
+	//! Number of calls that ran, the last one failed if less than all of them.
+	uint32_t call_count;
+
+	xrt_result_t results[IPC_BATCH_MAX_CALLS];
+};
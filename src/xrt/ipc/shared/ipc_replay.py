@@ -0,0 +1,159 @@
+#!/usr/bin/env python3
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""Replay a capture of IPC calls against a running service.
+
+Captures are written by a service built with XRT_FEATURE_IPC_CAPTURE when
+IPC_CAPTURE is set to a file. Every connection in the capture gets its own
+connection and thread, and the calls are made with the original spacing,
+divided by the speed. Calls that send handles can not be replayed and are
+skipped. Batched calls are captured, and so replayed, one by one. Ids handed
+out by the service, like swapchain ids, are replayed as captured so they only
+line up if the service does the same thing again.
+
+Needs the layout written by `monado-ctl -w` of the service build, see
+ipc_tool.py.
+"""
+
+import argparse
+import os
+import socket
+import statistics
+import sys
+import threading
+import time
+
+from ipcproto.capture import Capture
+from ipcproto.connection import socket_path
+from ipcproto.wire import Layout
+
+# Calls made later than this are counted as late.
+LATE_S = 0.001
+
+
+def wait_for(record, start, first_ns, speed):
+    """Sleep until the record is due, returns False if it is already late."""
+    if speed <= 0:
+        return True
+    due = start + (record.timestamp_ns - first_ns) / 1e9 / speed
+    delay = due - time.monotonic()
+    if delay > 0:
+        time.sleep(delay)
+    return delay > -LATE_S
+
+
+def replay_session(sock, records, layout, start, first_ns, speed, stats):
+    """Make the calls of one connection, sleeping to keep the spacing."""
+    # Captures name the commands by their enum value, like IPC_BATCH.
+    calls = {call.call.id: call for call in layout.calls}
+    for record in records:
+        call = calls.get(record.name)
+        if call is None or call.call.in_handles:
+            stats["skipped"] += 1
+            continue
+
+        if not wait_for(record, start, first_ns, speed):
+            stats["late"] += 1
+
+        # The numbers of the commands might have changed since the capture.
+        msg = call.id.to_bytes(4, sys.byteorder) + record.msg[4:]
+
+        t = time.monotonic_ns()
+        sock.send(msg)
+        if call.call.reply:
+            data, fds, _, _ = socket.recv_fds(sock, len(record.reply) + 1,
+                                              layout.max_handles)
+            for fd in fds:
+                os.close(fd)
+            if data[:4] != record.reply[:4]:
+                stats["mismatches"] += 1
+        stats["latencies"].setdefault(record.name, []).append(
+            time.monotonic_ns() - t)
+        stats["calls"] += 1
+
+
+def new_stats():
+    """Get empty stats, every session has its own."""
+    return {"calls": 0, "skipped": 0, "late": 0, "mismatches": 0,
+            "failed": 0, "latencies": {}}
+
+
+def session_thread(args, records, layout, start, first_ns, stats):
+    """Replay one connection, connecting and disconnecting like the client."""
+    # Connect when the client did.
+    wait_for(records[0], start, first_ns, args.speed)
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+    try:
+        sock.connect(args.socket or socket_path(layout.socket))
+        replay_session(sock, records, layout, start, first_ns, args.speed,
+                       stats)
+    except OSError as e:
+        stats["failed"] += 1
+        print("Session failed: %s" % e)
+    finally:
+        sock.close()
+
+
+def main():
+    """Handle command line and replay the capture."""
+    parser = argparse.ArgumentParser(description='IPC capture replayer.')
+    parser.add_argument(
+        'capture', help='Capture file written by the service')
+    parser.add_argument(
+        '--proto', default=os.path.join(os.path.dirname(__file__),
+                                        'proto.json'),
+        help='Protocol file to use')
+    parser.add_argument(
+        '--layout', default='ipc_layout.json',
+        help='Layout written by monado-ctl -w')
+    parser.add_argument(
+        '--speed', type=float, default=1.0,
+        help='How much faster than captured, 0 for as fast as possible')
+    parser.add_argument(
+        '--socket', help='Service socket, found like the service does if unset')
+    args = parser.parse_args()
+
+    layout = Layout.load(args.proto, args.layout)
+    capture = Capture.load(args.capture)
+    if not capture.records:
+        print("Capture is empty")
+        return
+
+    first_ns = min(record.timestamp_ns for record in capture.records)
+    start = time.monotonic()
+
+    threads = []
+    session_stats = []
+    for records in capture.sessions():
+        session_stats.append(new_stats())
+        thread = threading.Thread(
+            target=session_thread,
+            args=(args, records, layout, start, first_ns, session_stats[-1]))
+        threads.append(thread)
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    stats = new_stats()
+    for session in session_stats:
+        for key, value in session.items():
+            if key == "latencies":
+                for name, latencies in value.items():
+                    stats[key].setdefault(name, []).extend(latencies)
+            else:
+                stats[key] += value
+
+    elapsed = time.monotonic() - start
+    print("sessions: %d, failed: %d" % (len(threads), stats["failed"]))
+    print("calls: %d in %.2fs, skipped: %d, late: %d, result mismatches: %d" % (
+        stats["calls"], elapsed, stats["skipped"], stats["late"],
+        stats["mismatches"]))
+    print("%-44s %10s %10s %10s" % ("command", "count", "p50_us", "max_us"))
+    for name, latencies in sorted(stats["latencies"].items()):
+        print("%-44s %10d %10.1f %10.1f" % (
+            name, len(latencies), statistics.median(latencies) / 1000,
+            max(latencies) / 1000))
+
+
+if __name__ == "__main__":
+    main()
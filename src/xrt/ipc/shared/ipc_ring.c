@@ -0,0 +1,363 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Shared memory ring transport for IPC calls.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#include "xrt/xrt_config_os.h"
+
+#include "util/u_logging.h"
+
+#include "shared/ipc_ring.h"
+
+#include <string.h>
+
+#ifdef XRT_OS_LINUX
+#include <errno.h>
+#include <limits.h>
+#include <time.h>
+#include <unistd.h>
+#include <linux/futex.h>
+#include <sys/socket.h>
+#include <sys/syscall.h>
+#endif
+
+
+#if (IPC_RING_SIZE & (IPC_RING_SIZE - 1)) != 0 || IPC_RING_SIZE < IPC_BUF_SIZE
+#error "IPC_RING_SIZE must be a power of two and at least IPC_BUF_SIZE"
+#endif
+
+//! How long the client sleeps before checking that the server is still alive.
+#define CLIENT_CHECK_INTERVAL_NS (100 * 1000 * 1000)
+
+
+#ifdef XRT_OS_LINUX
+
+/*
+ *
+ * Helpers.
+ *
+ */
+
+static inline void
+cpu_relax(void)
+{
+#if defined(__x86_64__) || defined(__i386__)
+	__builtin_ia32_pause();
+#elif defined(__aarch64__) || defined(__arm__)
+	__asm__ volatile("yield");
+#endif
+}
+
+static inline uint32_t
+padded_size(uint32_t size)
+{
+	return sizeof(uint32_t) + ((size + 3) & ~3u);
+}
+
+static void
+futex_wait(uint32_t *addr, uint32_t value, uint64_t timeout_ns)
+{
+	struct timespec ts = {
+	    .tv_sec = (time_t)(timeout_ns / 1000000000),
+	    .tv_nsec = (long)(timeout_ns % 1000000000),
+	};
+
+	// Not private, the word is in memory shared between processes.
+	syscall(SYS_futex, addr, FUTEX_WAIT, value, &ts, NULL, 0);
+}
+
+static void
+futex_wake(uint32_t *addr)
+{
+	syscall(SYS_futex, addr, FUTEX_WAKE, INT_MAX, NULL, NULL, 0);
+}
+
+static void
+copy_in(struct ipc_shared_ring_buffer *rb, uint32_t pos, const void *data, uint32_t size)
+{
+	uint32_t offset = pos & (IPC_RING_SIZE - 1);
+	uint32_t first = IPC_RING_SIZE - offset < size ? IPC_RING_SIZE - offset : size;
+
+	memcpy(&rb->data[offset], data, first);
+	memcpy(&rb->data[0], (const uint8_t *)data + first, size - first);
+}
+
+static void
+copy_out(const struct ipc_shared_ring_buffer *rb, uint32_t pos, void *out_data, uint32_t size)
+{
+	uint32_t offset = pos & (IPC_RING_SIZE - 1);
+	uint32_t first = IPC_RING_SIZE - offset < size ? IPC_RING_SIZE - offset : size;
+
+	memcpy(out_data, &rb->data[offset], first);
+	memcpy((uint8_t *)out_data + first, &rb->data[0], size - first);
+}
+
+static xrt_result_t
+ring_write(struct ipc_shared_ring_buffer *rb, const void *data, size_t size)
+{
+	if (size == 0 || padded_size((uint32_t)size) > IPC_RING_SIZE) {
+		U_LOG_E("Message of %u bytes does not fit in the ring", (uint32_t)size);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	uint32_t size32 = (uint32_t)size;
+	uint32_t head = __atomic_load_n(&rb->head, __ATOMIC_RELAXED);
+	uint32_t tail = __atomic_load_n(&rb->tail, __ATOMIC_ACQUIRE);
+
+	// There is only ever one call in flight, so this means a broken peer.
+	if (padded_size(size32) > IPC_RING_SIZE - (head - tail)) {
+		U_LOG_E("Ring is full");
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	copy_in(rb, head, &size32, sizeof(size32));
+	copy_in(rb, head + sizeof(size32), data, size32);
+
+	__atomic_store_n(&rb->head, head + padded_size(size32), __ATOMIC_SEQ_CST);
+
+	// Only pay for the syscall if the reader has gone to sleep.
+	if (__atomic_load_n(&rb->waiting, __ATOMIC_SEQ_CST) != 0) {
+		futex_wake(&rb->head);
+	}
+
+	return XRT_SUCCESS;
+}
+
+static bool
+ring_has_data(struct ipc_shared_ring_buffer *rb)
+{
+	uint32_t tail = __atomic_load_n(&rb->tail, __ATOMIC_RELAXED);
+	return __atomic_load_n(&rb->head, __ATOMIC_ACQUIRE) != tail;
+}
+
+/*!
+ * Spin for a bit then sleep on the futex, returns true if there is data. May
+ * return false before the timeout on spurious wakeups.
+ */
+static bool
+ring_wait(struct ipc_shared_ring_buffer *rb, uint64_t timeout_ns)
+{
+	for (uint32_t i = 0; i < IPC_RING_SPIN_COUNT; i++) {
+		if (ring_has_data(rb)) {
+			return true;
+		}
+		cpu_relax();
+	}
+
+	uint32_t tail = __atomic_load_n(&rb->tail, __ATOMIC_RELAXED);
+
+	__atomic_store_n(&rb->waiting, 1, __ATOMIC_SEQ_CST);
+	uint32_t head = __atomic_load_n(&rb->head, __ATOMIC_SEQ_CST);
+	if (head == tail) {
+		futex_wait(&rb->head, head, timeout_ns);
+	}
+	__atomic_store_n(&rb->waiting, 0, __ATOMIC_RELAXED);
+
+	return ring_has_data(rb);
+}
+
+static xrt_result_t
+ring_read(struct ipc_shared_ring_buffer *rb, void *out_data, size_t max_size, size_t *out_size)
+{
+	uint32_t tail = __atomic_load_n(&rb->tail, __ATOMIC_RELAXED);
+	uint32_t head = __atomic_load_n(&rb->head, __ATOMIC_ACQUIRE);
+	uint32_t available = head - tail;
+
+	if (available == 0) {
+		return XRT_TIMEOUT;
+	}
+
+	// The other side is not trusted, validate everything.
+	uint32_t size32 = 0;
+	if (available < sizeof(size32)) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+	copy_out(rb, tail, &size32, sizeof(size32));
+	if (size32 == 0 || size32 > max_size || padded_size(size32) > available) {
+		U_LOG_E("Invalid message of %u bytes in the ring", size32);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	copy_out(rb, tail + sizeof(size32), out_data, size32);
+	__atomic_store_n(&rb->tail, tail + padded_size(size32), __ATOMIC_RELEASE);
+
+	*out_size = size32;
+
+	return XRT_SUCCESS;
+}
+
+static bool
+peer_closed(struct ipc_message_channel *imc)
+{
+	uint8_t byte;
+	ssize_t ret = recv(imc->ipc_handle, &byte, 1, MSG_PEEK | MSG_DONTWAIT);
+	if (ret == 0) {
+		return true;
+	}
+	if (ret < 0 && errno != EAGAIN && errno != EWOULDBLOCK && errno != EINTR) {
+		return true;
+	}
+	return false;
+}
+
+
+/*
+ *
+ * 'Exported' functions.
+ *
+ */
+
+bool
+ipc_ring_is_supported(void)
+{
+	return true;
+}
+
+void
+ipc_ring_reset(struct ipc_shared_ring *ring)
+{
+	memset(ring, 0, sizeof(*ring));
+	__atomic_thread_fence(__ATOMIC_SEQ_CST);
+}
+
+void
+ipc_ring_close(struct ipc_shared_ring *ring)
+{
+	__atomic_store_n(&ring->closed, 1, __ATOMIC_SEQ_CST);
+
+	// Make sure a client sleeping on the reply notices.
+	futex_wake(&ring->replies.head);
+}
+
+void
+ipc_ring_wake_server(struct ipc_shared_ring *ring)
+{
+	futex_wake(&ring->requests.head);
+}
+
+xrt_result_t
+ipc_ring_client_send(struct ipc_shared_ring *ring, const void *data, size_t size)
+{
+	if (__atomic_load_n(&ring->closed, __ATOMIC_ACQUIRE) != 0) {
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	return ring_write(&ring->requests, data, size);
+}
+
+xrt_result_t
+ipc_ring_client_receive(struct ipc_shared_ring *ring, struct ipc_message_channel *imc, void *out_data, size_t size)
+{
+	while (!ring_wait(&ring->replies, CLIENT_CHECK_INTERVAL_NS)) {
+		// The reply might have been written right before the ring was closed.
+		if (__atomic_load_n(&ring->closed, __ATOMIC_ACQUIRE) != 0 && !ring_has_data(&ring->replies)) {
+			U_LOG_E("Server closed the ring");
+			return XRT_ERROR_IPC_FAILURE;
+		}
+
+		if (peer_closed(imc)) {
+			U_LOG_E("Server went away while waiting on the ring");
+			return XRT_ERROR_IPC_FAILURE;
+		}
+	}
+
+	size_t received = 0;
+	xrt_result_t xret = ring_read(&ring->replies, out_data, size, &received);
+	if (xret != XRT_SUCCESS) {
+		return xret;
+	}
+
+	if (received != size) {
+		U_LOG_E("Reply of %u bytes, expected %u", (uint32_t)received, (uint32_t)size);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	return XRT_SUCCESS;
+}
+
+xrt_result_t
+ipc_ring_server_receive(struct ipc_shared_ring *ring,
+                        void *out_data,
+                        size_t max_size,
+                        size_t *out_size,
+                        uint64_t timeout_ns)
+{
+	if (!ring_wait(&ring->requests, timeout_ns)) {
+		return XRT_TIMEOUT;
+	}
+
+	return ring_read(&ring->requests, out_data, max_size, out_size);
+}
+
+xrt_result_t
+ipc_ring_server_send(struct ipc_shared_ring *ring, const void *data, size_t size)
+{
+	return ring_write(&ring->replies, data, size);
+}
+
+
+#else // XRT_OS_LINUX
+
+
+/*
+ *
+ * Not supported, the client never enables the ring so these are not called.
+ *
+ */
+
+bool
+ipc_ring_is_supported(void)
+{
+	return false;
+}
+
+void
+ipc_ring_reset(struct ipc_shared_ring *ring)
+{
+	memset(ring, 0, sizeof(*ring));
+}
+
+void
+ipc_ring_close(struct ipc_shared_ring *ring)
+{
+	ring->closed = 1;
+}
+
+void
+ipc_ring_wake_server(struct ipc_shared_ring *ring)
+{}
+
+xrt_result_t
+ipc_ring_client_send(struct ipc_shared_ring *ring, const void *data, size_t size)
+{
+	return XRT_ERROR_IPC_FAILURE;
+}
+
+xrt_result_t
+ipc_ring_client_receive(struct ipc_shared_ring *ring, struct ipc_message_channel *imc, void *out_data, size_t size)
+{
+	return XRT_ERROR_IPC_FAILURE;
+}
+
+xrt_result_t
+ipc_ring_server_receive(struct ipc_shared_ring *ring,
+                        void *out_data,
+                        size_t max_size,
+                        size_t *out_size,
+                        uint64_t timeout_ns)
+{
+	return XRT_ERROR_IPC_FAILURE;
+}
+
+xrt_result_t
+ipc_ring_server_send(struct ipc_shared_ring *ring, const void *data, size_t size)
+{
+	return XRT_ERROR_IPC_FAILURE;
+}
+
+
+#endif // XRT_OS_LINUX
@@ -0,0 +1,109 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Shared memory ring transport for IPC calls.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#pragma once
+
+#include "xrt/xrt_results.h"
+
+#include "shared/ipc_protocol.h"
+#include "shared/ipc_utils.h"
+
+#include <stdbool.h>
+#include <stdint.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+
+/*!
+ * How many times a reader polls the ring before going to sleep on the futex,
+ * most hot calls are answered well within this.
+ *
+ * @ingroup ipc_shared
+ */
+#define IPC_RING_SPIN_COUNT 256
+
+/*!
+ * Is the ring transport supported on this platform, it needs futexes so it is
+ * only available on Linux and Android. The functions below fail elsewhere.
+ *
+ * @ingroup ipc_shared
+ */
+bool
+ipc_ring_is_supported(void);
+
+/*!
+ * Reset the ring, done by the server before handing it to a client.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_ring_reset(struct ipc_shared_ring *ring);
+
+/*!
+ * Mark the ring as closed and wake up the client if it is waiting for a reply.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_ring_close(struct ipc_shared_ring *ring);
+
+/*!
+ * Wake up the server if it is waiting for a request, used when stopping the
+ * thread servicing the ring.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_ring_wake_server(struct ipc_shared_ring *ring);
+
+/*!
+ * Send a request to the server, the connection mutex must be held.
+ *
+ * @ingroup ipc_shared
+ */
+xrt_result_t
+ipc_ring_client_send(struct ipc_shared_ring *ring, const void *data, size_t size);
+
+/*!
+ * Wait for the reply from the server, the connection mutex must be held. The
+ * reply must be exactly @p size bytes. While waiting the socket in @p imc is
+ * checked so a dead server doesn't leave the client waiting forever.
+ *
+ * @ingroup ipc_shared
+ */
+xrt_result_t
+ipc_ring_client_receive(struct ipc_shared_ring *ring, struct ipc_message_channel *imc, void *out_data, size_t size);
+
+/*!
+ * Wait for a request from the client, returns @ref XRT_TIMEOUT if none has
+ * arrived within @p timeout_ns.
+ *
+ * @ingroup ipc_shared
+ */
+xrt_result_t
+ipc_ring_server_receive(struct ipc_shared_ring *ring,
+                        void *out_data,
+                        size_t max_size,
+                        size_t *out_size,
+                        uint64_t timeout_ns);
+
+/*!
+ * Send the reply to a request to the client.
+ *
+ * @ingroup ipc_shared
+ */
+xrt_result_t
+ipc_ring_server_send(struct ipc_shared_ring *ring, const void *data, size_t size);
+
+
+#ifdef __cplusplus
+}
+#endif
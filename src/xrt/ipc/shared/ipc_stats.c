@@ -0,0 +1,194 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Per command latency histograms for IPC calls.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#include "xrt/xrt_compiler.h"
+
+#include "shared/ipc_stats.h"
+
+#include <inttypes.h>
+#include <string.h>
+
+
+/*
+ *
+ * Structs and defines.
+ *
+ */
+
+/*!
+ * Live histogram, only touched with atomics so that any number of threads can
+ * record at the same time without taking a lock.
+ */
+struct stats_histogram
+{
+	volatile uint64_t count;
+	volatile uint64_t total_ns;
+	volatile uint64_t max_ns;
+	volatile uint64_t buckets[IPC_STATS_BUCKET_COUNT];
+};
+
+static struct stats_histogram histograms[IPC_COMMAND_COUNT][IPC_STATS_PHASE_COUNT];
+
+
+/*
+ *
+ * Helpers.
+ *
+ */
+
+static inline void
+atomic_add_u64(volatile uint64_t *p, uint64_t value)
+{
+#if defined(__GNUC__)
+	__sync_fetch_and_add(p, value);
+#elif defined(_MSC_VER)
+	InterlockedExchangeAdd64((volatile LONG64 *)p, (LONG64)value);
+#else
+#error "compiler not supported"
+#endif
+}
+
+static inline uint64_t
+atomic_cmpxchg_u64(volatile uint64_t *p, uint64_t old_, uint64_t new_)
+{
+#if defined(__GNUC__)
+	return __sync_val_compare_and_swap(p, old_, new_);
+#elif defined(_MSC_VER)
+	return (uint64_t)InterlockedCompareExchange64((volatile LONG64 *)p, (LONG64)new_, (LONG64)old_);
+#else
+#error "compiler not supported"
+#endif
+}
+
+static inline void
+atomic_max_u64(volatile uint64_t *p, uint64_t value)
+{
+	uint64_t old = *p;
+	while (old < value) {
+		uint64_t prev = atomic_cmpxchg_u64(p, old, value);
+		if (prev == old) {
+			break;
+		}
+		old = prev;
+	}
+}
+
+static inline uint32_t
+bucket_for_ns(uint64_t ns)
+{
+	uint32_t index = 0;
+	while (index < IPC_STATS_BUCKET_COUNT - 1 && (ns >> (index + 1)) != 0) {
+		index++;
+	}
+	return index;
+}
+
+static double
+percentile_us(const struct ipc_stats_histogram *h, double fraction)
+{
+	uint64_t target = (uint64_t)(h->count * fraction);
+	if (target == 0) {
+		target = 1;
+	}
+
+	uint64_t seen = 0;
+	for (uint32_t i = 0; i < IPC_STATS_BUCKET_COUNT - 1; i++) {
+		seen += h->buckets[i];
+		if (seen >= target) {
+			uint64_t bound = UINT64_C(2) << i;
+			return (double)(bound < h->max_ns ? bound : h->max_ns) / 1000.0;
+		}
+	}
+
+	return (double)h->max_ns / 1000.0;
+}
+
+
+/*
+ *
+ * 'Exported' functions.
+ *
+ */
+
+const char *
+ipc_stats_phase_str(enum ipc_stats_phase phase)
+{
+	switch (phase) {
+	case IPC_STATS_CLIENT_LOCK: return "client_lock";
+	case IPC_STATS_CLIENT_SEND: return "client_send";
+	case IPC_STATS_CLIENT_WAIT: return "client_wait";
+	case IPC_STATS_SERVER_DISPATCH: return "server_dispatch";
+	case IPC_STATS_SERVER_HANDLER: return "server_handler";
+	case IPC_STATS_SERVER_REPLY: return "server_reply";
+	default: return "unknown";
+	}
+}
+
+void
+ipc_stats_record(ipc_command_t cmd, enum ipc_stats_phase phase, uint64_t start_ns, uint64_t end_ns)
+{
+	if ((uint32_t)cmd >= IPC_COMMAND_COUNT || (uint32_t)phase >= IPC_STATS_PHASE_COUNT) {
+		return;
+	}
+
+	uint64_t ns = end_ns > start_ns ? end_ns - start_ns : 0;
+	struct stats_histogram *h = &histograms[cmd][phase];
+
+	atomic_add_u64(&h->count, 1);
+	atomic_add_u64(&h->total_ns, ns);
+	atomic_add_u64(&h->buckets[bucket_for_ns(ns)], 1);
+	atomic_max_u64(&h->max_ns, ns);
+}
+
+void
+ipc_stats_get(ipc_command_t cmd, enum ipc_stats_phase phase, struct ipc_stats_histogram *out_histogram)
+{
+	memset(out_histogram, 0, sizeof(*out_histogram));
+
+	if ((uint32_t)cmd >= IPC_COMMAND_COUNT || (uint32_t)phase >= IPC_STATS_PHASE_COUNT) {
+		return;
+	}
+
+	struct stats_histogram *h = &histograms[cmd][phase];
+
+	out_histogram->count = h->count;
+	out_histogram->total_ns = h->total_ns;
+	out_histogram->max_ns = h->max_ns;
+	for (uint32_t i = 0; i < IPC_STATS_BUCKET_COUNT; i++) {
+		out_histogram->buckets[i] = h->buckets[i];
+	}
+}
+
+void
+ipc_stats_reset(void)
+{
+	memset((void *)histograms, 0, sizeof(histograms));
+}
+
+void
+ipc_stats_dump(FILE *file)
+{
+	fprintf(file, "%-44s %-16s %10s %10s %10s %10s %10s\n", "command", "phase", "count", "mean_us", "p50_us",
+	        "p99_us", "max_us");
+
+	for (uint32_t cmd = 0; cmd < IPC_COMMAND_COUNT; cmd++) {
+		for (uint32_t phase = 0; phase < IPC_STATS_PHASE_COUNT; phase++) {
+			struct ipc_stats_histogram h;
+			ipc_stats_get((ipc_command_t)cmd, (enum ipc_stats_phase)phase, &h);
+			if (h.count == 0) {
+				continue;
+			}
+
+			fprintf(file, "%-44s %-16s %10" PRIu64 " %10.1f %10.1f %10.1f %10.1f\n",
+			        ipc_cmd_to_str((ipc_command_t)cmd), ipc_stats_phase_str((enum ipc_stats_phase)phase),
+			        h.count, (double)h.total_ns / (double)h.count / 1000.0, percentile_us(&h, 0.5),
+			        percentile_us(&h, 0.99), (double)h.max_ns / 1000.0);
+		}
+	}
+}
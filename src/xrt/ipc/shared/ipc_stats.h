@@ -0,0 +1,113 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief  Per command latency histograms for IPC calls.
+ * @author agent <agent@local>
+ * @ingroup ipc_shared
+ */
+
+#pragma once
+
+#include "shared/ipc_protocol.h"
+#include "ipc_protocol_generated.h"
+
+#include <stdio.h>
+
+#ifdef __cplusplus
+extern "C" {
+#endif
+
+
+/*!
+ * Number of buckets in a histogram, bucket N counts durations of less than
+ * 2^(N+1) nanoseconds, the last bucket counts everything longer.
+ *
+ * @ingroup ipc_shared
+ */
+#define IPC_STATS_BUCKET_COUNT 32
+
+/*!
+ * The parts of a call that are timed, the client ones are recorded by the
+ * generated ipc_call_* functions and the server ones by ipc_dispatch. Only
+ * recorded when the protocol is generated with instrumentation enabled.
+ *
+ * @ingroup ipc_shared
+ */
+enum ipc_stats_phase
+{
+	//! Waiting for the connection mutex.
+	IPC_STATS_CLIENT_LOCK,
+	//! Sending the message, including any handles.
+	IPC_STATS_CLIENT_SEND,
+	//! From the message being sent until the reply is received.
+	IPC_STATS_CLIENT_WAIT,
+	//! Unpacking the message and receiving handles before the handler.
+	IPC_STATS_SERVER_DISPATCH,
+	//! The ipc_handle_* function.
+	IPC_STATS_SERVER_HANDLER,
+	//! Sending the reply, including any handles.
+	IPC_STATS_SERVER_REPLY,
+
+	IPC_STATS_PHASE_COUNT,
+};
+
+/*!
+ * A snapshot of the histogram of one phase of one command.
+ *
+ * @ingroup ipc_shared
+ */
+struct ipc_stats_histogram
+{
+	uint64_t count;
+	uint64_t total_ns;
+	uint64_t max_ns;
+	uint64_t buckets[IPC_STATS_BUCKET_COUNT];
+};
+
+/*!
+ * Record the duration of a phase of a call, safe to call from any thread.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_stats_record(ipc_command_t cmd, enum ipc_stats_phase phase, uint64_t start_ns, uint64_t end_ns);
+
+/*!
+ * Get a snapshot of the histogram of a phase of a command.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_stats_get(ipc_command_t cmd, enum ipc_stats_phase phase, struct ipc_stats_histogram *out_histogram);
+
+/*!
+ * Clear all of the histograms.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_stats_reset(void);
+
+/*!
+ * Write a table of all commands and phases that have been recorded, with
+ * count, mean, median, 99th percentile and max in microseconds. Percentiles
+ * are the upper bound of the bucket they fall in, capped to the max.
+ *
+ * @ingroup ipc_shared
+ */
+void
+ipc_stats_dump(FILE *file);
+
+/*!
+ * Get the string of a phase.
+ *
+ * @ingroup ipc_shared
+ */
+const char *
+ipc_stats_phase_str(enum ipc_stats_phase phase);
+
+
+#ifdef __cplusplus
+}
+#endif
@@ -0,0 +1,174 @@
+#!/usr/bin/env python3
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""Inspect the IPC protocol and load test a running service.
+
+Needs the layout written by `monado-ctl -w`, the build puts it in
+ipc_layout.json next to monado-ctl.
+"""
+
+import argparse
+import statistics
+import threading
+import time
+
+from ipcproto.connection import Connection
+from ipcproto.wire import Layout
+
+
+def parse_values(call, pairs):
+    """Turn name=value pairs into values for the in arguments of a call."""
+    args = {arg.name: arg for arg in call.call.in_args}
+    values = {}
+    for pair in pairs:
+        name, _, text = pair.partition("=")
+        arg = args.get(name)
+        if arg is None:
+            raise SystemExit("%s has no argument %s" % (call.name, name))
+        if arg.is_aggregate or arg.is_array:
+            values[name] = bytes.fromhex(text)
+        elif arg.typename == "float":
+            values[name] = float(text)
+        elif arg.typename == "bool":
+            values[name] = text in ("1", "true")
+        else:
+            values[name] = int(text, 0)
+    return values
+
+
+def format_value(value):
+    """Format a value, aggregates and arrays are shown as hex."""
+    if isinstance(value, bytes):
+        return value.hex()
+    return str(value)
+
+
+def describe(layout, args):
+    """Print the layout of the calls."""
+    for call in layout.calls:
+        if args.names and call.name not in args.names:
+            continue
+        print("%s (%d): msg %d bytes, reply %d bytes" % (
+            call.name, call.id, call.msg_size, call.reply_size))
+        for kind, struct in (("msg", call.msg), ("reply", call.reply)):
+            if struct is None:
+                continue
+            for name, ctype in struct._fields_:
+                if name.startswith("_pad"):
+                    continue
+                print("\t%-5s %4d %4d %s" % (
+                    kind, getattr(struct, name).offset,
+                    getattr(struct, name).size, name))
+
+
+def do_call(layout, args):
+    """Do a single call and print the reply."""
+    call = layout.by_name[args.name]
+    values = parse_values(call, args.values)
+    conn = Connection(layout, args.socket)
+    try:
+        conn.handshake()
+        reply, fds = conn.call(call.name, **values)
+    finally:
+        conn.close()
+
+    if reply is None:
+        print("No reply")
+        return
+    for name, value in reply.items():
+        print("%s: %s" % (name, format_value(value)))
+    if fds:
+        print("handles: %s" % fds)
+
+
+def client_thread(layout, args, call, values, results):
+    """Make calls until the time is up, records latencies in ns."""
+    stats = {"latencies": [], "errors": 0, "failed": None}
+    results.append(stats)
+    try:
+        conn = Connection(layout, args.socket)
+    except OSError as e:
+        stats["failed"] = str(e)
+        return
+
+    try:
+        conn.handshake(b"ipc_tool load")
+        end = time.monotonic() + args.duration
+        while time.monotonic() < end:
+            start = time.monotonic_ns()
+            reply, _ = conn.call(call.name, **values)
+            stats["latencies"].append(time.monotonic_ns() - start)
+            if reply is not None and reply["result"] != 0:
+                stats["errors"] += 1
+    except (OSError, RuntimeError) as e:
+        stats["failed"] = str(e)
+    finally:
+        conn.close()
+
+
+def load(layout, args):
+    """Hammer the service with many clients doing the same call."""
+    call = layout.by_name[args.name]
+    values = parse_values(call, args.values)
+    if args.clients > layout.max_clients:
+        print("Warning: the service only takes %d clients" %
+              layout.max_clients)
+
+    results = []
+    threads = [threading.Thread(target=client_thread,
+                                args=(layout, args, call, values, results))
+               for _ in range(args.clients)]
+    for thread in threads:
+        thread.start()
+    for thread in threads:
+        thread.join()
+
+    latencies = sorted(lat for r in results for lat in r["latencies"])
+    failed = [r["failed"] for r in results if r["failed"]]
+    errors = sum(r["errors"] for r in results)
+    print("clients: %d, failed: %d" % (args.clients, len(failed)))
+    for reason in sorted(set(failed)):
+        print("\t%s" % reason)
+    print("calls: %d, errors: %d, %.0f calls/s" % (
+        len(latencies), errors, len(latencies) / args.duration))
+    if latencies:
+        print("latency us: median %.1f, p99 %.1f, max %.1f" % (
+            statistics.median(latencies) / 1000,
+            latencies[int(len(latencies) * 0.99)] / 1000,
+            latencies[-1] / 1000))
+
+
+def main():
+    """Handle command line and run the command."""
+    parser = argparse.ArgumentParser(description='IPC protocol tool.')
+    parser.add_argument(
+        '--proto', default='proto.json', help='Protocol file to use')
+    parser.add_argument(
+        '--layout', default='ipc_layout.json',
+        help='Layout written by monado-ctl -w')
+    parser.add_argument(
+        '--socket', help='Service socket, found like the service does if unset')
+    sub = parser.add_subparsers(dest='command', required=True)
+
+    p = sub.add_parser('describe', help='Print the layout of calls')
+    p.add_argument('names', nargs='*', help='Calls to print, all if none')
+    p.set_defaults(func=describe)
+
+    p = sub.add_parser('call', help='Make a single call and print the reply')
+    p.add_argument('name', help='Call to make')
+    p.add_argument('values', nargs='*', help='Arguments as name=value')
+    p.set_defaults(func=do_call)
+
+    p = sub.add_parser('load', help='Make a call from many clients at once')
+    p.add_argument('name', help='Call to make')
+    p.add_argument('values', nargs='*', help='Arguments as name=value')
+    p.add_argument('--clients', type=int, default=4, help='Number of clients')
+    p.add_argument('--duration', type=float, default=5.0, help='Seconds')
+    p.set_defaults(func=load)
+
+    args = parser.parse_args()
+    args.func(Layout.load(args.proto, args.layout), args)
+
+
+if __name__ == "__main__":
+    main()
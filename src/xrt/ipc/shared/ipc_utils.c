@@ -110,6 +110,35 @@ ipc_receive(struct ipc_message_channel *imc, void *out_data, size_t size)
 	return XRT_SUCCESS;
 }
 
+xrt_result_t
+ipc_receive_message(struct ipc_message_channel *imc, void *out_data, size_t max_size, size_t *out_size)
+{
+	struct iovec iov = {0};
+	iov.iov_base = out_data;
+	iov.iov_len = max_size;
+
+	struct msghdr msg = {0};
+	msg.msg_iov = &iov;
+	msg.msg_iovlen = 1;
+
+	*out_size = 0;
+
+	ssize_t len = recvmsg(imc->ipc_handle, &msg, MSG_NOSIGNAL);
+	if (len <= 0) {
+		IPC_ERROR(imc, "recvmsg failed with error: '%s'!", len < 0 ? strerror(errno) : "channel closed");
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	if ((msg.msg_flags & MSG_TRUNC) != 0) {
+		IPC_ERROR(imc, "recvmsg failed with error: message larger than '%i'!", (int)max_size);
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	*out_size = (size_t)len;
+
+	return XRT_SUCCESS;
+}
+
 union imcontrol_buf {
 	uint8_t buf[512];
 	struct cmsghdr align;
@@ -164,6 +193,12 @@ ipc_send_fds(struct ipc_message_channel *imc, const void *data, size_t size, con
 	assert(imc != NULL);
 	assert(data != NULL);
 	assert(size != 0);
+
+	// Nothing to attach, for calls with a variable number of handles.
+	if (handle_count == 0) {
+		return ipc_send(imc, data, size);
+	}
+
 	assert(handles != NULL);
 
 	union imcontrol_buf u = {0};
@@ -202,6 +237,78 @@ ipc_send_fds(struct ipc_message_channel *imc, const void *data, size_t size, con
 	return XRT_SUCCESS;
 }
 
+xrt_result_t
+ipc_receive_message_fds(struct ipc_message_channel *imc,
+                        void *out_data,
+                        size_t max_size,
+                        size_t *out_size,
+                        int *out_handles,
+                        uint32_t max_handle_count,
+                        uint32_t *out_handle_count)
+{
+	assert(imc != NULL);
+	assert(out_data != NULL);
+	assert(max_size != 0);
+	assert(out_handles != NULL);
+	assert(max_handle_count <= XRT_MAX_IPC_HANDLES);
+
+	union imcontrol_buf u;
+	const size_t cmsg_size = CMSG_SPACE(sizeof(int) * XRT_MAX_IPC_HANDLES);
+	memset(u.buf, 0, cmsg_size);
+
+	struct iovec iov = {0};
+	iov.iov_base = out_data;
+	iov.iov_len = max_size;
+
+	struct msghdr msg = {0};
+	msg.msg_iov = &iov;
+	msg.msg_iovlen = 1;
+	msg.msg_control = u.buf;
+	msg.msg_controllen = cmsg_size;
+
+	*out_size = 0;
+	*out_handle_count = 0;
+
+	ssize_t len = recvmsg(imc->ipc_handle, &msg, MSG_NOSIGNAL | MSG_CMSG_CLOEXEC);
+	if (len < 0) {
+		IPC_ERROR(imc, "recvmsg failed with error: '%s'!", strerror(errno));
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	// Collect the file descriptors first so they are closed on all errors.
+	uint32_t count = 0;
+	bool dropped = false;
+	for (struct cmsghdr *cmsg = CMSG_FIRSTHDR(&msg); cmsg != NULL; cmsg = CMSG_NXTHDR(&msg, cmsg)) {
+		if (cmsg->cmsg_level != SOL_SOCKET || cmsg->cmsg_type != SCM_RIGHTS) {
+			continue;
+		}
+
+		const int *fds = (const int *)CMSG_DATA(cmsg);
+		size_t fd_count = (cmsg->cmsg_len - CMSG_LEN(0)) / sizeof(int);
+		for (size_t i = 0; i < fd_count; i++) {
+			if (count < max_handle_count) {
+				out_handles[count++] = fds[i];
+			} else {
+				close(fds[i]);
+				dropped = true;
+			}
+		}
+	}
+
+	if ((msg.msg_flags & (MSG_CTRUNC | MSG_TRUNC)) != 0 || dropped) {
+		IPC_ERROR(imc, "recvmsg failed with error: message or handles truncated!");
+		for (uint32_t i = 0; i < count; i++) {
+			close(out_handles[i]);
+		}
+		return XRT_ERROR_IPC_FAILURE;
+	}
+
+	*out_size = (size_t)len;
+	*out_handle_count = count;
+
+	return XRT_SUCCESS;
+}
+
 #endif
 
 xrt_result_t
@@ -224,6 +331,26 @@ ipc_send_handles_shmem(struct ipc_message_channel *imc,
 	return ipc_send_fds(imc, data, size, handles, handle_count);
 }
 
+xrt_result_t
+ipc_receive_handles_ipc(struct ipc_message_channel *imc,
+                        void *out_data,
+                        size_t size,
+                        xrt_ipc_handle_t *out_handles,
+                        uint32_t handle_count)
+{
+	return ipc_receive_fds(imc, out_data, size, out_handles, handle_count);
+}
+
+xrt_result_t
+ipc_send_handles_ipc(struct ipc_message_channel *imc,
+                     const void *data,
+                     size_t size,
+                     const xrt_ipc_handle_t *handles,
+                     uint32_t handle_count)
+{
+	return ipc_send_fds(imc, data, size, handles, handle_count);
+}
+
 
 /*
  *
@@ -69,6 +69,22 @@ ipc_send(struct ipc_message_channel *imc, const void *data, size_t size);
 xrt_result_t
 ipc_receive(struct ipc_message_channel *imc, void *out_data, size_t size);
 
+/*!
+ * Receive a bare message of up to @p max_size bytes over the IPC channel, for
+ * replies that only send the used part of an array.
+ *
+ * @param imc Message channel to use
+ * @param[out] out_data Pointer to the buffer to fill with data. Must not be
+ * null.
+ * @param[in] max_size Size of @p out_data, must be greater than 0, larger
+ * messages are an error.
+ * @param[out] out_size Number of bytes received.
+ *
+ * @public @memberof ipc_message_channel
+ */
+xrt_result_t
+ipc_receive_message(struct ipc_message_channel *imc, void *out_data, size_t max_size, size_t *out_size);
+
 /*!
  * @name File Descriptor utilities
  * @brief These are typically called from within the send/receive_handles
@@ -103,14 +119,44 @@ ipc_receive_fds(struct ipc_message_channel *imc, void *out_data, size_t size, in
  * @param[in] size Size of data pointed-to by @p data, must be greater than 0
  * @param[out] handles Array of file descriptors to send.  Must not be
  * null.
- * @param[in] handle_count Number of elements in @p handles, must be greater
- * than 0. If this is variable, it must also be separately transmitted ahead of
- * time, because the receiver must have the same value in its receive call.
+ * @param[in] handle_count Number of elements in @p handles, if zero this is
+ * the same as @ref ipc_send. If this is variable, it must also be separately
+ * transmitted ahead of time or the receiver must use
+ * @ref ipc_receive_message_fds, because otherwise the receiver must have the
+ * same value in its receive call.
  *
  * @public @memberof ipc_message_channel
  */
 xrt_result_t
 ipc_send_fds(struct ipc_message_channel *imc, const void *data, size_t size, const int *handles, uint32_t handle_count);
+
+/*!
+ * Receive a message of unknown size along with an unknown number of file
+ * descriptors, used by the server to receive both a call and any handles for
+ * it in one go.
+ *
+ * @param imc Message channel to use
+ * @param[out] out_data Pointer to the buffer to fill with data. Must not be
+ * null.
+ * @param[in] max_size Size of @p out_data, must be greater than 0
+ * @param[out] out_size Number of bytes received, 0 if the other side closed
+ * the channel.
+ * @param[out] out_handles Array of file descriptors to populate, must have
+ * room for @p max_handle_count.
+ * @param[in] max_handle_count Capacity of @p out_handles.
+ * @param[out] out_handle_count Number of file descriptors received, the
+ * caller owns them.
+ *
+ * @public @memberof ipc_message_channel
+ */
+xrt_result_t
+ipc_receive_message_fds(struct ipc_message_channel *imc,
+                        void *out_data,
+                        size_t max_size,
+                        size_t *out_size,
+                        int *out_handles,
+                        uint32_t max_handle_count,
+                        uint32_t *out_handle_count);
 #elif defined(XRT_OS_WINDOWS)
 /*!
  * Receive a message along with a known number of file HANDLEs over the IPC
@@ -225,6 +271,58 @@ ipc_send_handles_shmem(struct ipc_message_channel *imc,
  */
 
 
+/*!
+ * @name IPC handle utilities
+ * @brief Send/receive IPC handles, used to give the client extra channels.
+ * @{
+ */
+
+/*!
+ * Receive a message along with a known number of IPC handles over the IPC
+ * channel.
+ *
+ * @param imc Message channel to use
+ * @param[out] out_data Pointer to the buffer to fill with data. Must not be
+ * null.
+ * @param[in] size Maximum size to read, must be greater than 0
+ * @param[out] out_handles Array of IPC handles to populate. Must not be null.
+ * @param[in] handle_count Number of elements to receive into @p out_handles,
+ * must be greater than 0 and must match the value provided at the other end.
+ *
+ * @public @memberof ipc_message_channel
+ * @see xrt_ipc_handle_t
+ */
+xrt_result_t
+ipc_receive_handles_ipc(struct ipc_message_channel *imc,
+                        void *out_data,
+                        size_t size,
+                        xrt_ipc_handle_t *out_handles,
+                        uint32_t handle_count);
+
+/*!
+ * Send a message along with IPC handles over the IPC channel.
+ *
+ * @param imc Message channel to use
+ * @param[in] data Pointer to the data buffer to send. Must not be
+ * null: use a filler message if necessary.
+ * @param[in] size Size of data pointed-to by @p data, must be greater than 0
+ * @param[out] handles Array of IPC handles to send.
+ * @param[in] handle_count Number of elements in @p handles.
+ *
+ * @public @memberof ipc_message_channel
+ * @see xrt_ipc_handle_t
+ */
+xrt_result_t
+ipc_send_handles_ipc(struct ipc_message_channel *imc,
+                     const void *data,
+                     size_t size,
+                     const xrt_ipc_handle_t *handles,
+                     uint32_t handle_count);
+/*!
+ * @}
+ */
+
+
 /*!
  * @name Graphics buffer handle utilities
  * @brief Send/receive graphics buffer handles along with scalar/aggregate
@@ -79,6 +79,21 @@ ipc_receive(struct ipc_message_channel *imc, void *out_data, size_t size)
 	return XRT_SUCCESS;
 }
 
+xrt_result_t
+ipc_receive_message(struct ipc_message_channel *imc, void *out_data, size_t max_size, size_t *out_size)
+{
+	DWORD len;
+	*out_size = 0;
+	// Message mode pipe, a larger message fails with ERROR_MORE_DATA.
+	if (!ReadFile(imc->ipc_handle, out_data, DWORD(max_size), &len, NULL)) {
+		DWORD err = GetLastError();
+		IPC_ERROR(imc, "ReadFile from pipe %p failed: %d %s", imc->ipc_handle, err, ipc_winerror(err));
+		return XRT_ERROR_IPC_FAILURE;
+	}
+	*out_size = len;
+	return XRT_SUCCESS;
+}
+
 xrt_result_t
 ipc_receive_fds(
     struct ipc_message_channel *imc, void *out_data, size_t size, HANDLE *out_handles, uint32_t handle_count)
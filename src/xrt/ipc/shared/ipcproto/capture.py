@@ -0,0 +1,83 @@
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""Read capture files written by the service, see ipc_capture.h."""
+
+import struct
+
+# Keep these synchronized with ipc_capture.h, host byte order.
+MAGIC = b"MNDIPCAP"
+VERSION = 1
+HEADER = struct.Struct("=8sII")
+RECORD = struct.Struct("=QIIII")
+
+# The call every client starts with, see ipc_client_instance.c.
+FIRST_CALL = "IPC_INSTANCE_GET_SHM_FD"
+
+
+class Record:
+    """A single captured call."""
+
+    def __init__(self, name, fields, msg, reply):
+        """Construct from the command name, record header and data."""
+        self.name = name
+        self.timestamp_ns, self.client_id, self.cmd, _, _ = fields
+        self.msg = msg
+        self.reply = reply
+
+
+class Capture:
+    """The command names and records of a capture file."""
+
+    @classmethod
+    def load(cls, file):
+        """Load a capture file."""
+        with open(file, "rb") as infile:
+            return cls(infile.read())
+
+    def __init__(self, data):
+        """Parse the content of a capture file."""
+        magic, version, command_count = HEADER.unpack_from(data, 0)
+        if magic != MAGIC or version != VERSION:
+            raise RuntimeError("Not a version %d IPC capture" % VERSION)
+
+        pos = HEADER.size
+        self.command_names = []
+        for _ in range(command_count):
+            end = data.index(b"\0", pos)
+            self.command_names.append(data[pos:end].decode())
+            pos = end + 1
+
+        self.records = []
+        while pos + RECORD.size <= len(data):
+            fields = RECORD.unpack_from(data, pos)
+            msg_size, reply_size = fields[3], fields[4]
+            pos += RECORD.size
+            if pos + msg_size + reply_size > len(data):
+                # Cut short, the service did not exit cleanly.
+                break
+            msg = data[pos:pos + msg_size]
+            reply = data[pos + msg_size:pos + msg_size + reply_size]
+            pos += msg_size + reply_size
+
+            cmd = fields[2]
+            name = (self.command_names[cmd] if cmd < command_count
+                    else "IPC_UNKNOWN")
+            self.records.append(Record(name, fields, msg, reply))
+
+    def sessions(self):
+        """Split the records into one list per connection, in call order.
+
+        The client id is the index of the service thread, which is reused
+        once a client disconnects, so a new session starts at the first call
+        every client makes.
+        """
+        sessions = []
+        current = {}
+        for record in self.records:
+            session = current.get(record.client_id)
+            if session is None or record.name == FIRST_CALL:
+                session = []
+                sessions.append(session)
+                current[record.client_id] = session
+            session.append(record)
+        return sessions
@@ -0,0 +1,139 @@
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""Find the members of the structs and enums in C headers.
+
+Only understands plain declarations, which is all the structs making up the
+shared memory are allowed to have, and ignores everything else.
+"""
+
+import re
+
+COMMENT_RE = re.compile(r"//[^\n]*|/\*.*?\*/", re.S)
+AGGREGATE_RE = re.compile(r"^(struct|union|enum)\s+(\w+)\s*\{", re.M)
+ARRAY_RE = re.compile(r"\[[^\]]*\]")
+IDENT_RE = re.compile(r"\w+")
+
+
+def strip(text):
+    """Remove comments and preprocessor lines."""
+    text = COMMENT_RE.sub(" ", text)
+    return "\n".join(line for line in text.split("\n")
+                     if not line.lstrip().startswith("#"))
+
+
+def block_end(text, start):
+    """Get the index just past the brace closing the one at start."""
+    depth = 0
+    for i in range(start, len(text)):
+        if text[i] == "{":
+            depth += 1
+        elif text[i] == "}":
+            depth -= 1
+            if depth == 0:
+                return i + 1
+    raise RuntimeError("Unbalanced braces")
+
+
+def split_top(text, sep):
+    """Split at sep where it is not inside braces or parentheses."""
+    parts = []
+    depth = 0
+    start = 0
+    for i, c in enumerate(text):
+        if c in "{(":
+            depth += 1
+        elif c in "})":
+            depth -= 1
+        elif c == sep and depth == 0:
+            parts.append(text[start:i])
+            start = i + 1
+    parts.append(text[start:])
+    return [part.strip() for part in parts if part.strip()]
+
+
+class Member:
+    """A member of a struct or union, nested ones have members themselves."""
+
+    def __init__(self, decl):
+        """Parse a declaration, without the trailing semicolon."""
+        self.members = None
+        if "{" in decl:
+            self.members = parse_members(
+                decl[decl.index("{") + 1:decl.rindex("}")])
+            decl = decl[decl.rindex("}") + 1:]
+        self.is_array = "[" in decl
+        decl = " ".join(ARRAY_RE.sub("", decl).split())
+        names = IDENT_RE.findall(decl)
+        # Anonymous nested structs and unions have no name.
+        if self.members is not None and not names:
+            self.name = None
+            self.typename = None
+        else:
+            self.name = names[-1]
+            self.typename = decl[:decl.rindex(self.name)].strip()
+
+    def designators(self, prefix=""):
+        """Get the offsetof designators of this and all nested members."""
+        if self.name is None:
+            for member in self.members:
+                yield from member.designators(prefix)
+            return
+        designator = prefix + self.name
+        yield designator
+        if self.members is not None:
+            if self.is_array:
+                designator += "[0]"
+            for member in self.members:
+                yield from member.designators(designator + ".")
+
+    def typenames(self):
+        """Get the types of this and all nested members."""
+        if self.members is None:
+            yield self.typename
+            return
+        for member in self.members:
+            yield from member.typenames()
+
+
+def parse_members(body):
+    """Parse the members in the body of a struct or union."""
+    return [Member(decl) for decl in split_top(body, ";")]
+
+
+class Headers:
+    """The structs, unions and enums defined in a set of headers."""
+
+    def __init__(self, files):
+        """Parse the given header files."""
+        # Keyed by the full type name, like "struct xrt_pose".
+        self.aggregates = {}
+        # Keyed by the full type name, the names of the enumerators in order.
+        self.enums = {}
+        for file in files:
+            with open(file) as infile:
+                text = strip(infile.read())
+            for match in AGGREGATE_RE.finditer(text):
+                start = text.index("{", match.start())
+                body = text[start + 1:block_end(text, start) - 1]
+                typename = match.group(1) + " " + match.group(2)
+                if match.group(1) == "enum":
+                    self.enums[typename] = [
+                        IDENT_RE.match(enumerator).group(0)
+                        for enumerator in split_top(body, ",")]
+                else:
+                    self.aggregates[typename] = parse_members(body)
+
+    def reachable(self, typename):
+        """Get the structs, unions and enums that make up a type, in the order
+        they are first found, starting with the type itself."""
+        found = [typename]
+        for current in found:
+            if current not in self.aggregates:
+                continue
+            for member in self.aggregates[current]:
+                for name in member.typenames():
+                    if name in found:
+                        continue
+                    if name in self.aggregates or name in self.enums:
+                        found.append(name)
+        return found
@@ -3,8 +3,76 @@
 # SPDX-License-Identifier: BSL-1.0
 """Generate code from a JSON file describing the IPC protocol."""
 
+import hashlib
+import io
 import json
+import os
 import re
+import tempfile
+
+
+# Generated files get the usual permissions, not the private ones of mkstemp.
+UMASK = os.umask(0)
+os.umask(UMASK)
+FILE_MODE = 0o666 & ~UMASK
+
+
+class GeneratedFile(io.StringIO):
+    """Collects generated code and writes it out when closed.
+
+    The file is only replaced if the content changed, so the mtime stays the
+    same and nothing including it gets rebuilt. It is replaced by renaming a
+    temporary file, so a failed run never leaves half a file behind. Also
+    used by the bindings generator.
+    """
+
+    def __init__(self, file):
+        """Construct for the given output file."""
+        super().__init__()
+        self.file = file
+
+    def __exit__(self, exc_type, exc_value, traceback):
+        """Write out the file, unless leaving because of an exception."""
+        if exc_type is not None:
+            self.discard()
+            return False
+        self.close()
+        return False
+
+    def discard(self):
+        """Throw away what has been generated, leaving the file as it was."""
+        if not self.closed:
+            super().close()
+
+    def __del__(self):
+        """Never closed, the generator failed so don't write anything."""
+        self.discard()
+
+    def close(self):
+        """Write out the file if it changed."""
+        if self.closed:
+            return
+        content = self.getvalue()
+        super().close()
+
+        try:
+            with open(self.file) as infile:
+                if infile.read() == content:
+                    return
+        except OSError:
+            pass
+
+        fd, tmp = tempfile.mkstemp(dir=os.path.dirname(os.path.abspath(self.file)),
+                                   prefix=os.path.basename(self.file) + ".")
+        try:
+            with os.fdopen(fd, "w") as outfile:
+                outfile.write(content)
+            os.chmod(tmp, FILE_MODE)
+            os.replace(tmp, self.file)
+        except BaseException:
+            os.unlink(tmp)
+            raise
+
 
 def write_cpp_header_guard_start(f):
     """Write the starting C in C++ header guard"""
@@ -69,6 +137,7 @@ class Arg:
 
     # Keep all these synchronized with the definitions in the JSON Schema.
     SCALAR_TYPES = set(("uint32_t",
+                        "int32_t",
                         "int64_t",
                         "uint64_t",
                         "bool",
@@ -83,7 +152,7 @@ class Arg:
 
     def get_func_argument_in(self):
         """Get the type and name of this argument as an input parameter."""
-        if self.is_aggregate:
+        if self.is_aggregate or self.is_array:
             return "const " + self.typename + " *" + self.name
         else:
             return self.typename + " " + self.name
@@ -94,16 +163,31 @@ class Arg:
 
     def get_struct_field(self):
         """Get the type and name of this argument as a struct field."""
+        if self.is_array:
+            return "%s %s[%s]" % (self.typename, self.name, self.max)
         return self.typename + " " + self.name
 
+    def wire_description(self, args):
+        """Describe what is sent for this argument, see Proto.fingerprint."""
+        desc = [self.typename]
+        if self.is_array:
+            desc.extend((args.index(self.count), self.max))
+        return desc
+
     def dump(self):
         """Dump human-readable output to standard out."""
-        print("\t\t" + self.typename + ": " + self.name)
+        if self.is_array:
+            print("\t\t%s[%s <= %s]: %s" % (self.typename, self.count,
+                                           self.max, self.name))
+        else:
+            print("\t\t" + self.typename + ": " + self.name)
 
     def __init__(self, data):
         """Construct an argument."""
         self.name = data['name']
         self.typename = data['type']
+        self.count = data.get('count')
+        self.max = data.get('max')
         self.is_standard_scalar = False
         self.is_aggregate = False
         self.is_enum = False
@@ -115,6 +199,30 @@ class Arg:
             self.is_enum = True
         else:
             raise RuntimeError("Could not process type name: " + self.typename)
+        if (self.count is None) != (self.max is None):
+            raise RuntimeError("Array argument " + self.name +
+                               " needs both count and max")
+
+    @property
+    def is_array(self):
+        """Is this a counted array, only the used elements are sent."""
+        return self.count is not None
+
+    @classmethod
+    def check_arrays(cls, args, call_name):
+        """Check the counted arrays of an argument list."""
+        names = {arg.name: arg for arg in args}
+        for i, arg in enumerate(args):
+            if not arg.is_array:
+                continue
+            if i != len(args) - 1:
+                raise RuntimeError("Array argument " + arg.name + " of " +
+                                   call_name + " must be the last argument")
+            count = names.get(arg.count)
+            if count is None or count.typename != "uint32_t":
+                raise RuntimeError("Array argument " + arg.name + " of " +
+                                   call_name + " needs a uint32_t argument " +
+                                   str(arg.count) + " before it")
 
 
 class HandleType:
@@ -153,6 +261,11 @@ class HandleType:
         """Get the type of the count argument."""
         return "uint32_t"
 
+    @property
+    def fd_define(self):
+        """Get the define set when the handles are file descriptors."""
+        return "XRT_" + self.stem.upper() + "_HANDLE_IS_FD"
+
     @property
     def arg_names(self):
         """Get the argument names for the client proxy."""
@@ -190,6 +303,9 @@ class HandleType:
 class Call:
     """A single IPC call."""
 
+    # Keep this synchronized with the definition in the JSON Schema.
+    TRANSPORTS = ("socket", "shmem")
+
     def dump(self):
         """Dump human-readable output to standard out."""
         print("Call " + self.name)
@@ -213,6 +329,26 @@ class Call:
             args.extend(self.out_handles.arg_decls)
         write_decl(f, 'xrt_result_t', 'ipc_call_' + self.name, args)
 
+    def write_begin_decl(self, f):
+        """Write declaration of ipc_call_CALLNAME_begin."""
+        args = ["struct ipc_connection *ipc_c"]
+        args.extend(arg.get_func_argument_in() for arg in self.in_args)
+        args.append("struct ipc_%s_token *token" % self.name)
+        write_decl(f, 'xrt_result_t', 'ipc_call_%s_begin' % self.name, args)
+
+    def write_end_decl(self, f):
+        """Write declaration of ipc_call_CALLNAME_end."""
+        args = ["struct ipc_connection *ipc_c",
+                "struct ipc_%s_token *token" % self.name]
+        args.extend(arg.get_func_argument_out() for arg in self.out_args)
+        write_decl(f, 'xrt_result_t', 'ipc_call_%s_end' % self.name, args)
+
+    def write_batch_decl(self, f):
+        """Write declaration of ipc_batch_CALLNAME."""
+        args = ["struct ipc_batch *batch"]
+        args.extend(arg.get_func_argument_in() for arg in self.in_args)
+        write_decl(f, 'xrt_result_t', 'ipc_batch_' + self.name, args)
+
     def write_handler_decl(self, f):
         """Write declaration of ipc_handle_CALLNAME."""
         args = ["volatile struct ipc_client_state *ics"]
@@ -224,6 +360,39 @@ class Call:
             args.extend(self.in_handles.const_arg_decls)
         write_decl(f, 'xrt_result_t', 'ipc_handle_' + self.name, args)
 
+    def wire_description(self):
+        """Describe what is sent for this call, see Proto.fingerprint."""
+        in_names = [arg.name for arg in self.in_args]
+        out_names = [arg.name for arg in self.out_args]
+        return {
+            "transport": self.transport,
+            "reply": self.reply,
+            "batchable": self.batchable,
+            "in": [arg.wire_description(in_names) for arg in self.in_args],
+            "out": [arg.wire_description(out_names) for arg in self.out_args],
+            "in_handles": str(self.in_handles) if self.in_handles else None,
+            "out_handles": str(self.out_handles) if self.out_handles else None,
+        }
+
+    @property
+    def uses_ring(self):
+        """Can this call go over the shared memory ring."""
+        return self.transport == "shmem"
+
+    @property
+    def in_array(self):
+        """Get the counted array sent with the message, if any."""
+        if self.in_args and self.in_args[-1].is_array:
+            return self.in_args[-1]
+        return None
+
+    @property
+    def out_array(self):
+        """Get the counted array sent with the reply, if any."""
+        if self.out_args and self.out_args[-1].is_array:
+            return self.out_args[-1]
+        return None
+
     @property
     def needs_msg_struct(self):
         """Decide whether this call needs a msg struct."""
@@ -237,6 +406,12 @@ class Call:
         self.out_args = []
         self.in_handles = None
         self.out_handles = None
+        self.transport = "socket"
+        self.batchable = False
+        self.is_async = False
+        self.budget_us = None
+        self.reply = True
+        self.channel = "main"
         for key, val in data.items():
             if key == 'id':
                 self.id = val
@@ -248,10 +423,51 @@ class Call:
                 self.out_handles = HandleType(val)
             elif key == 'in_handles':
                 self.in_handles = HandleType(val)
+            elif key == 'reply':
+                self.reply = val
+            elif key == 'batchable':
+                self.batchable = val
+            elif key == 'async':
+                self.is_async = val
+            elif key == 'budget_us':
+                self.budget_us = val
+            elif key == 'channel':
+                self.channel = val
+            elif key == 'transport':
+                if val not in self.TRANSPORTS:
+                    raise RuntimeError("Unknown transport " + val)
+                self.transport = val
             else:
                 raise RuntimeError("Unrecognized key")
         if not self.id:
             self.id = "IPC_" + name.upper()
+        if self.uses_ring and (self.in_handles or self.out_handles):
+            raise RuntimeError("Call " + name +
+                               " has handles so must use the socket")
+        if not self.reply and (self.in_handles or self.out_handles or
+                               self.out_args or self.uses_ring):
+            raise RuntimeError("Call " + name +
+                               " must have a reply, it returns data, has"
+                               " handles or uses the ring")
+        if self.batchable and (self.in_handles or self.out_handles or
+                               self.out_args):
+            raise RuntimeError("Call " + name +
+                               " returns more than a result so can not be"
+                               " batched")
+        if self.is_async and (not self.reply or self.in_handles or
+                              self.out_handles):
+            raise RuntimeError("Call " + name +
+                               " must have a reply and no handles to be"
+                               " async")
+        Arg.check_arrays(self.in_args, name)
+        Arg.check_arrays(self.out_args, name)
+        if (self.in_array or self.out_array) and (
+                self.uses_ring or self.batchable or self.is_async or
+                self.in_handles or self.out_handles):
+            raise RuntimeError("Call " + name +
+                               " has an array argument so must use the"
+                               " socket, not be batched or async and have"
+                               " no handles")
 
 
 class Proto:
@@ -273,8 +489,42 @@ class Proto:
         for call in self.calls:
             call.dump()
 
+    @property
+    def channels(self):
+        """Get the channel names, the main channel is always first."""
+        channels = ["main"]
+        for call in self.calls:
+            if call.channel not in channels:
+                channels.append(call.channel)
+        return channels
+
+    @property
+    def fingerprint(self):
+        """Get a 64 bit hash of everything that changes what is sent.
+
+        Covers the order of the calls, which gives their numbers, and the
+        types of their arguments. Names and channels are left out, renaming
+        things does not change the wire format. The sizes of the structs are
+        only known to the compiler, see ipc_protocol_fingerprint.
+        """
+        desc = json.dumps([call.wire_description() for call in self.calls],
+                          sort_keys=True)
+        digest = hashlib.sha256(desc.encode()).digest()
+        return int.from_bytes(digest[:8], "big")
+
+    def single_channel(self):
+        """Put all of the calls on the main channel."""
+        for call in self.calls:
+            call.channel = "main"
+
     def __init__(self, data):
         """Construct a protocol from a dictionary of calls."""
         self.calls = [Call(name, call) for name, call
                       in data.items()
                       if not name.startswith("$")]
+        # There is only one ring, guarded by the lock of a single channel.
+        ring_channels = set(call.channel for call in self.calls
+                            if call.uses_ring)
+        if len(ring_channels) > 1:
+            raise RuntimeError("Calls using the ring must all be on the"
+                               " same channel")
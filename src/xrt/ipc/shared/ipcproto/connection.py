@@ -0,0 +1,94 @@
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""A minimal IPC client speaking to the service with the ctypes model."""
+
+import os
+import socket
+import sys
+
+from .wire import set_field
+
+# Keep in sync with xrt_results.h.
+XRT_SUCCESS = 0
+
+
+def socket_path(filename):
+    """Get the path of the service socket, like u_file_get_path_in_runtime_dir."""
+    return os.path.join(os.environ.get("XDG_RUNTIME_DIR", "/tmp"), filename)
+
+
+class Connection:
+    """A connection to the service, only ever uses the main channel."""
+
+    def __init__(self, layout, path=None):
+        """Connect to the service."""
+        self.layout = layout
+        self.sock = socket.socket(socket.AF_UNIX, socket.SOCK_SEQPACKET)
+        try:
+            self.sock.connect(path or socket_path(layout.socket))
+        except OSError:
+            self.sock.close()
+            raise
+
+    def close(self):
+        """Close the connection, the service cleans up after the client."""
+        self.sock.close()
+
+    def send(self, name, /, handles=(), **values):
+        """Send the message of a call without waiting for the reply."""
+        call = self.layout.by_name[name]
+        data = call.pack(handle_count=len(handles), **values)
+        if handles:
+            socket.send_fds(self.sock, [data], list(handles))
+        else:
+            self.sock.send(data)
+        return call
+
+    def receive(self, call):
+        """Receive the reply of a call, returns the values and any fds."""
+        if call.reply is None:
+            return None, []
+
+        data, fds, flags, _ = socket.recv_fds(
+            self.sock, call.reply_size + 1, self.layout.max_handles)
+        if flags & (socket.MSG_TRUNC | socket.MSG_CTRUNC) or \
+                not call.fits_reply(len(data)):
+            for fd in fds:
+                os.close(fd)
+            raise RuntimeError("Bad reply to %s, got %d bytes" %
+                               (call.name, len(data)))
+        return call.unpack_reply(data), fds
+
+    def call(self, name, /, handles=(), **values):
+        """Do a call, returns the unpacked reply and any fds received."""
+        return self.receive(self.send(name, handles, **values))
+
+    def handshake(self, name=b"ipc_tool"):
+        """Do what the client instance does before making other calls."""
+        reply, fds = self.call("instance_get_shm_fd",
+                               fingerprint=self.layout.fingerprint)
+        for fd in fds:
+            os.close(fd)
+        check(reply, "instance_get_shm_fd")
+        if reply["service_fingerprint"] != self.layout.fingerprint:
+            raise RuntimeError("Layout is for protocol %016x, service has %016x" %
+                               (self.layout.fingerprint,
+                                reply["service_fingerprint"]))
+
+        # Only the pid and application name, which starts the info, are set.
+        desc = self.layout.structs["ipc_app_state"]()
+        set_field(desc, "pid",
+                  os.getpid().to_bytes(len(desc.pid), sys.byteorder))
+        set_field(desc, "info", name)
+        reply, _ = self.call("system_set_client_info", desc=bytes(desc))
+        check(reply, "system_set_client_info")
+
+        reply, _ = self.call("instance_get_client_id")
+        check(reply, "instance_get_client_id")
+        return reply["client_id"]
+
+
+def check(reply, name):
+    """Raise if a call failed."""
+    if reply["result"] != XRT_SUCCESS:
+        raise RuntimeError("%s failed with %d" % (name, reply["result"]))
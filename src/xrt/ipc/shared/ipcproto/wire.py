@@ -0,0 +1,211 @@
+# Copyright 2026, agent.
+# SPDX-License-Identifier: BSL-1.0
+"""ctypes model of the IPC messages and replies for tools talking to the service."""
+
+import ctypes
+import json
+import sys
+
+from .common import Proto
+
+# The C types of the arguments, see Arg.SCALAR_TYPES.
+SCALAR_CTYPES = {
+    "uint32_t": ctypes.c_uint32,
+    "int32_t": ctypes.c_int32,
+    "int64_t": ctypes.c_int64,
+    "uint64_t": ctypes.c_uint64,
+    "bool": ctypes.c_bool,
+    "float": ctypes.c_float,
+}
+
+
+def field_ctype(arg, size):
+    """Get the ctypes type of an argument, aggregates and arrays are raw bytes."""
+    if arg is not None and arg.is_array:
+        ctype = ctypes.c_uint8 * size
+    elif arg is None or arg.is_enum:
+        ctype = ctypes.c_int32
+    elif arg.is_standard_scalar:
+        ctype = SCALAR_CTYPES[arg.typename]
+    else:
+        ctype = ctypes.c_uint8 * size
+    if ctypes.sizeof(ctype) != size:
+        raise RuntimeError("Size of %s does not match the layout" %
+                           (arg.name if arg else "field"))
+    return ctype
+
+
+def make_struct(name, fields, size):
+    """Make a packed ctypes struct from (name, ctype, offset) tuples."""
+    layout = []
+    pos = 0
+    for field_name, ctype, offset in sorted(fields, key=lambda f: f[2]):
+        if offset < pos:
+            raise RuntimeError("Field %s of %s overlaps" % (field_name, name))
+        if offset > pos:
+            layout.append(("_pad%d" % pos, ctypes.c_uint8 * (offset - pos)))
+        layout.append((field_name, ctype))
+        pos = offset + ctypes.sizeof(ctype)
+    if size > pos:
+        layout.append(("_pad%d" % pos, ctypes.c_uint8 * (size - pos)))
+
+    struct = type(name, (ctypes.Structure,), {"_pack_": 1, "_fields_": layout})
+    if ctypes.sizeof(struct) != size:
+        raise RuntimeError("Size of %s does not match the layout" % name)
+    return struct
+
+
+class CallLayout:
+    """The wire layout of a single call."""
+
+    def __init__(self, call, data):
+        """Construct from the call and its entry in the layout description."""
+        self.call = call
+        self.name = call.name
+        self.id = data["id"]
+        self.msg_size = data["msg_size"]
+        self.reply_size = data["reply_size"]
+
+        args = {arg.name: arg for arg in call.in_args + call.out_args}
+        msg_fields = []
+        reply_fields = []
+        # Counted arrays as (arg, offset, elem_size), only the used part is sent.
+        self.msg_array = None
+        self.reply_array = None
+        for field in data["fields"]:
+            arg = args.get(field["name"])
+            if field["name"] == "handle_count":
+                ctype = ctypes.c_uint32
+            else:
+                ctype = field_ctype(arg, field["size"])
+            entry = (field["name"], ctype, field["offset"])
+            (reply_fields if field["reply"] else msg_fields).append(entry)
+            if arg is not None and arg.is_array:
+                array = (arg, field["offset"], field["elem_size"])
+                if field["reply"]:
+                    self.reply_array = array
+                else:
+                    self.msg_array = array
+
+        self.msg = make_struct("ipc_%s_msg" % self.name, msg_fields,
+                               self.msg_size)
+        self.reply = None
+        if self.reply_size:
+            self.reply = make_struct("ipc_%s_reply" % self.name, reply_fields,
+                                     self.reply_size)
+
+    def pack(self, handle_count=0, **values):
+        """Pack the message of this call, unset fields are zero."""
+        msg = self.msg()
+        msg.cmd = self.id
+        if self.call.in_handles:
+            msg.handle_count = handle_count
+        if self.msg_array:
+            # The count defaults to the number of elements given.
+            arg, _, elem_size = self.msg_array
+            if arg.count not in values:
+                values[arg.count] = len(values.get(arg.name, b"")) // elem_size
+        for arg in self.call.in_args:
+            if arg.name in values:
+                set_field(msg, arg.name, values[arg.name])
+        return bytes(msg)[:self.sent_size(msg, self.msg_array)]
+
+    def sent_size(self, struct, array):
+        """Get the number of bytes sent of a message or reply."""
+        if array is None:
+            return ctypes.sizeof(struct)
+        arg, offset, elem_size = array
+        return offset + getattr(struct, arg.count) * elem_size
+
+    def fits_reply(self, size):
+        """Can a reply of this size be valid, arrays make it variable."""
+        if self.reply_array is None:
+            return size == self.reply_size
+        return self.reply_array[1] <= size <= self.reply_size
+
+    def unpack(self, struct_type, array, data):
+        """Unpack a message or reply, arrays only keep the used elements."""
+        struct = struct_type.from_buffer_copy(
+            data.ljust(ctypes.sizeof(struct_type), b"\0"))
+        if array is not None and len(data) != self.sent_size(struct, array):
+            raise ValueError("Size of %s does not match the count" % self.name)
+        values = to_dict(struct)
+        if array is not None:
+            arg, offset, _ = array
+            values[arg.name] = bytes(data[offset:])
+        return values
+
+    def unpack_msg(self, data):
+        """Unpack a message of this call into a dict."""
+        return self.unpack(self.msg, self.msg_array, data)
+
+    def unpack_reply(self, data):
+        """Unpack a reply of this call into a dict."""
+        return self.unpack(self.reply, self.reply_array, data)
+
+
+def set_field(struct, name, value):
+    """Set a field, bytes are copied into aggregates and zero padded."""
+    if isinstance(value, (bytes, bytearray)):
+        field = getattr(struct, name)
+        if len(value) > len(field):
+            raise ValueError("Too much data for " + name)
+        ctypes.memmove(ctypes.addressof(field), value, len(value))
+    else:
+        setattr(struct, name, value)
+
+
+def to_dict(struct):
+    """Turn a struct into a dict, aggregates become bytes."""
+    values = {}
+    for name, _ in struct._fields_:
+        if name.startswith("_pad"):
+            continue
+        value = getattr(struct, name)
+        if isinstance(value, ctypes.Array):
+            value = bytes(value)
+        values[name] = value
+    return values
+
+
+class Layout:
+    """The wire layout of every call of a protocol."""
+
+    @classmethod
+    def load(cls, proto_file, layout_file):
+        """Load the protocol JSON and the layout printed by monado-ctl -w."""
+        with open(layout_file) as infile:
+            data = json.loads(infile.read())
+        return cls(Proto.load_and_parse(proto_file), data)
+
+    def __init__(self, proto, data):
+        """Construct from a parsed protocol and the layout description."""
+        self.socket = data["socket"]
+        self.max_clients = data["max_clients"]
+        self.max_handles = data["max_handles"]
+        self.max_msg_size = data["max_msg_size"]
+        self.max_reply_size = data["max_reply_size"]
+        self.fingerprint = int(data["fingerprint"], 16)
+
+        calls = {call.name: call for call in proto.calls}
+        if set(calls) != set(c["name"] for c in data["calls"]):
+            raise RuntimeError("Layout was generated from another protocol")
+
+        self.calls = [CallLayout(calls[c["name"]], c) for c in data["calls"]]
+        self.by_name = {call.name: call for call in self.calls}
+        self.by_id = {call.id: call for call in self.calls}
+
+        # Structs tools fill in themselves, the fields are raw bytes.
+        self.structs = {}
+        for name, struct in data["structs"].items():
+            fields = [(field["name"], ctypes.c_uint8 * field["size"],
+                       field["offset"]) for field in struct["fields"]]
+            self.structs[name] = make_struct(name, fields, struct["size"])
+
+    def unpack_msg(self, data):
+        """Unpack any message, returns the call and the values."""
+        cmd = int.from_bytes(data[:4], sys.byteorder, signed=True)
+        call = self.by_id.get(cmd)
+        if call is None:
+            raise ValueError("Unknown command %d" % cmd)
+        return call, call.unpack_msg(data)
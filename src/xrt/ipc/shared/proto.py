@@ -4,11 +4,23 @@
 """Generate code from a JSON file describing the IPC protocol."""
 
 import argparse
+import os
 
-from ipcproto.common import (Proto, write_decl, write_invocation,
-                             write_result_handler, write_cpp_header_guard_start,
+from ipcproto.cheader import Headers
+from ipcproto.common import (Proto, GeneratedFile, write_decl,
+                             write_invocation, write_result_handler,
+                             write_cpp_header_guard_start,
                              write_cpp_header_guard_end)
 
+# The headers defining the shared memory and everything in it.
+SHARED_HEADERS = (
+    "ipc_protocol.h",
+    "../../include/xrt/xrt_compositor.h",
+    "../../include/xrt/xrt_defines.h",
+    "../../include/xrt/xrt_device.h",
+    "../../include/xrt/xrt_tracking.h",
+)
+
 header = '''// Copyright 2020, Collabora, Ltd.
 // SPDX-License-Identifier: BSL-1.0
 /*!
@@ -20,16 +32,23 @@ header = '''// Copyright 2020, Collabora, Ltd.
 '''
 
 
-def generate_h(file, p):
+def channel_id(channel):
+    """Get the enum value of a channel."""
+    return "IPC_CHANNEL_" + channel.upper()
+
+
+def generate_h(file, p, headers):
     """Generate protocol header.
 
     Defines command enum, utility functions, and command and reply structures.
     """
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated IPC protocol header', suffix=''))
     f.write('''
 #pragma once
 
+#include <assert.h>
+#include <stddef.h>
 
 
 struct ipc_connection;
@@ -42,6 +61,15 @@ typedef enum ipc_command
     for call in p.calls:
         f.write("\n\t" + call.id + ",")
     f.write("\n} ipc_command_t;\n")
+    f.write("\n#define IPC_COMMAND_COUNT " + str(len(p.calls) + 1) + "\n")
+
+    f.write("\nenum ipc_channel\n{")
+    for channel in p.channels:
+        f.write("\n\t" + channel_id(channel) + ",")
+    f.write("\n};\n")
+    f.write("\n#define IPC_CHANNEL_COUNT " + str(len(p.channels)) + "\n")
+    f.write("\nstatic_assert(IPC_CHANNEL_COUNT <= IPC_MAX_CHANNELS, "
+            "\"Too many channels, increase IPC_MAX_CHANNELS\");\n")
 
     f.write('''
 struct ipc_command_msg
@@ -92,19 +120,391 @@ ipc_cmd_to_str(ipc_command_t id)
 
     f.write("#pragma pack (pop)\n")
 
+    write_size_checks(f, p)
+    write_fingerprint(f, p, headers)
+
     f.close()
 
 
-def generate_client_c(file, p):
+def msg_struct(call):
+    """Get the struct sent for a call."""
+    if call.needs_msg_struct:
+        return "struct ipc_%s_msg" % call.name
+    return "struct ipc_command_msg"
+
+
+def reply_struct(call):
+    """Get the struct replied for a call, None if there is no reply."""
+    if call.out_args:
+        return "struct ipc_%s_reply" % call.name
+    if call.reply:
+        return "struct ipc_result_reply"
+    return None
+
+
+def array_size(struct, arg, count):
+    """Get the size of a struct sent with only count elements of its array."""
+    return "offsetof(%s, %s) + %s * sizeof(((%s *)NULL)->%s[0])" % (
+        struct, arg.name, count, struct, arg.name)
+
+
+def write_size_checks(f, p):
+    """Write the largest message sizes and check that all messages fit."""
+    f.write('''
+/*!
+ * Every message of the protocol, used to get the size of the largest one.
+ */
+union ipc_any_msg
+{
+\tstruct ipc_command_msg command;''')
+    for call in p.calls:
+        if call.needs_msg_struct:
+            f.write("\n\tstruct ipc_%s_msg %s;" % (call.name, call.name))
+    f.write('''
+};
+
+/*!
+ * Every reply of the protocol, used to get the size of the largest one.
+ */
+union ipc_any_reply
+{
+\tstruct ipc_result_reply result;''')
+    for call in p.calls:
+        if call.out_args:
+            f.write("\n\tstruct ipc_%s_reply %s;" % (call.name, call.name))
+    f.write('''
+};
+
+//! Size of the largest message, receive buffers only need to be this big.
+#define IPC_MAX_MSG_SIZE (sizeof(union ipc_any_msg))
+
+//! Size of the largest reply.
+#define IPC_MAX_REPLY_SIZE (sizeof(union ipc_any_reply))
+
+/*!
+ * Wire size of the message and reply of a call, see @ref ipc_wire_sizes.
+ */
+struct ipc_wire_size
+{
+\tconst char *name;
+\tuint32_t msg_size;
+\t//! Zero for calls without a reply.
+\tuint32_t reply_size;
+};
+
+/*!
+ * Where a field is in the message or reply of a call, see @ref ipc_wire_fields.
+ */
+struct ipc_wire_field
+{
+\tipc_command_t cmd;
+\t//! Is this a field of the reply rather than the message.
+\tbool reply;
+\tconst char *name;
+\tuint32_t offset;
+\tuint32_t size;
+\t//! Size of one element of a counted array, zero for other fields.
+\tuint32_t elem_size;
+};
+
+''')
+    f.write("static_assert(IPC_COMMAND_COUNT <= IPC_MAX_COMMANDS, \"IPC_MAX_COMMANDS is too small for the call counters\");\n")
+    # Calls without arguments share struct ipc_command_msg, check it once.
+    msgs = sorted(set(msg_struct(call) for call in p.calls))
+    for msg in msgs:
+        f.write("static_assert(sizeof(%s) <= IPC_BUF_SIZE, \"%s is larger than IPC_BUF_SIZE\");\n" % (
+            msg, msg[len("struct "):]))
+    # Replies are received straight into the reply struct, unless the call
+    # uses the ring where they need to fit next to the size word.
+    replies = sorted(set(reply_struct(call) for call in p.calls
+                         if call.out_args and call.uses_ring))
+    for reply in replies:
+        f.write("static_assert(sizeof(%s) + sizeof(uint32_t) <= IPC_RING_SIZE, \"%s is larger than IPC_RING_SIZE\");\n" % (
+            reply, reply[len("struct "):]))
+
+
+def write_fingerprint(f, p, headers):
+    """Write the protocol hash and the function adding the layout of the
+    shared memory and of the messages."""
+    f.write('''
+//! Hash of the calls and their argument types, see @ref ipc_protocol_fingerprint.
+#define IPC_PROTOCOL_HASH UINT64_C(0x%016x)
+
+/*!
+ * Fingerprint of the protocol, the same for builds that can talk to each
+ * other. Adds what only the compiler knows to @ref IPC_PROTOCOL_HASH: the
+ * sizes and member offsets of everything in the shared memory, the values of
+ * the enums in it and the sizes of every message and reply.
+ */
+static inline uint64_t
+ipc_protocol_fingerprint(void)
+{
+\tstatic const uint64_t layout[] = {''' % p.fingerprint)
+    for typename in headers.reachable("struct ipc_shared_memory"):
+        if typename in headers.enums:
+            for enumerator in headers.enums[typename]:
+                f.write("\n\t    (uint64_t)%s," % enumerator)
+            continue
+        f.write("\n\t    sizeof(%s)," % typename)
+        for member in headers.aggregates[typename]:
+            for designator in member.designators():
+                f.write("\n\t    offsetof(%s, %s)," % (typename, designator))
+    for call in p.calls:
+        f.write("\n\t    sizeof(%s)," % msg_struct(call))
+        reply = reply_struct(call)
+        if reply:
+            f.write("\n\t    sizeof(%s)," % reply)
+    f.write('''
+\t};
+
+\t// FNV-1a over the layout.
+\tuint64_t hash = IPC_PROTOCOL_HASH;
+\tfor (size_t i = 0; i < sizeof(layout) / sizeof(layout[0]); i++) {
+\t\thash ^= layout[i];
+\t\thash *= UINT64_C(0x100000001b3);
+\t}
+\treturn hash;
+}
+''')
+
+
+def write_wire_sizes(f, p):
+    """Write the table of the wire sizes of all calls."""
+    f.write('''
+const struct ipc_wire_size ipc_wire_sizes[IPC_COMMAND_COUNT] = {
+\t[IPC_ERR] = {"IPC_ERR", 0, 0},''')
+    for call in p.calls:
+        reply = reply_struct(call)
+        f.write("\n\t[%s] = {\"%s\", sizeof(%s), %s}," % (
+            call.id, call.name, msg_struct(call),
+            "sizeof(%s)" % reply if reply else "0"))
+    f.write("\n};\n")
+
+
+def write_call_counters_print(f):
+    """Write the function printing the call counters of a client."""
+    f.write('''
+void
+ipc_call_counters_print(FILE *file,
+                        const struct ipc_client_call_counters *now,
+                        const struct ipc_client_call_counters *before,
+                        uint64_t interval_ns)
+{
+\tfprintf(file, "%-44s %12s %10s %10s %12s\\n", "command", "count", "per_sec", "errors", "handler_us");
+
+\tfor (uint32_t cmd = 1; cmd < IPC_COMMAND_COUNT; cmd++) {
+\t\tconst struct ipc_call_counter *c = &now->calls[cmd];
+\t\tuint64_t prev = before != NULL ? before->calls[cmd].count : 0;
+\t\tif (c->count == 0 || (before != NULL && c->count == prev)) {
+\t\t\tcontinue;
+\t\t}
+
+\t\tdouble per_sec = interval_ns > 0 ? (double)(c->count - prev) * 1e9 / (double)interval_ns : 0.0;
+\t\tfprintf(file, "%-44s %12" PRIu64 " %10.1f %10" PRIu64 " %12.1f\\n", ipc_cmd_to_str((ipc_command_t)cmd),
+\t\t        c->count, per_sec, c->errors, (double)c->handler_ns / (double)c->count / 1000.0);
+\t}
+}
+''')
+
+
+def wire_fields(call):
+    """Get the struct, reply flag, name and arg of every field of a call."""
+    msg = msg_struct(call)
+    yield msg, False, "cmd", None
+    for arg in call.in_args:
+        yield msg, False, arg.name, arg
+    if call.in_handles:
+        yield msg, False, call.in_handles.count_arg_name, None
+    reply = reply_struct(call)
+    if reply:
+        yield reply, True, "result", None
+    for arg in call.out_args:
+        yield reply, True, arg.name, arg
+
+
+def write_wire_fields(f, p):
+    """Write the table of the layout of all messages and replies."""
+    f.write("\nconst struct ipc_wire_field ipc_wire_fields[] = {")
+    count = 0
+    for call in p.calls:
+        for struct, is_reply, name, arg in wire_fields(call):
+            elem_size = "0"
+            if arg is not None and arg.is_array:
+                elem_size = "sizeof(((%s *)NULL)->%s[0])" % (struct, name)
+            f.write("\n\t{%s, %s, \"%s\", offsetof(%s, %s), sizeof(((%s *)NULL)->%s), %s}," % (
+                call.id, "true" if is_reply else "false", name,
+                struct, name, struct, name, elem_size))
+            count += 1
+    f.write("\n};\n")
+    f.write("\nconst uint32_t ipc_wire_field_count = %d;\n" % count)
+
+
+def write_count_start(f, instrument, indent):
+    """Write taking the timestamp for the call counters."""
+    if instrument:
+        f.write("%suint64_t _t_count = _t_handler;\n" % indent)
+    else:
+        f.write("%suint64_t _t_count = os_monotonic_get_ns();\n" % indent)
+
+
+def write_count_end(f, call, result, indent):
+    """Write updating the call counters with the result of the handler."""
+    f.write("%suint64_t _handler_ns = os_monotonic_get_ns() - _t_count;\n" % indent)
+    f.write("%sipc_server_count_call(ics, %s, %s, _handler_ns);\n" % (
+        indent, call.id, result))
+
+
+def write_budget_check(f, call, budgets, msg, size, indent):
+    """Write recording the call if the handler went over its budget."""
+    if not budgets or call.budget_us is None:
+        return
+    budget = "UINT64_C(%d)" % (call.budget_us * 1000)
+    f.write("%sif (_handler_ns > %s) {\n" % (indent, budget))
+    f.write("%s\tipc_server_record_slow_call(ics, %s, _t_count, %s, %s, _handler_ns, %s);\n" % (
+        indent, call.id, msg, size, budget))
+    f.write("%s}\n" % indent)
+
+
+def write_stats_timestamp(f, name, indent):
+    """Write taking a timestamp for the instrumentation."""
+    f.write("%suint64_t %s = os_monotonic_get_ns();\n" % (indent, name))
+
+
+def write_stats_record(f, call, phase, start, end, indent):
+    """Write recording a phase of a call to the instrumentation."""
+    f.write("%sipc_stats_record(%s, IPC_STATS_%s, %s, %s);\n" %
+            (indent, call.id, phase, start, end))
+
+
+def write_channel_select(f, call):
+    """Write picking the channel of a call, returns the imc, mutex and fifo."""
+    # Calls on other channels fall back to the main one if needed.
+    if call.channel == "main":
+        return "&ipc_c->imc", "&ipc_c->mutex", "&ipc_c->pending"
+    f.write("\tstruct ipc_client_channel *_ch = &ipc_c->channels[%s];\n" % channel_id(call.channel))
+    f.write("\tstruct ipc_message_channel *_imc = _ch->connected ? &_ch->imc : &ipc_c->imc;\n")
+    f.write("\tstruct os_mutex *_mutex = _ch->connected ? &_ch->mutex : &ipc_c->mutex;\n")
+    f.write("\tstruct ipc_pending_fifo *_pending = _ch->connected ? &_ch->pending : &ipc_c->pending;\n")
+    return "_imc", "_mutex", "_pending"
+
+
+def has_async(p):
+    """Can there be replies pending, see write_pending_drain.
+
+    Calls on other channels fall back to the main one when their channel
+    isn't connected, so any begun call can have its reply pending on the
+    main channel, whichever channel it belongs to.
+    """
+    return any(call.is_async for call in p.calls)
+
+
+def is_batch(call):
+    """Is this the call carrying a struct ipc_batch, see ipc_dispatch_batch."""
+    return any(arg.typename == "struct ipc_batch" for arg in call.in_args)
+
+
+def write_pending_drain(f, call, imc, pending, cleanup):
+    """Write receiving the replies to begun calls before our own reply."""
+    if pending.startswith("&"):
+        cond = "%s.first != NULL" % pending[1:]
+    else:
+        cond = "%s->first != NULL" % pending
+    if call.uses_ring:
+        # Replies over the ring never wait behind those on the socket.
+        cond = "ipc_c->ring == NULL && " + cond
+    f.write("\n\t// Replies to calls begun earlier on this channel come first.")
+    f.write("\n\tif (%s) {" % cond)
+    write_invocation(f, 'ret', 'ipc_client_pending_receive',
+                     [imc, pending, 'NULL'], indent="\t\t")
+    f.write(';')
+    write_result_handler(f, 'ret', cleanup, indent="\t\t")
+    f.write("\t}\n")
+
+
+def write_msg_init(f, call, name):
+    """Write the message struct of a call filled in from the arguments."""
+    f.write("\t%s %s = {\n" % (msg_struct(call), name))
+    f.write("\t    .cmd = " + str(call.id) + ",\n")
+    for arg in call.in_args:
+        if arg.is_array:
+            continue
+        if arg.is_aggregate:
+            f.write("\t    ." + arg.name + " = *" + arg.name + ",\n")
+        else:
+            f.write("\t    ." + arg.name + " = " + arg.name + ",\n")
+    if call.in_handles:
+        f.write("\t    ." + call.in_handles.count_arg_name +
+                " = " + call.in_handles.count_arg_name + ",\n")
+    f.write("\t};\n")
+
+
+def write_async_calls(f, call):
+    """Write ipc_call_CALLNAME_begin and ipc_call_CALLNAME_end."""
+    call.write_begin_decl(f)
+    f.write("\n{\n")
+    f.write("\tIPC_TRACE(ipc_c, \"Beginning %s\");\n\n" % call.name)
+    write_msg_init(f, call, "_msg")
+    imc, mutex, pending = write_channel_select(f, call)
+    f.write("\n\t// Always over the socket, the ring only holds one call at a time.\n")
+    f.write("\tos_mutex_lock(%s);" % mutex)
+    write_invocation(f, 'xrt_result_t ret', 'ipc_send',
+                     [imc, '&_msg', 'sizeof(_msg)'], indent="\t")
+    f.write(";\n")
+    f.write("\tif (ret == XRT_SUCCESS) {\n")
+    f.write("\t\tipc_client_pending_push(%s, &token->pending, &token->reply, sizeof(token->reply));\n" % pending)
+    f.write("\t}\n")
+    f.write("\tos_mutex_unlock(%s);\n" % mutex)
+    f.write("\n\treturn ret;\n}\n")
+
+    call.write_end_decl(f)
+    f.write("\n{\n")
+    f.write("\tIPC_TRACE(ipc_c, \"Ending %s\");\n\n" % call.name)
+    imc, mutex, pending = write_channel_select(f, call)
+    f.write("\n\tos_mutex_lock(%s);" % mutex)
+    write_invocation(f, 'xrt_result_t ret', 'ipc_client_pending_receive',
+                     [imc, pending, '&token->pending'], indent="\t")
+    f.write(";\n")
+    f.write("\tos_mutex_unlock(%s);\n" % mutex)
+    f.write("\tif (ret != XRT_SUCCESS) {\n")
+    f.write("\t\treturn ret;\n")
+    f.write("\t}\n\n")
+    for arg in call.out_args:
+        f.write("\t*out_" + arg.name + " = token->reply." + arg.name + ";\n")
+    f.write("\treturn token->reply.result;\n}\n")
+
+
+def generate_client_c(file, p, instrument=False):
     """Generate IPC client proxy source."""
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated IPC client code', suffix='_client'))
     f.write('''
 #include "client/ipc_client.h"
 #include "ipc_protocol_generated.h"
+#include "ipc_client_generated.h"
 
+#include <stddef.h>
+#include <inttypes.h>
+''')
+    if any(call.uses_ring for call in p.calls):
+        f.write('''
+#include "shared/ipc_ring.h"
+''')
+    if any(call.batchable or call.in_array or call.out_array
+           for call in p.calls):
+        f.write('''
+#include <string.h>
+''')
+    if instrument:
+        f.write('''
+#include "os/os_time.h"
+#include "shared/ipc_stats.h"
+''')
+    f.write("\n")
 
-\n''')
+    write_wire_sizes(f, p)
+    write_wire_fields(f, p)
+    write_call_counters_print(f)
+    f.write("\n\n")
 
     # Loop over all of the calls.
     for call in p.calls:
@@ -114,43 +514,86 @@ def generate_client_c(file, p):
         f.write("\tIPC_TRACE(ipc_c, \"Calling " + call.name + "\");\n\n")
 
         # Message struct
-        if call.needs_msg_struct:
-            f.write("\tstruct ipc_" + call.name + "_msg _msg = {\n")
-        else:
-            f.write("\tstruct ipc_command_msg _msg = {\n")
-        f.write("\t    .cmd = " + str(call.id) + ",\n")
-        for arg in call.in_args:
-            if arg.is_aggregate:
-                f.write("\t    ." + arg.name + " = *" + arg.name + ",\n")
-            else:
-                f.write("\t    ." + arg.name + " = " + arg.name + ",\n")
-        if call.in_handles:
-            f.write("\t    ." + call.in_handles.count_arg_name +
-                    " = " + call.in_handles.count_arg_name + ",\n")
-        f.write("\t};\n")
+        write_msg_init(f, call, "_msg")
+
+        # Only the used elements of an array are sent.
+        msg_size = "sizeof(_msg)"
+        array = call.in_array
+        if array:
+            f.write("\tif (%s > %s) {\n" % (array.count, array.max))
+            f.write("\t\treturn XRT_ERROR_IPC_FAILURE;\n")
+            f.write("\t}\n")
+            f.write("\tmemcpy(_msg.%s, %s, %s * sizeof(_msg.%s[0]));\n" % (
+                array.name, array.name, array.count, array.name))
+            f.write("\tsize_t _msg_size = %s;\n" % array_size(
+                msg_struct(call), array, array.count))
+            msg_size = "_msg_size"
 
         # Reply struct
         if call.out_args:
             f.write("\tstruct ipc_" + call.name + "_reply _reply;\n")
-        else:
+        elif call.reply:
             f.write("\tstruct ipc_result_reply _reply = {0};\n")
         if call.in_handles:
+            f.write("#ifndef %s\n" % call.in_handles.fd_define)
             f.write("\tstruct ipc_result_reply _sync = {0};\n")
+            f.write("#endif\n")
 
-        f.write("""
-\t// Other threads must not read/write the fd while we wait for reply
-\tos_mutex_lock(&ipc_c->mutex);
-""")
-        cleanup = "os_mutex_unlock(&ipc_c->mutex);"
+        imc, mutex, pending = write_channel_select(f, call)
+
+        f.write("\n")
+        if instrument:
+            write_stats_timestamp(f, "_t_start", "\t")
+        if call.reply:
+            f.write("\t// Other threads must not read/write the fd while we wait for reply\n")
+        else:
+            f.write("\t// Other threads must not write the fd while we send\n")
+        f.write("\tos_mutex_lock(%s);\n" % mutex)
+        if instrument:
+            write_stats_timestamp(f, "_t_locked", "\t")
+        cleanup = "os_mutex_unlock(%s);" % mutex
 
         # Prepare initial sending
         func = 'ipc_send'
-        args = ['&ipc_c->imc', '&_msg', 'sizeof(_msg)']
-        f.write("\n\t// Send our request")
-        write_invocation(f, 'xrt_result_t ret', func, args, indent="\t")
-        f.write(';')
+        args = [imc, '&_msg', msg_size]
+        if call.uses_ring:
+            f.write("\n\t// Send our request, over the ring if we have one")
+            f.write("\n\txrt_result_t ret;")
+            f.write("\n\tif (ipc_c->ring != NULL) {")
+            write_invocation(f, 'ret', 'ipc_ring_client_send',
+                             ['ipc_c->ring', '&_msg', 'sizeof(_msg)'],
+                             indent="\t\t")
+            f.write(";\n\t} else {")
+            write_invocation(f, 'ret', func, args, indent="\t\t")
+            f.write(";\n\t}")
+        elif call.in_handles:
+            f.write("\n#ifdef %s" % call.in_handles.fd_define)
+            f.write("\n\t// Send our request along with the handles")
+            write_invocation(
+                f,
+                'xrt_result_t ret',
+                'ipc_send_handles_' + call.in_handles.stem,
+                args + [call.in_handles.arg_name,
+                        call.in_handles.count_arg_name],
+                indent="\t"
+            )
+            f.write(';')
+            write_result_handler(f, 'ret', cleanup, indent="\t")
+            if has_async(p):
+                write_pending_drain(f, call, imc, pending, cleanup)
+            f.write("#else")
+            f.write("\n\t// Send our request")
+            write_invocation(f, 'xrt_result_t ret', func, args, indent="\t")
+            f.write(';')
+        else:
+            f.write("\n\t// Send our request")
+            write_invocation(f, 'xrt_result_t ret', func, args, indent="\t")
+            f.write(';')
         write_result_handler(f, 'ret', cleanup, indent="\t")
 
+        if call.reply and has_async(p):
+            write_pending_drain(f, call, imc, pending, cleanup)
+
         if call.in_handles:
             f.write("\n\t// Send our handles separately\n")
             f.write("\n\t// Wait for server sync")
@@ -160,7 +603,7 @@ def generate_client_c(file, p):
                 'ret',
                 'ipc_receive',
                 (
-                    '&ipc_c->imc',
+                    imc,
                     '&_sync',
                     'sizeof(_sync)'
                     ),
@@ -180,7 +623,7 @@ def generate_client_c(file, p):
                 'ret',
                 'ipc_send_handles_' + call.in_handles.stem,
                 (
-                    '&ipc_c->imc',
+                    imc,
                     "&_handle_msg",
                     "sizeof(_handle_msg)",
                     call.in_handles.arg_name,
@@ -190,21 +633,101 @@ def generate_client_c(file, p):
             )
             f.write(';')
             write_result_handler(f, 'ret', cleanup, indent="\t")
+            f.write("#endif\n")
+
+        if instrument:
+            f.write("\n")
+            write_stats_timestamp(f, "_t_sent", "\t")
+
+        if not call.reply:
+            f.write("\n\t" + cleanup + "\n")
+            if instrument:
+                f.write("\n")
+                write_stats_record(f, call, "CLIENT_LOCK", "_t_start", "_t_locked", "\t")
+                write_stats_record(f, call, "CLIENT_SEND", "_t_locked", "_t_sent", "\t")
+            f.write("\n\t// No reply, errors are reported by a later call.")
+            f.write("\n\treturn ipc_client_take_deferred_result(ipc_c);\n}\n")
+            continue
 
         f.write("\n\t// Await the reply")
         func = 'ipc_receive'
-        args = ['&ipc_c->imc', '&_reply', 'sizeof(_reply)']
+        args = [imc, '&_reply', 'sizeof(_reply)']
         if call.out_handles:
             func += '_handles_' + call.out_handles.stem
             args.extend(call.out_handles.arg_names)
-        write_invocation(f, 'ret', func, args, indent="\t")
-        f.write(';')
+        if call.out_array:
+            f.write("\n\tsize_t _reply_size = 0;")
+            func = 'ipc_receive_message'
+            args.append('&_reply_size')
+        if call.uses_ring:
+            f.write("\n\tif (ipc_c->ring != NULL) {")
+            write_invocation(f, 'ret', 'ipc_ring_client_receive',
+                             ['ipc_c->ring', imc, '&_reply',
+                              'sizeof(_reply)'],
+                             indent="\t\t")
+            f.write(";\n\t} else {")
+            write_invocation(f, 'ret', func, args, indent="\t\t")
+            f.write(";\n\t}")
+        else:
+            write_invocation(f, 'ret', func, args, indent="\t")
+            f.write(';')
         write_result_handler(f, 'ret', cleanup, indent="\t")
+        if instrument:
+            write_stats_timestamp(f, "_t_replied", "\t")
+
+        array = call.out_array
+        if array:
+            count = "_reply." + array.count
+            f.write("\n\t// The count comes from the service, check it against what was received.\n")
+            f.write("\tif (_reply_size < offsetof(%s, %s) || %s > %s ||\n" % (
+                reply_struct(call), array.name, count, array.max))
+            f.write("\t    _reply_size != %s) {\n" % array_size(
+                reply_struct(call), array, count))
+            f.write("\t\t%s\n" % cleanup)
+            f.write("\t\treturn XRT_ERROR_IPC_FAILURE;\n")
+            f.write("\t}\n\n")
 
         for arg in call.out_args:
+            if arg.is_array:
+                f.write("\tmemcpy(out_%s, _reply.%s, _reply.%s * sizeof(_reply.%s[0]));\n" % (
+                    arg.name, arg.name, arg.count, arg.name))
+                continue
             f.write("\t*out_" + arg.name + " = _reply." + arg.name + ";\n")
         f.write("\n\t" + cleanup)
+        if instrument:
+            f.write("\n\n")
+            write_stats_record(f, call, "CLIENT_LOCK", "_t_start", "_t_locked", "\t")
+            write_stats_record(f, call, "CLIENT_SEND", "_t_locked", "_t_sent", "\t")
+            write_stats_record(f, call, "CLIENT_WAIT", "_t_sent", "_t_replied", "\t")
         f.write("\n\treturn _reply.result;\n}\n")
+
+    # Functions starting calls and picking up their replies later.
+    for call in p.calls:
+        if call.is_async:
+            write_async_calls(f, call)
+
+    # Functions adding calls to a batch.
+    for call in p.calls:
+        if not call.batchable:
+            continue
+
+        call.write_batch_decl(f)
+        f.write("\n{\n")
+
+        write_msg_init(f, call, "_msg")
+
+        f.write('''
+\tif (batch->call_count >= IPC_BATCH_MAX_CALLS || IPC_BATCH_DATA_SIZE - batch->size < sizeof(_msg)) {
+\t\treturn XRT_ERROR_IPC_FAILURE;
+\t}
+
+\tmemcpy(&batch->data[batch->size], &_msg, sizeof(_msg));
+\tbatch->size += sizeof(_msg);
+\tbatch->call_count++;
+
+\treturn XRT_SUCCESS;
+}
+''')
     f.close()
 
 
@@ -213,7 +736,7 @@ def generate_client_h(file, p):
 
     Contains prototypes for generated IPC proxy call functions.
     """
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated IPC client code', suffix='_client'))
     f.write('''
 #pragma once
@@ -226,106 +749,520 @@ def generate_client_h(file, p):
     write_cpp_header_guard_start(f)
     f.write("\n")
 
+    f.write("//! Wire size of every call, indexed by @ref ipc_command.\n")
+    f.write("extern const struct ipc_wire_size ipc_wire_sizes[IPC_COMMAND_COUNT];\n\n")
+    f.write("//! Layout of every field of every call, grouped by call.\n")
+    f.write("extern const struct ipc_wire_field ipc_wire_fields[];\n\n")
+    f.write("//! Number of entries in @ref ipc_wire_fields.\n")
+    f.write("extern const uint32_t ipc_wire_field_count;\n\n")
+    f.write('''/*!
+ * Print the calls a client has made, with the mean handler time. If @p before
+ * is given only calls made since then are printed, with their rate over
+ * @p interval_ns.
+ */
+void
+ipc_call_counters_print(FILE *file,
+                        const struct ipc_client_call_counters *now,
+                        const struct ipc_client_call_counters *before,
+                        uint64_t interval_ns);
+
+''')
+
     for call in p.calls:
         call.write_call_decl(f)
         f.write(";\n")
 
+    for call in p.calls:
+        if not call.is_async:
+            continue
+        f.write('''
+/*!
+ * A %s call that has been begun, must be kept alive
+ * until it has been ended.
+ */
+struct ipc_%s_token
+{
+\tstruct ipc_pending_call pending;
+\t%s reply;
+};
+''' % (call.name, call.name, reply_struct(call)))
+        call.write_begin_decl(f)
+        f.write(";\n")
+        call.write_end_decl(f)
+        f.write(";\n")
+
+    for call in p.calls:
+        if call.batchable:
+            call.write_batch_decl(f)
+            f.write(";\n")
+
     write_cpp_header_guard_end(f)
 
     f.close()
 
 
-def generate_server_c(file, p):
+def generate_server_c(file, p, instrument=False, dispatch_table=False,
+                      capture=False, budgets=False):
     """Generate IPC server stub/dispatch source."""
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated IPC server code', suffix='_server'))
     f.write('''
 #include "xrt/xrt_limits.h"
-
+''')
+    f.write('''
+#include "os/os_time.h"
+''')
+    if any(call.in_array or call.out_array for call in p.calls):
+        f.write('''
+#include <stddef.h>
+''')
+    f.write('''
 #include "shared/ipc_protocol.h"
 #include "shared/ipc_utils.h"
-
+''')
+    if any(call.uses_ring for call in p.calls):
+        f.write('''#include "shared/ipc_ring.h"
+''')
+    if instrument:
+        f.write('''#include "shared/ipc_stats.h"
+''')
+    if capture:
+        f.write('''#include "shared/ipc_capture.h"
+''')
+    f.write('''
 #include "server/ipc_server.h"
 
 #include "ipc_server_generated.h"
 
 ''')
+    if any(call.batchable for call in p.calls):
+        f.write('''#include <string.h>
+
+''')
+
+    if dispatch_table:
+        generate_server_dispatch_table(f, p, instrument, capture, budgets)
+    else:
+        generate_server_dispatch_switch(f, p, instrument, capture, budgets)
+
+    generate_server_ring_dispatch(f, p, instrument, capture, budgets)
+    generate_server_batch_dispatch(f, p, capture, budgets)
+    f.close()
+
+
+def write_dispatch_call(f, call, instrument, capture, budgets, indent,
+                        check_size):
+    """Write the body dispatching one call, shared by the switch and table."""
+
+    f.write(indent + "IPC_TRACE(ics->server, \"Dispatching " + call.name +
+            "\");\n\n")
+    if instrument:
+        write_stats_timestamp(f, "_t_dispatch", indent)
+    # The calls in a batch are captured one by one as they run.
+    capture = capture and not is_batch(call)
+    if capture:
+        write_stats_timestamp(f, "_t_capture", indent)
+
+    if call.needs_msg_struct:
+        f.write(
+            indent + "struct ipc_{}_msg *msg = ".format(call.name))
+        f.write("(struct ipc_{}_msg *)ipc_command;\n".format(call.name))
+    if call.out_args:
+        f.write(indent + "struct ipc_%s_reply reply = {0};\n" % call.name)
+    else:
+        f.write(indent + "struct ipc_result_reply reply = {0};\n")
+    if call.in_handles:
+        f.write(indent + "%s in_%s[XRT_MAX_IPC_HANDLES] = {0};\n" % (
+            call.in_handles.typename, call.in_handles.arg_name))
+        # Unless they are fds we need to fetch these handles separately
+        f.write("#ifndef %s\n" % call.in_handles.fd_define)
+        f.write(indent + "struct ipc_result_reply _sync = {XRT_SUCCESS};\n")
+        f.write(indent + "struct ipc_command_msg _handle_msg = {0};\n")
+        f.write("#endif\n")
+    if call.out_handles:
+        f.write(indent + "%s %s[XRT_MAX_IPC_HANDLES] = {0};\n" % (
+            call.out_handles.typename, call.out_handles.arg_name))
+        f.write(indent + "%s %s = {0};\n" % (
+            call.out_handles.count_arg_type,
+            call.out_handles.count_arg_name))
+    f.write("\n")
+
+    array = call.in_array
+    if array:
+        # The count must match the number of elements that were sent.
+        count = "msg->" + array.count
+        f.write(indent + "if (size < offsetof(%s, %s) || %s > %s ||\n" % (
+            msg_struct(call), array.name, count, array.max))
+        f.write(indent + "    size != %s) {\n" % array_size(
+            msg_struct(call), array, count))
+        f.write(indent + "\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "}\n")
+    elif check_size:
+        f.write(indent + "if (size != sizeof(%s)) {\n" % msg_struct(call))
+        f.write(indent + "\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "}\n")
+
+    if call.in_handles:
+        # Validate the number of handles.
+        f.write(indent + "if (msg->%s > XRT_MAX_IPC_HANDLES) {\n" % (call.in_handles.count_arg_name))
+        f.write(indent + "\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "}\n")
+
+        # The fds came with the message, take ownership of them.
+        f.write("#ifdef %s\n" % call.in_handles.fd_define)
+        f.write(indent + "if (fd_count != msg->%s) {\n" % (call.in_handles.count_arg_name))
+        f.write(indent + "\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "}\n")
+        f.write(indent + "for (uint32_t i = 0; i < fd_count; i++) {\n")
+        f.write(indent + "\tin_%s[i] = fds[i];\n" % call.in_handles.arg_name)
+        f.write(indent + "\tfds[i] = -1;\n")
+        f.write(indent + "}\n")
+        f.write("#else\n")
+
+        # Let the client know we are ready to receive the handles.
+        write_invocation(
+            f,
+            'xrt_result_t sync_result',
+            'ipc_send',
+            (
+                "imc",
+                "&_sync",
+                "sizeof(_sync)"
+            ),
+            indent=indent
+        )
+        f.write(";")
+        write_result_handler(f, "sync_result",
+                             indent=indent)
+        write_invocation(
+            f,
+            'xrt_result_t receive_handle_result',
+            'ipc_receive_handles_' + call.in_handles.stem,
+            (
+                "imc",
+                "&_handle_msg",
+                "sizeof(_handle_msg)",
+                "in_" + call.in_handles.arg_name,
+                "msg->"+call.in_handles.count_arg_name
+            ),
+            indent=indent
+        )
+        f.write(";")
+        write_result_handler(f, "receive_handle_result",
+                             indent=indent)
+        f.write(indent + "if (_handle_msg.cmd != %s) {\n" % str(call.id))
+        f.write(indent + "\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "}\n")
+        f.write("#endif\n")
+
+    # Write call to ipc_handle_CALLNAME
+    args = ["ics"]
+    for arg in call.in_args:
+        args.append(("&msg->" + arg.name)
+                    if arg.is_aggregate
+                    else ("msg->" + arg.name))
+    args.extend(("reply." if arg.is_array else "&reply.") + arg.name
+                for arg in call.out_args)
+    if call.out_handles:
+        args.extend(("XRT_MAX_IPC_HANDLES",
+                     call.out_handles.arg_name,
+                     "&" + call.out_handles.count_arg_name))
+
+    if call.in_handles:
+        args.extend(("&in_%s[0]" % call.in_handles.arg_name,
+                     "msg->"+call.in_handles.count_arg_name))
+    f.write("\n")
+    if instrument:
+        write_stats_timestamp(f, "_t_handler", indent)
+    write_count_start(f, instrument, indent)
+    write_invocation(f, 'reply.result', 'ipc_handle_' +
+                     call.name, args, indent=indent)
+    f.write(";\n")
+    write_count_end(f, call, "reply.result", indent)
+    write_budget_check(f, call, budgets, "ipc_command", "size", indent)
+    if instrument:
+        write_stats_timestamp(f, "_t_handled", indent)
+
+    reply_size = "sizeof(reply)"
+    array = call.out_array
+    if array:
+        # Only send the used elements, the client checks the count again.
+        f.write("\n" + indent + "if (reply.%s > %s) {\n" % (
+            array.count, array.max))
+        f.write(indent + "\treply.result = XRT_ERROR_IPC_FAILURE;\n")
+        f.write(indent + "\treply.%s = 0;\n" % array.count)
+        f.write(indent + "}\n")
+        f.write(indent + "size_t reply_size = %s;\n" % array_size(
+            reply_struct(call), array, "reply." + array.count))
+        reply_size = "reply_size"
+
+    if capture:
+        reply = ("&reply", reply_size) if call.reply else ("NULL", "0")
+        f.write("%sipc_capture_record(ics->server_thread_index, _t_capture, ipc_command, size, %s, %s);\n" % (
+            indent, reply[0], reply[1]))
+
+    # TODO do we check reply.result and
+    # error out before replying if it's not success?
+
+    func = 'ipc_send'
+    args = ["imc",
+            "&reply",
+            reply_size]
+    if call.out_handles:
+        func += '_handles_' + call.out_handles.stem
+        args.extend(call.out_handles.arg_names)
+    if not call.reply:
+        f.write("\n" + indent + "// No reply, keep the first error for the client to pick up later.\n")
+        f.write(indent + "if (reply.result != XRT_SUCCESS) {\n")
+        f.write(indent + "\txrt_atomic_s32_t *deferred = "
+                "&ics->server->ism->deferred_results[ics->server_thread_index];\n")
+        f.write(indent + "\txrt_atomic_s32_cmpxchg(deferred, XRT_SUCCESS, reply.result);\n")
+        f.write(indent + "}\n")
+        if instrument:
+            f.write("\n")
+            write_stats_record(f, call, "SERVER_DISPATCH", "_t_dispatch", "_t_handler", indent)
+            write_stats_record(f, call, "SERVER_HANDLER", "_t_handler", "_t_handled", indent)
+        f.write("\n" + indent + "return XRT_SUCCESS;\n")
+        return
+    write_invocation(f, 'xrt_result_t ret', func, args, indent=indent)
+    f.write(";")
+    if instrument:
+        f.write("\n")
+        write_stats_timestamp(f, "_t_replied", indent)
+        f.write("\n")
+        write_stats_record(f, call, "SERVER_DISPATCH", "_t_dispatch", "_t_handler", indent)
+        write_stats_record(f, call, "SERVER_HANDLER", "_t_handler", "_t_handled", indent)
+        write_stats_record(f, call, "SERVER_REPLY", "_t_handled", "_t_replied", indent)
+    f.write("\n" + indent + "return ret;\n")
 
+
+def generate_server_dispatch_switch(f, p, instrument, capture, budgets):
+    """Write ipc_dispatch as one switch over all calls."""
     f.write('''
 xrt_result_t
-ipc_dispatch(volatile struct ipc_client_state *ics, ipc_command_t *ipc_command)
+ipc_dispatch(volatile struct ipc_client_state *ics,
+             struct ipc_message_channel *imc,
+             ipc_command_t *ipc_command,
+             size_t size,
+             int *fds,
+             uint32_t fd_count)
 {
 \tswitch (*ipc_command) {
 ''')
 
     for call in p.calls:
         f.write("\tcase " + call.id + ": {\n")
+        write_dispatch_call(f, call, instrument, capture, budgets, "\t\t",
+                            check_size=True)
+        f.write("\t}\n")
+
+    f.write('''\tdefault:
+\t\tU_LOG_E("UNHANDLED IPC MESSAGE! %d", *ipc_command);
+\t\treturn XRT_ERROR_IPC_FAILURE;
+\t}
+}
+''')
+
+
+def generate_server_dispatch_table(f, p, instrument, capture, budgets):
+    """Write ipc_dispatch as a table of small functions, one per call."""
+    for call in p.calls:
+        f.write('''
+static xrt_result_t
+dispatch_%s(volatile struct ipc_client_state *ics,
+           struct ipc_message_channel *imc,
+           ipc_command_t *ipc_command,
+           size_t size,
+           int *fds,
+           uint32_t fd_count)
+{
+''' % call.name)
+        write_dispatch_call(f, call, instrument, capture, budgets, "\t",
+                            check_size=False)
+        f.write("}\n")
+
+    f.write('''
+typedef xrt_result_t (*dispatch_func_t)(volatile struct ipc_client_state *ics,
+                                        struct ipc_message_channel *imc,
+                                        ipc_command_t *ipc_command,
+                                        size_t size,
+                                        int *fds,
+                                        uint32_t fd_count);
+
+/*!
+ * Indexed by the command, the size is checked before the function is called.
+ * Calls with an array check the exact size against the count themselves.
+ */
+static const struct
+{
+\tdispatch_func_t func;
+\tuint32_t min_size;
+\tuint32_t max_size;
+} dispatch_table[IPC_COMMAND_COUNT] = {''')
+    for call in p.calls:
+        array = call.in_array
+        min_size = "sizeof(%s)" % msg_struct(call)
+        if array:
+            min_size = "offsetof(%s, %s)" % (msg_struct(call), array.name)
+        f.write("\n\t[%s] = {dispatch_%s, %s, sizeof(%s)}," % (
+            call.id, call.name, min_size, msg_struct(call)))
+    f.write('''
+};
+
+xrt_result_t
+ipc_dispatch(volatile struct ipc_client_state *ics,
+             struct ipc_message_channel *imc,
+             ipc_command_t *ipc_command,
+             size_t size,
+             int *fds,
+             uint32_t fd_count)
+{
+\tuint32_t cmd = (uint32_t)*ipc_command;
+
+\tif (cmd >= IPC_COMMAND_COUNT || dispatch_table[cmd].func == NULL) {
+\t\tU_LOG_E("UNHANDLED IPC MESSAGE! %u", cmd);
+\t\treturn XRT_ERROR_IPC_FAILURE;
+\t}
+
+\tif (size < dispatch_table[cmd].min_size || size > dispatch_table[cmd].max_size) {
+\t\tU_LOG_E("IPC message %u has size %u, expected %u to %u", cmd, (uint32_t)size, dispatch_table[cmd].min_size,
+\t\t        dispatch_table[cmd].max_size);
+\t\treturn XRT_ERROR_IPC_FAILURE;
+\t}
+
+\treturn dispatch_table[cmd].func(ics, imc, ipc_command, size, fds, fd_count);
+}
+''')
+
+
+def generate_server_batch_dispatch(f, p, capture, budgets):
+    """Write ipc_dispatch_batch, runs the calls in a struct ipc_batch."""
+    f.write('''
+xrt_result_t
+ipc_dispatch_batch(volatile struct ipc_client_state *ics,
+                   const struct ipc_batch *batch,
+                   struct ipc_batch_results *out_results)
+{
+\tuint32_t offset = 0;
+
+\tout_results->call_count = 0;
+
+\tif (batch->call_count > IPC_BATCH_MAX_CALLS || batch->size > IPC_BATCH_DATA_SIZE) {
+\t\treturn XRT_ERROR_IPC_FAILURE;
+\t}
+
+\tfor (uint32_t i = 0; i < batch->call_count; i++) {
+\t\tipc_command_t cmd;
+\t\tif (batch->size - offset < sizeof(cmd)) {
+\t\t\treturn XRT_ERROR_IPC_FAILURE;
+\t\t}
+\t\tmemcpy(&cmd, &batch->data[offset], sizeof(cmd));
+
+\t\txrt_result_t xret;
+\t\tswitch (cmd) {
+''')
+
+    for call in p.calls:
+        if not call.batchable:
+            continue
+
+        f.write("\t\tcase " + call.id + ": {\n")
+        f.write("\t\t\tIPC_TRACE(ics->server, \"Dispatching " + call.name +
+                " from batch\");\n\n")
+        if call.needs_msg_struct:
+            f.write("\t\t\tstruct ipc_%s_msg msg;\n" % call.name)
+        else:
+            f.write("\t\t\tstruct ipc_command_msg msg;\n")
+        if capture:
+            write_stats_timestamp(f, "_t_capture", "\t\t\t")
+        f.write('''\t\t\tif (batch->size - offset < sizeof(msg)) {
+\t\t\t\treturn XRT_ERROR_IPC_FAILURE;
+\t\t\t}
+\t\t\tmemcpy(&msg, &batch->data[offset], sizeof(msg));
+\t\t\toffset += sizeof(msg);
+''')
+
+        args = ["ics"]
+        for arg in call.in_args:
+            args.append(("&msg." + arg.name)
+                        if arg.is_aggregate
+                        else ("msg." + arg.name))
+        f.write("\n")
+        write_count_start(f, False, "\t\t\t")
+        write_invocation(f, 'xret', 'ipc_handle_' + call.name, args,
+                         indent="\t\t\t")
+        f.write(";\n")
+        write_count_end(f, call, "xret", "\t\t\t")
+        write_budget_check(f, call, budgets, "&msg", "sizeof(msg)",
+                           "\t\t\t")
+        if capture:
+            # Recorded like the call would have been on its own.
+            if call.reply:
+                f.write("\t\t\tstruct ipc_result_reply reply = {xret};\n")
+                reply = ("&reply", "sizeof(reply)")
+            else:
+                reply = ("NULL", "0")
+            f.write("\t\t\tipc_capture_record(ics->server_thread_index, _t_capture, &msg, sizeof(msg), %s, %s);\n" % reply)
+        f.write("\t\t\tbreak;\n")
+        f.write("\t\t}\n")
+
+    f.write('''\t\tdefault:
+\t\t\tU_LOG_E("IPC message %d can not be batched!", cmd);
+\t\t\treturn XRT_ERROR_IPC_FAILURE;
+\t\t}
+
+\t\tout_results->results[i] = xret;
+\t\tout_results->call_count = i + 1;
+
+\t\t// Later calls usually depend on earlier ones succeeding.
+\t\tif (xret != XRT_SUCCESS) {
+\t\t\treturn xret;
+\t\t}
+\t}
+
+\treturn XRT_SUCCESS;
+}
+''')
+
+
+def generate_server_ring_dispatch(f, p, instrument, capture, budgets):
+    """Write ipc_dispatch_ring, it only handles calls using the ring."""
+    f.write('''
+xrt_result_t
+ipc_dispatch_ring(volatile struct ipc_client_state *ics, ipc_command_t *ipc_command, size_t size)
+{
+\tswitch (*ipc_command) {
+''')
 
+    for call in p.calls:
+        if not call.uses_ring:
+            continue
+
+        f.write("\tcase " + call.id + ": {\n")
         f.write("\t\tIPC_TRACE(ics->server, \"Dispatching " + call.name +
-                "\");\n\n")
+                " from ring\");\n\n")
+        if instrument:
+            write_stats_timestamp(f, "_t_dispatch", "\t\t")
+        if capture:
+            write_stats_timestamp(f, "_t_capture", "\t\t")
 
         if call.needs_msg_struct:
             f.write(
                 "\t\tstruct ipc_{}_msg *msg = ".format(call.name))
             f.write("(struct ipc_{}_msg *)ipc_command;\n".format(call.name))
+            msg_size = "sizeof(struct ipc_%s_msg)" % call.name
+        else:
+            msg_size = "sizeof(struct ipc_command_msg)"
         if call.out_args:
             f.write("\t\tstruct ipc_%s_reply reply = {0};\n" % call.name)
         else:
             f.write("\t\tstruct ipc_result_reply reply = {0};\n")
-        if call.in_handles:
-            # We need to fetch these handles separately
-            f.write("\t\tstruct ipc_result_reply _sync = {XRT_SUCCESS};\n")
-            f.write("\t\t%s in_%s[XRT_MAX_IPC_HANDLES] = {0};\n" % (
-                call.in_handles.typename, call.in_handles.arg_name))
-            f.write("\t\tstruct ipc_command_msg _handle_msg = {0};\n")
-        if call.out_handles:
-            f.write("\t\t%s %s[XRT_MAX_IPC_HANDLES] = {0};\n" % (
-                call.out_handles.typename, call.out_handles.arg_name))
-            f.write("\t\t%s %s = {0};\n" % (
-                call.out_handles.count_arg_type,
-                call.out_handles.count_arg_name))
         f.write("\n")
 
-        if call.in_handles:
-            # Validate the number of handles.
-            f.write("\t\tif (msg->%s > XRT_MAX_IPC_HANDLES) {\n" % (call.in_handles.count_arg_name))
-            f.write("\t\t\treturn XRT_ERROR_IPC_FAILURE;\n")
-            f.write("\t\t}\n")
-
-            # Let the client know we are ready to receive the handles.
-            write_invocation(
-                f,
-                'xrt_result_t sync_result',
-                'ipc_send',
-                (
-                    "(struct ipc_message_channel *)&ics->imc",
-                    "&_sync",
-                    "sizeof(_sync)"
-                ),
-                indent="\t\t"
-            )
-            f.write(";")
-            write_result_handler(f, "sync_result",
-                                 indent="\t\t")
-            write_invocation(
-                f,
-                'xrt_result_t receive_handle_result',
-                'ipc_receive_handles_' + call.in_handles.stem,
-                (
-                    "(struct ipc_message_channel *)&ics->imc",
-                    "&_handle_msg",
-                    "sizeof(_handle_msg)",
-                    "in_" + call.in_handles.arg_name,
-                    "msg->"+call.in_handles.count_arg_name
-                ),
-                indent="\t\t"
-            )
-            f.write(";")
-            write_result_handler(f, "receive_handle_result",
-                                 indent="\t\t")
-            f.write("\t\tif (_handle_msg.cmd != %s) {\n" % str(call.id))
-            f.write("\t\t\treturn XRT_ERROR_IPC_FAILURE;\n")
-            f.write("\t\t}\n")
+        # The ring is in shared memory, so check the size of the message.
+        f.write("\t\tif (size != %s) {\n" % msg_size)
+        f.write("\t\t\treturn XRT_ERROR_IPC_FAILURE;\n")
+        f.write("\t\t}\n")
 
         # Write call to ipc_handle_CALLNAME
         args = ["ics"]
@@ -334,40 +1271,42 @@ ipc_dispatch(volatile struct ipc_client_state *ics, ipc_command_t *ipc_command)
                         if arg.is_aggregate
                         else ("msg->" + arg.name))
         args.extend("&reply." + arg.name for arg in call.out_args)
-        if call.out_handles:
-            args.extend(("XRT_MAX_IPC_HANDLES",
-                         call.out_handles.arg_name,
-                         "&" + call.out_handles.count_arg_name))
-
-        if call.in_handles:
-            args.extend(("&in_%s[0]" % call.in_handles.arg_name,
-                         "msg->"+call.in_handles.count_arg_name))
+        f.write("\n")
+        if instrument:
+            write_stats_timestamp(f, "_t_handler", "\t\t")
+        write_count_start(f, instrument, "\t\t")
         write_invocation(f, 'reply.result', 'ipc_handle_' +
                          call.name, args, indent="\t\t")
         f.write(";\n")
-
-        # TODO do we check reply.result and
-        # error out before replying if it's not success?
-
-        func = 'ipc_send'
-        args = ["(struct ipc_message_channel *)&ics->imc",
-                "&reply",
-                "sizeof(reply)"]
-        if call.out_handles:
-            func += '_handles_' + call.out_handles.stem
-            args.extend(call.out_handles.arg_names)
-        write_invocation(f, 'xrt_result_t ret', func, args, indent="\t\t")
+        write_count_end(f, call, "reply.result", "\t\t")
+        write_budget_check(f, call, budgets, "ipc_command", "size", "\t\t")
+        if instrument:
+            write_stats_timestamp(f, "_t_handled", "\t\t")
+        if capture:
+            f.write("\t\tipc_capture_record(ics->server_thread_index, _t_capture, ipc_command, size, &reply, "
+                    "sizeof(reply));\n")
+
+        write_invocation(f, 'xrt_result_t ret', 'ipc_ring_server_send',
+                         ["ics->ring", "&reply", "sizeof(reply)"],
+                         indent="\t\t")
         f.write(";")
+        if instrument:
+            f.write("\n")
+            write_stats_timestamp(f, "_t_replied", "\t\t")
+            f.write("\n")
+            write_stats_record(f, call, "SERVER_DISPATCH", "_t_dispatch", "_t_handler", "\t\t")
+            write_stats_record(f, call, "SERVER_HANDLER", "_t_handler", "_t_handled", "\t\t")
+            write_stats_record(f, call, "SERVER_REPLY", "_t_handled", "_t_replied", "\t\t")
         f.write("\n\t\treturn ret;\n")
         f.write("\t}\n")
+
     f.write('''\tdefault:
-\t\tU_LOG_E("UNHANDLED IPC MESSAGE! %d", *ipc_command);
+\t\tU_LOG_E("IPC message %d can not be sent over the ring!", *ipc_command);
 \t\treturn XRT_ERROR_IPC_FAILURE;
 \t}
 }
 
 ''')
-    f.close()
 
 
 def generate_server_header(file, p):
@@ -376,7 +1315,7 @@ def generate_server_header(file, p):
     Declares handler prototypes to implement,
     as well as the prototype for the generated dispatch function.
     """
-    f = open(file, "w")
+    f = GeneratedFile(file)
     f.write(header.format(brief='Generated IPC server code', suffix='_server'))
     f.write('''
 #pragma once
@@ -399,7 +1338,37 @@ def generate_server_header(file, p):
         "ipc_dispatch",
         [
             "volatile struct ipc_client_state *ics",
-            "ipc_command_t *ipc_command"
+            "struct ipc_message_channel *imc",
+            "ipc_command_t *ipc_command",
+            "size_t size",
+            "int *fds",
+            "uint32_t fd_count"
+        ]
+    )
+    f.write(";\n")
+
+    # Runs the calls in a batch, used by ipc_handle_batch.
+    write_decl(
+        f,
+        "xrt_result_t",
+        "ipc_dispatch_batch",
+        [
+            "volatile struct ipc_client_state *ics",
+            "const struct ipc_batch *batch",
+            "struct ipc_batch_results *out_results"
+        ]
+    )
+    f.write(";\n")
+
+    # Only handles the calls using the ring, size is that of the message.
+    write_decl(
+        f,
+        "xrt_result_t",
+        "ipc_dispatch_ring",
+        [
+            "volatile struct ipc_client_state *ics",
+            "ipc_command_t *ipc_command",
+            "size_t size"
         ]
     )
     f.write(";\n")
@@ -420,19 +1389,40 @@ def main():
     parser.add_argument(
         'output', type=str, nargs='+',
         help='Output file, uses the name to choose output type')
+    parser.add_argument(
+        '--instrument', action='store_true',
+        help='Record per call latency histograms, see ipc_stats.h')
+    parser.add_argument(
+        '--channels', action='store_true',
+        help='Give calls on other channels than main their own socket')
+    parser.add_argument(
+        '--dispatch-table', action='store_true',
+        help='Dispatch through a table of functions instead of a switch')
+    parser.add_argument(
+        '--capture', action='store_true',
+        help='Let the server capture all calls, see ipc_capture.h')
+    parser.add_argument(
+        '--budgets', action='store_true',
+        help='Let the server record calls going over their budget_us')
     args = parser.parse_args()
 
     p = Proto.load_and_parse(args.proto)
+    if not args.channels:
+        p.single_channel()
+    here = os.path.dirname(os.path.abspath(__file__))
+    headers = Headers(os.path.join(here, name) for name in SHARED_HEADERS)
 
     for output in args.output:
         if output.endswith("ipc_protocol_generated.h"):
-            generate_h(output, p)
+            generate_h(output, p, headers)
         if output.endswith("ipc_client_generated.c"):
-            generate_client_c(output, p)
+            generate_client_c(output, p, args.instrument)
         if output.endswith("ipc_client_generated.h"):
             generate_client_h(output, p)
         if output.endswith("ipc_server_generated.c"):
-            generate_server_c(output, p)
+            generate_server_c(output, p, args.instrument,
+                              args.dispatch_table, args.capture,
+                              args.budgets)
         if output.endswith("ipc_server_generated.h"):
             generate_server_header(output, p)
 
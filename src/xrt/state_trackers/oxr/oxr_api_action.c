@@ -25,9 +25,6 @@
 #include "bindings/b_generated_bindings.h"
 
 
-typedef bool (*path_verify_fn_t)(const char *, size_t);
-
-
 /*
  *
  * Dpad functions.
@@ -40,7 +37,7 @@ process_dpad(struct oxr_logger *log,
              struct oxr_instance *inst,
              struct oxr_dpad_state *state,
              const XrInteractionProfileDpadBindingEXT *dpad,
-             path_verify_fn_t dpad_emulator_fn,
+             uint64_t profile_bit,
              const char *prefix,
              const char *ip_str)
 {
@@ -54,7 +51,7 @@ process_dpad(struct oxr_logger *log,
 		                 dpad->binding);
 	}
 
-	if (!dpad_emulator_fn(str, length)) {
+	if ((oxr_verify_path_profiles(str, length).dpad_emulator & profile_bit) == 0) {
 		return oxr_error(log, XR_ERROR_PATH_UNSUPPORTED,
 		                 "(%s->binding == \"%s\") is not a valid dpad binding path for profile \"%s\"", prefix,
 		                 str, ip_str);
@@ -210,47 +207,27 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 	}
 
 	// Used in the loop that verifies the suggested bindings paths.
-	path_verify_fn_t subpath_fn = NULL;
-	path_verify_fn_t dpad_path_fn = NULL;
-	path_verify_fn_t dpad_emulator_fn = NULL;
+	uint64_t profile_bit = 0;
 	bool has_dpad = inst->extensions.EXT_dpad_binding;
 
 	if (ip == inst->path_cache.khr_simple_controller) {
-		subpath_fn = oxr_verify_khr_simple_controller_subpath;
-		dpad_path_fn = oxr_verify_khr_simple_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_khr_simple_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_KHR_SIMPLE_CONTROLLER);
 	} else if (ip == inst->path_cache.google_daydream_controller) {
-		subpath_fn = oxr_verify_google_daydream_controller_subpath;
-		dpad_path_fn = oxr_verify_google_daydream_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_google_daydream_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_GOOGLE_DAYDREAM_CONTROLLER);
 	} else if (ip == inst->path_cache.htc_vive_controller) {
-		subpath_fn = oxr_verify_htc_vive_controller_subpath;
-		dpad_path_fn = oxr_verify_htc_vive_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_htc_vive_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_HTC_VIVE_CONTROLLER);
 	} else if (ip == inst->path_cache.htc_vive_pro) {
-		subpath_fn = oxr_verify_htc_vive_pro_subpath;
-		dpad_path_fn = oxr_verify_htc_vive_pro_dpad_path;
-		dpad_emulator_fn = oxr_verify_htc_vive_pro_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_HTC_VIVE_PRO);
 	} else if (ip == inst->path_cache.microsoft_motion_controller) {
-		subpath_fn = oxr_verify_microsoft_motion_controller_subpath;
-		dpad_path_fn = oxr_verify_microsoft_motion_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_microsoft_motion_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_MICROSOFT_MOTION_CONTROLLER);
 	} else if (ip == inst->path_cache.microsoft_xbox_controller) {
-		subpath_fn = oxr_verify_microsoft_xbox_controller_subpath;
-		dpad_path_fn = oxr_verify_microsoft_xbox_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_microsoft_xbox_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_MICROSOFT_XBOX_CONTROLLER);
 	} else if (ip == inst->path_cache.oculus_go_controller) {
-		subpath_fn = oxr_verify_oculus_go_controller_subpath;
-		dpad_path_fn = oxr_verify_oculus_go_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_oculus_go_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_OCULUS_GO_CONTROLLER);
 	} else if (ip == inst->path_cache.oculus_touch_controller) {
-		subpath_fn = oxr_verify_oculus_touch_controller_subpath;
-		dpad_path_fn = oxr_verify_oculus_touch_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_oculus_touch_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_OCULUS_TOUCH_CONTROLLER);
 	} else if (ip == inst->path_cache.valve_index_controller) {
-		subpath_fn = oxr_verify_valve_index_controller_subpath;
-		dpad_path_fn = oxr_verify_valve_index_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_valve_index_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_VALVE_INDEX_CONTROLLER);
 	} else if (ip == inst->path_cache.hp_mixed_reality_controller) {
 		if (!inst->extensions.EXT_hp_mixed_reality_controller) {
 			return oxr_error(&log, XR_ERROR_PATH_UNSUPPORTED,
@@ -259,9 +236,7 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 			                 ip_str);
 		}
 
-		subpath_fn = oxr_verify_hp_mixed_reality_controller_subpath;
-		dpad_path_fn = oxr_verify_hp_mixed_reality_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_hp_mixed_reality_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_HP_MIXED_REALITY_CONTROLLER);
 	} else if (ip == inst->path_cache.samsung_odyssey_controller) {
 		if (!inst->extensions.EXT_samsung_odyssey_controller) {
 			return oxr_error(&log, XR_ERROR_PATH_UNSUPPORTED,
@@ -270,9 +245,7 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 			                 ip_str);
 		}
 
-		subpath_fn = oxr_verify_samsung_odyssey_controller_subpath;
-		dpad_path_fn = oxr_verify_samsung_odyssey_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_samsung_odyssey_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_SAMSUNG_ODYSSEY_CONTROLLER);
 	} else if (ip == inst->path_cache.ml_ml2_controller) {
 		if (!inst->extensions.ML_ml2_controller_interaction) {
 			return oxr_error(&log, XR_ERROR_PATH_UNSUPPORTED,
@@ -281,17 +254,11 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 			                 ip_str);
 		}
 
-		subpath_fn = oxr_verify_ml_ml2_controller_subpath;
-		dpad_path_fn = oxr_verify_ml_ml2_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_ml_ml2_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_ML_ML2_CONTROLLER);
 	} else if (ip == inst->path_cache.mndx_ball_on_a_stick_controller) {
-		subpath_fn = oxr_verify_mndx_ball_on_a_stick_controller_subpath;
-		dpad_path_fn = oxr_verify_mndx_ball_on_a_stick_controller_dpad_path;
-		dpad_emulator_fn = oxr_verify_mndx_ball_on_a_stick_controller_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_MNDX_BALL_ON_A_STICK_CONTROLLER);
 	} else if (ip == inst->path_cache.msft_hand_interaction) {
-		subpath_fn = oxr_verify_microsoft_hand_interaction_subpath;
-		dpad_path_fn = oxr_verify_microsoft_hand_interaction_dpad_path;
-		dpad_emulator_fn = oxr_verify_microsoft_hand_interaction_dpad_emulator;
+		profile_bit = PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_MICROSOFT_HAND_INTERACTION);
 	} else {
 		return oxr_error(&log, XR_ERROR_PATH_UNSUPPORTED,
 		                 "(suggestedBindings->interactionProfile == \"%s\") is not "
@@ -324,12 +291,15 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 			                 i, s->binding);
 		}
 
-		if (subpath_fn(str, length)) {
+		// One walk of the path answers for every profile.
+		struct path_profile_masks masks = oxr_verify_path_profiles(str, length);
+
+		if ((masks.subpath & profile_bit) != 0) {
 			continue;
 		}
 
 #ifdef XR_EXT_dpad_binding
-		if (dpad_path_fn(str, length)) {
+		if ((masks.dpad_path & profile_bit) != 0) {
 			if (!has_dpad) {
 				return oxr_error(
 				    &log, XR_ERROR_PATH_UNSUPPORTED,
@@ -376,7 +346,7 @@ oxr_xrSuggestInteractionProfileBindings(XrInstance instance,
 			         "XrInteractionProfileDpadBindingEXT>",
 			         i);
 
-			ret = process_dpad(&log, inst, &dpad_state, dpad, dpad_emulator_fn, temp, ip_str);
+			ret = process_dpad(&log, inst, &dpad_state, dpad, profile_bit, temp, ip_str);
 			if (ret != XR_SUCCESS) {
 				// Teardown the state.
 				oxr_dpad_state_deinit(&dpad_state);
@@ -20,29 +20,6 @@
 #include <stdio.h>
 
 
-static void
-setup_paths(struct oxr_logger *log,
-            struct oxr_instance *inst,
-            const char **src_paths,
-            XrPath **dest_paths,
-            uint32_t *dest_path_count)
-{
-	uint32_t count = 0;
-	while (src_paths[count] != NULL) {
-		assert(count != UINT32_MAX);
-		count++;
-	}
-
-	*dest_path_count = count;
-	*dest_paths = U_TYPED_ARRAY_CALLOC(XrPath, count);
-
-	for (size_t x = 0; x < *dest_path_count; x++) {
-		const char *str = src_paths[x];
-		size_t len = strlen(str);
-		oxr_path_get_or_create(log, inst, str, len, &(*dest_paths)[x]);
-	}
-}
-
 static bool
 interaction_profile_find(struct oxr_logger *log,
                          struct oxr_instance *inst,
@@ -79,16 +56,13 @@ interaction_profile_find_or_create(struct oxr_logger *log,
 	}
 
 	struct profile_template *templ = NULL;
+	const char *str = NULL;
+	size_t length = 0;
 
-	for (size_t x = 0; x < NUM_PROFILE_TEMPLATES; x++) {
-		XrPath t_path = XR_NULL_PATH;
-
-		oxr_path_get_or_create(log, inst, profile_templates[x].path, strlen(profile_templates[x].path),
-		                       &t_path);
-		if (t_path == path) {
-			templ = &profile_templates[x];
-			break;
-		}
+	// Hashed lookup on the string, no need to create paths for every template.
+	XrResult ret = oxr_path_get_string(log, inst, path, &str, &length);
+	if (ret == XR_SUCCESS) {
+		templ = profile_template_find_by_path(str, length);
 	}
 
 	if (templ == NULL) {
@@ -110,19 +84,17 @@ interaction_profile_find_or_create(struct oxr_logger *log,
 		struct binding_template *t = &templ->bindings[x];
 		struct oxr_binding *b = &p->bindings[x];
 
-		XrPath subaction_path;
-		XrResult r =
-		    oxr_path_get_or_create(log, inst, t->subaction_path, strlen(t->subaction_path), &subaction_path);
-		if (r != XR_SUCCESS) {
-			oxr_log(log, "Couldn't get subaction path %s\n", t->subaction_path);
-		}
-
+		XrPath subaction_path = inst->binding_template_paths[binding_template_subaction_path_index(t)];
 		if (!get_subaction_path_from_path(log, inst, subaction_path, &b->subaction_path)) {
-			oxr_log(log, "Invalid subaction path %s\n", t->subaction_path);
+			oxr_log(log, "Invalid subaction path %s\n", binding_template_subaction_path(t));
 		}
 
-		b->localized_name = t->localized_name;
-		setup_paths(log, inst, t->paths, &b->paths, &b->path_count);
+		b->localized_name = binding_template_localized_name(t);
+		b->path_count = (uint32_t)binding_template_path_count(t);
+		b->paths = U_TYPED_ARRAY_CALLOC(XrPath, b->path_count);
+		for (uint32_t y = 0; y < b->path_count; y++) {
+			b->paths[y] = inst->binding_template_paths[binding_template_path_index(t, y)];
+		}
 		b->input = t->input;
 		b->dpad_activate = t->dpad_activate;
 		b->output = t->output;
@@ -132,18 +104,16 @@ interaction_profile_find_or_create(struct oxr_logger *log,
 		struct dpad_emulation *t = &templ->dpads[x];
 		struct oxr_dpad_emulation *d = &p->dpads[x];
 
-		XrPath subaction_path;
-		XrResult r =
-		    oxr_path_get_or_create(log, inst, t->subaction_path, strlen(t->subaction_path), &subaction_path);
-		if (r != XR_SUCCESS) {
-			oxr_log(log, "Couldn't get subaction path %s\n", t->subaction_path);
-		}
-
+		XrPath subaction_path = inst->binding_template_paths[dpad_emulation_subaction_path_index(t)];
 		if (!get_subaction_path_from_path(log, inst, subaction_path, &d->subaction_path)) {
-			oxr_log(log, "Invalid subaction path %s\n", t->subaction_path);
+			oxr_log(log, "Invalid subaction path %s\n", dpad_emulation_subaction_path(t));
 		}
 
-		setup_paths(log, inst, t->paths, &d->paths, &d->path_count);
+		d->path_count = (uint32_t)dpad_emulation_path_count(t);
+		d->paths = U_TYPED_ARRAY_CALLOC(XrPath, d->path_count);
+		for (uint32_t y = 0; y < d->path_count; y++) {
+			d->paths[y] = inst->binding_template_paths[dpad_emulation_path_index(t, y)];
+		}
 		d->position = t->position;
 		d->activate = t->activate;
 	}
@@ -415,6 +385,18 @@ oxr_binding_find_bindings_from_key(struct oxr_logger *log,
 	*binding_count = num;
 }
 
+XrResult
+oxr_binding_init(struct oxr_logger *log, struct oxr_instance *inst)
+{
+	inst->binding_template_paths = U_TYPED_ARRAY_CALLOC(XrPath, NUM_BINDING_TEMPLATE_PATHS);
+	if (inst->binding_template_paths == NULL) {
+		return oxr_error(log, XR_ERROR_RUNTIME_FAILURE, "Failed to allocate binding template paths");
+	}
+
+	return oxr_path_get_or_create_table(log, inst, binding_template_path_table, NUM_BINDING_TEMPLATE_PATHS,
+	                                    inst->binding_template_paths);
+}
+
 void
 oxr_binding_destroy_all(struct oxr_logger *log, struct oxr_instance *inst)
 {
@@ -444,6 +426,9 @@ oxr_binding_destroy_all(struct oxr_logger *log, struct oxr_instance *inst)
 	free(inst->profiles);
 	inst->profiles = NULL;
 	inst->profile_count = 0;
+
+	free(inst->binding_template_paths);
+	inst->binding_template_paths = NULL;
 }
 
 
@@ -238,6 +238,12 @@ oxr_instance_create(struct oxr_logger *log,
 
 	// clang-format on
 
+	ret = oxr_binding_init(log, inst);
+	if (ret != XR_SUCCESS) {
+		oxr_instance_destroy(log, &inst->handle);
+		return ret;
+	}
+
 	// fill in our application info - @todo - replicate all createInfo
 	// fields?
 
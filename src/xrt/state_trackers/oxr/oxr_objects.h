@@ -313,6 +313,16 @@ XrResult
 oxr_path_get_or_create(
     struct oxr_logger *log, struct oxr_instance *inst, const char *str, size_t length, XrPath *out_path);
 
+/*!
+ * Get or create the paths for a table of @p count strings, each string is
+ * prefixed by its length in one byte and is not null terminated.
+ *
+ * @public @memberof oxr_instance
+ */
+XrResult
+oxr_path_get_or_create_table(
+    struct oxr_logger *log, struct oxr_instance *inst, const char *table, size_t count, XrPath *out_paths);
+
 /*!
  * Only get the path for the given string if it exists.
  *
@@ -558,6 +568,16 @@ oxr_find_profile_for_device(struct oxr_logger *log,
                             struct xrt_device *xdev,
                             struct oxr_interaction_profile **out_p);
 
+/*!
+ * Create the paths of all of the generated binding templates up front, so
+ * that interaction profiles can be created from the templates without any
+ * path lookups.
+ *
+ * @public @memberof oxr_instance
+ */
+XrResult
+oxr_binding_init(struct oxr_logger *log, struct oxr_instance *inst);
+
 /*!
  * Free all memory allocated by the binding system.
  *
@@ -1330,6 +1350,8 @@ struct oxr_instance
 	size_t path_array_length;
 	//! Number of paths in the array (0 is always null).
 	size_t path_num;
+	//! Paths of the generated binding templates, by template path index.
+	XrPath *binding_template_paths;
 
 	// Event queue.
 	struct
@@ -86,6 +86,22 @@ oxr_ensure_array_length(struct oxr_logger *log, struct oxr_instance *inst, XrPat
 	return XR_SUCCESS;
 }
 
+static void
+oxr_reserve_array_length(struct oxr_instance *inst, size_t num)
+{
+	size_t new_size = inst->path_array_length;
+	while (new_size <= num) {
+		new_size += 64;
+	}
+
+	if (new_size == inst->path_array_length) {
+		return;
+	}
+
+	U_ARRAY_REALLOC_OR_FREE(inst->path_array, struct oxr_path *, new_size);
+	inst->path_array_length = new_size;
+}
+
 static XrResult
 oxr_allocate_path(
     struct oxr_logger *log, struct oxr_instance *inst, const char *str, size_t length, struct oxr_path **out_path)
@@ -195,6 +211,29 @@ oxr_path_get_or_create(
 	return XR_SUCCESS;
 }
 
+XrResult
+oxr_path_get_or_create_table(
+    struct oxr_logger *log, struct oxr_instance *inst, const char *table, size_t count, XrPath *out_paths)
+{
+	// Grow the array once for all of the paths instead of once per 64.
+	oxr_reserve_array_length(inst, inst->path_num + count);
+
+	const char *str = table;
+	for (size_t i = 0; i < count; i++) {
+		size_t length = (uint8_t)str[0];
+		str++;
+
+		XrResult ret = oxr_path_get_or_create(log, inst, str, length, &out_paths[i]);
+		if (ret != XR_SUCCESS) {
+			return ret;
+		}
+
+		str += length;
+	}
+
+	return XR_SUCCESS;
+}
+
 XrResult
 oxr_path_only_get(struct oxr_logger *log, struct oxr_instance *inst, const char *str, size_t length, XrPath *out_path)
 {
@@ -652,7 +652,7 @@ public:
 	AddMonadoInput(struct binding_template *b)
 	{
 		enum xrt_input_name monado_input_name = b->input;
-		const char *steamvr_path = b->steamvr_path;
+		const char *steamvr_path = binding_template_steamvr_path(b);
 
 		enum xrt_input_type monado_input_type = XRT_GET_INPUT_TYPE(monado_input_name);
 
@@ -694,7 +694,7 @@ public:
 				AddMonadoInput(b);
 			}
 			if (b->output != 0) {
-				AddOutputControl(b->output, b->steamvr_path);
+				AddOutputControl(b->output, binding_template_steamvr_path(b));
 			}
 		}
 	}
@@ -17,8 +17,13 @@
 #include <errno.h>
 #include <sys/mman.h>
 #include <limits.h>
+#include <inttypes.h>
+#include <stddef.h>
+
+#include "os/os_time.h"
 
 #include "util/u_file.h"
+#include "util/u_time.h"
 
 #define P(...) fprintf(stdout, __VA_ARGS__)
 #define PE(...) fprintf(stderr, __VA_ARGS__)
@@ -29,6 +34,9 @@ typedef enum op_mode
 	MODE_SET_PRIMARY,
 	MODE_SET_FOCUSED,
 	MODE_TOGGLE_IO,
+	MODE_WIRE_SIZES,
+	MODE_COUNTERS,
+	MODE_SLOW_CALLS,
 } op_mode_t;
 
 static int
@@ -38,26 +46,23 @@ do_connect(struct ipc_connection *ipc_c);
 int
 get_mode(struct ipc_connection *ipc_c)
 {
-	struct ipc_client_list clients;
+	int32_t ids[IPC_MAX_CLIENTS];
+	uint32_t id_count = 0;
 
 	xrt_result_t r;
 
-	r = ipc_call_system_get_clients(ipc_c, &clients);
+	r = ipc_call_system_get_clients(ipc_c, &id_count, ids);
 	if (r != XRT_SUCCESS) {
 		PE("Failed to get client list.\n");
 		exit(1);
 	}
 
 	P("Clients:\n");
-	for (uint32_t i = 0; i < IPC_MAX_CLIENTS; i++) {
-		if (clients.ids[i] < 0) {
-			continue;
-		}
-
+	for (uint32_t i = 0; i < id_count; i++) {
 		struct ipc_app_state cs;
-		r = ipc_call_system_get_client_info(ipc_c, i, &cs);
+		r = ipc_call_system_get_client_info(ipc_c, ids[i], &cs);
 		if (r != XRT_SUCCESS) {
-			PE("Failed to get client info for client %d.\n", i);
+			PE("Failed to get client info for client %d.\n", ids[i]);
 			return 1;
 		}
 
@@ -70,7 +75,7 @@ get_mode(struct ipc_connection *ipc_c)
 		  "\tz: %d"
 		  "\tpid: %d"
 		  "\t%s\n",
-		  clients.ids[i],     //
+		  ids[i],             //
 		  cs.session_active,  //
 		  cs.session_visible, //
 		  cs.session_focused, //
@@ -137,6 +142,128 @@ toggle_io(struct ipc_connection *ipc_c, int client_id)
 	return 0;
 }
 
+int
+print_counters(struct ipc_connection *ipc_c)
+{
+	int32_t ids[IPC_MAX_CLIENTS];
+	uint32_t id_count = 0;
+	static struct ipc_client_call_counters before[IPC_MAX_CLIENTS];
+
+	xrt_result_t r = ipc_call_system_get_clients(ipc_c, &id_count, ids);
+	if (r != XRT_SUCCESS) {
+		PE("Failed to get client list.\n");
+		return 1;
+	}
+
+	// The service keeps updating them, sample over a second to get rates.
+	uint64_t start_ns = os_monotonic_get_ns();
+	memcpy(before, ipc_c->ism->call_counters, sizeof(before));
+	os_nanosleep(U_TIME_1S_IN_NS);
+	uint64_t interval_ns = os_monotonic_get_ns() - start_ns;
+
+	for (uint32_t i = 0; i < id_count; i++) {
+		int32_t id = ids[i];
+
+		struct ipc_app_state cs;
+		r = ipc_call_system_get_client_info(ipc_c, id, &cs);
+		if (r != XRT_SUCCESS) {
+			PE("Failed to get client info for client %d.\n", id);
+			return 1;
+		}
+
+		P("Client %d, pid %d, %s:\n", id, cs.pid, cs.info.application_name);
+		ipc_call_counters_print(stdout, &ipc_c->ism->call_counters[id], &before[id], interval_ns);
+		P("\n");
+	}
+
+	return 0;
+}
+
+int
+print_slow_calls(struct ipc_connection *ipc_c)
+{
+	struct ipc_slow_call calls[IPC_MAX_SLOW_CALLS];
+	uint32_t call_count = 0;
+
+	xrt_result_t r = ipc_call_system_get_slow_calls(ipc_c, &call_count, calls);
+	if (r != XRT_SUCCESS) {
+		PE("Failed to get slow calls.\n");
+		return 1;
+	}
+
+	if (call_count == 0) {
+		P("No calls over budget, is the service built with XRT_FEATURE_IPC_BUDGETS?\n");
+		return 0;
+	}
+
+	uint64_t now_ns = os_monotonic_get_ns();
+	for (uint32_t i = 0; i < call_count; i++) {
+		const struct ipc_slow_call *sc = &calls[i];
+
+		P("%.3fs ago, client %u: %s took %" PRIu64 "us, budget %" PRIu64 "us\n",
+		  (double)(now_ns - sc->timestamp_ns) / U_TIME_1S_IN_NS, sc->client_id,
+		  ipc_cmd_to_str((ipc_command_t)sc->cmd), sc->handler_ns / 1000, sc->budget_ns / 1000);
+
+		// The arguments, after the command.
+		uint32_t size = sc->msg_size < sizeof(sc->msg) ? sc->msg_size : (uint32_t)sizeof(sc->msg);
+		P("\t");
+		for (uint32_t k = sizeof(uint32_t); k < size; k++) {
+			P("%02x", sc->msg[k]);
+		}
+		P("%s\n", sc->msg_size > size ? "..." : "");
+	}
+
+	return 0;
+}
+
+int
+print_wire_sizes(void)
+{
+	// JSON so it can be fed into other tools.
+	P("{\n");
+	P("\t\"buf_size\": %u,\n", (uint32_t)IPC_BUF_SIZE);
+	P("\t\"max_msg_size\": %u,\n", (uint32_t)IPC_MAX_MSG_SIZE);
+	P("\t\"max_reply_size\": %u,\n", (uint32_t)IPC_MAX_REPLY_SIZE);
+	P("\t\"socket\": \"%s\",\n", XRT_IPC_MSG_SOCK_FILENAME);
+	P("\t\"max_clients\": %u,\n", (uint32_t)IPC_MAX_CLIENTS);
+	P("\t\"max_handles\": %u,\n", (uint32_t)XRT_MAX_IPC_HANDLES);
+	P("\t\"fingerprint\": \"%016" PRIx64 "\",\n", ipc_protocol_fingerprint());
+
+	// Structs passed as arguments that tools need to fill in themselves.
+	P("\t\"structs\": {\n");
+	P("\t\t\"ipc_app_state\": {\"size\": %u, \"fields\": [\n", (uint32_t)sizeof(struct ipc_app_state));
+	P("\t\t\t{\"name\": \"pid\", \"offset\": %u, \"size\": %u},\n",
+	  (uint32_t)offsetof(struct ipc_app_state, pid), (uint32_t)sizeof(((struct ipc_app_state *)NULL)->pid));
+	P("\t\t\t{\"name\": \"info\", \"offset\": %u, \"size\": %u}\n",
+	  (uint32_t)offsetof(struct ipc_app_state, info), (uint32_t)sizeof(((struct ipc_app_state *)NULL)->info));
+	P("\t\t]}\n");
+	P("\t},\n");
+	P("\t\"calls\": [\n");
+	for (uint32_t i = 1; i < IPC_COMMAND_COUNT; i++) {
+		const struct ipc_wire_size *ws = &ipc_wire_sizes[i];
+		P("\t\t{\"name\": \"%s\", \"id\": %u, \"msg_size\": %u, \"reply_size\": %u, \"fields\": [", ws->name, i,
+		  ws->msg_size, ws->reply_size);
+
+		// The fields are grouped by call.
+		bool first = true;
+		for (uint32_t k = 0; k < ipc_wire_field_count; k++) {
+			const struct ipc_wire_field *wf = &ipc_wire_fields[k];
+			if (wf->cmd != (ipc_command_t)i) {
+				continue;
+			}
+			P("%s\n\t\t\t{\"name\": \"%s\", \"reply\": %s, \"offset\": %u, \"size\": %u, \"elem_size\": %u}",
+			  first ? "" : ",", wf->name, wf->reply ? "true" : "false", wf->offset, wf->size, wf->elem_size);
+			first = false;
+		}
+
+		P("\n\t\t]}%s\n", i + 1 < IPC_COMMAND_COUNT ? "," : "");
+	}
+	P("\t]\n");
+	P("}\n");
+
+	return 0;
+}
+
 int
 main(int argc, char *argv[])
 {
@@ -147,7 +274,7 @@ main(int argc, char *argv[])
 	int s_val = 0;
 
 	opterr = 0;
-	while ((c = getopt(argc, argv, "p:f:i:")) != -1) {
+	while ((c = getopt(argc, argv, "p:f:i:wcb")) != -1) {
 		switch (c) {
 		case 'p':
 			s_val = atoi(optarg);
@@ -167,6 +294,9 @@ main(int argc, char *argv[])
 				op_mode = MODE_TOGGLE_IO;
 			}
 			break;
+		case 'w': op_mode = MODE_WIRE_SIZES; break;
+		case 'c': op_mode = MODE_COUNTERS; break;
+		case 'b': op_mode = MODE_SLOW_CALLS; break;
 		case '?':
 			if (optopt == 's') {
 				PE("Option -s requires an id to set.\n");
@@ -175,6 +305,9 @@ main(int argc, char *argv[])
 				PE("    -f <id>: Set focused client\n");
 				PE("    -p <id>: Set primary client\n");
 				PE("    -i <id>: Toggle whether client receives input\n");
+				PE("    -w: Print the wire size and layout of all IPC calls as JSON\n");
+				PE("    -c: Print the calls per second of every client\n");
+				PE("    -b: Print the last calls that went over their time budget\n");
 			} else {
 				PE("Option `\\x%x' unknown.\n", optopt);
 			}
@@ -183,6 +316,11 @@ main(int argc, char *argv[])
 		}
 	}
 
+	// Doesn't need the service.
+	if (op_mode == MODE_WIRE_SIZES) {
+		exit(print_wire_sizes());
+	}
+
 	// Initializing the logging level also zeroes the rest of the struct.
 	struct ipc_connection ipc_c = {
 	    .log_level = U_LOGGING_INFO,
@@ -200,6 +338,8 @@ main(int argc, char *argv[])
 	case MODE_SET_PRIMARY: exit(set_primary(&ipc_c, s_val)); break;
 	case MODE_SET_FOCUSED: exit(set_focused(&ipc_c, s_val)); break;
 	case MODE_TOGGLE_IO: exit(toggle_io(&ipc_c, s_val)); break;
+	case MODE_COUNTERS: exit(print_counters(&ipc_c)); break;
+	case MODE_SLOW_CALLS: exit(print_slow_calls(&ipc_c)); break;
 	default: P("Unrecognised operation mode.\n"); exit(1);
 	}
 
@@ -216,7 +356,7 @@ do_connect(struct ipc_connection *ipc_c)
 	 * Connenct.
 	 */
 
-	ipc_c->imc.ipc_handle = socket(PF_UNIX, SOCK_STREAM, 0);
+	ipc_c->imc.ipc_handle = socket(PF_UNIX, SOCK_SEQPACKET, 0);
 	if (ipc_c->imc.ipc_handle < 0) {
 		ret = ipc_c->imc.ipc_handle;
 		PE("Socket create error '%i'!\n", ret);
@@ -264,12 +404,19 @@ do_connect(struct ipc_connection *ipc_c)
 	 */
 
 	// get our xdev shm from the server and mmap it
-	xret = ipc_call_instance_get_shm_fd(ipc_c, &ipc_c->ism_handle, 1);
+	uint64_t service_fingerprint = 0;
+	xret = ipc_call_instance_get_shm_fd(ipc_c, ipc_protocol_fingerprint(), &service_fingerprint, &ipc_c->ism_handle, 1);
 	if (xret != XRT_SUCCESS) {
 		PE("Failed to retrieve shm fd '%i'!\n", xret);
 		return -1;
 	}
 
+	if (service_fingerprint != ipc_protocol_fingerprint()) {
+		PE("Protocol %016" PRIx64 " does not match service protocol %016" PRIx64 "!\n", ipc_protocol_fingerprint(),
+		   service_fingerprint);
+		return -1;
+	}
+
 	const int flags = MAP_SHARED;
 	const int access = PROT_READ | PROT_WRITE;
 	const size_t size = sizeof(struct ipc_shared_memory);
@@ -0,0 +1,188 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief Generated bindings path verify function tests.
+ * @author agent <agent@local>
+ */
+
+extern "C" {
+#include "bindings/b_generated_bindings_checks.h"
+}
+
+#include <string.h>
+
+#include <string>
+
+#include "catch/catch.hpp"
+
+
+TEST_CASE("bindings_verify_paths")
+{
+	for (size_t i = 0; i < NUM_VERIFY_PATH_CHECKS; i++) {
+		const struct verify_path_check *check = &verify_path_checks[i];
+
+		CAPTURE(check->str);
+		CHECK(check->verify(check->str, strlen(check->str)) == check->accept);
+	}
+}
+
+TEST_CASE("bindings_path_trie")
+{
+	for (size_t i = 0; i < NUM_VERIFY_PATH_CHECKS; i++) {
+		const struct verify_path_check *check = &verify_path_checks[i];
+		struct path_profile_masks masks = oxr_verify_path_profiles(check->str, strlen(check->str));
+
+		uint64_t mask = 0;
+		switch (check->kind) {
+		case VERIFY_PATH_KIND_SUBPATH: mask = masks.subpath; break;
+		case VERIFY_PATH_KIND_DPAD_PATH: mask = masks.dpad_path; break;
+		case VERIFY_PATH_KIND_DPAD_EMULATOR: mask = masks.dpad_emulator; break;
+		}
+
+		CAPTURE(check->str);
+		CAPTURE(check->profile_index);
+		CHECK(((mask & PROFILE_TEMPLATE_BIT(check->profile_index)) != 0) == check->accept);
+	}
+}
+
+TEST_CASE("bindings_verify_paths_length")
+{
+	// The length is authoritative, not the nul terminator.
+	const char *str = "/user/hand/left/input/select/clickX";
+	size_t length = strlen(str) - 1;
+
+	CHECK(oxr_verify_khr_simple_controller_subpath(str, length));
+	CHECK_FALSE(oxr_verify_khr_simple_controller_subpath(str, length - 1));
+	CHECK_FALSE(oxr_verify_khr_simple_controller_subpath("", 0));
+
+	struct path_profile_masks masks = oxr_verify_path_profiles(str, length);
+	CHECK((masks.subpath & PROFILE_TEMPLATE_BIT(PROFILE_TEMPLATE_INDEX_KHR_SIMPLE_CONTROLLER)) != 0);
+	CHECK(oxr_verify_path_profiles(str, length - 1).subpath == 0);
+	CHECK(oxr_verify_path_profiles("", 0).subpath == 0);
+}
+
+TEST_CASE("bindings_profile_template_find")
+{
+	for (size_t i = 0; i < NUM_PROFILE_TEMPLATES; i++) {
+		struct profile_template *templ = &profile_templates[i];
+
+		CAPTURE(templ->path);
+		CHECK(templ->path_length == strlen(templ->path));
+		CHECK(profile_template_find_by_path(templ->path, templ->path_length) == templ);
+		CHECK(profile_template_find_by_path(templ->path, templ->path_length - 1) == NULL);
+	}
+
+	CHECK(profile_template_find_by_path("", 0) == NULL);
+	CHECK(profile_template_find_by_path("/interaction_profiles/khr/simple_controllers", 44) == NULL);
+}
+
+TEST_CASE("bindings_input_output_names")
+{
+	CHECK(xrt_input_name_enum("XRT_INPUT_INDEX_TRIGGER_VALUE") == XRT_INPUT_INDEX_TRIGGER_VALUE);
+	CHECK(xrt_input_name_enum("XRT_INPUT_GENERIC_HEAD_POSE") == XRT_INPUT_GENERIC_HEAD_POSE);
+	CHECK(xrt_input_name_enum("XRT_INPUT_NOT_A_NAME") == XRT_INPUT_GENERIC_TRACKER_POSE);
+	CHECK(strcmp(xrt_input_name_string(XRT_INPUT_INDEX_TRIGGER_VALUE), "XRT_INPUT_INDEX_TRIGGER_VALUE") == 0);
+	CHECK(strcmp(xrt_input_name_string((enum xrt_input_name)0xffffffff), "UNKNOWN") == 0);
+
+	CHECK(xrt_output_name_enum("XRT_OUTPUT_NAME_INDEX_HAPTIC") == XRT_OUTPUT_NAME_INDEX_HAPTIC);
+	CHECK(xrt_output_name_enum("XRT_OUTPUT_NAME_NOT_A_NAME") == XRT_OUTPUT_NAME_SIMPLE_VIBRATION);
+	CHECK(strcmp(xrt_output_name_string(XRT_OUTPUT_NAME_INDEX_HAPTIC), "XRT_OUTPUT_NAME_INDEX_HAPTIC") == 0);
+
+	// Same id as a known input but a different type.
+	enum xrt_input_name wrong_type = (enum xrt_input_name)(XRT_INPUT_INDEX_TRIGGER_VALUE ^ 1);
+	CHECK(strcmp(xrt_input_name_string(wrong_type), "UNKNOWN") == 0);
+}
+
+//! Unpack the length prefixed binding_template_path_table.
+static void
+unpack_path_table(std::string *paths)
+{
+	const char *str = binding_template_path_table;
+	for (size_t i = 0; i < NUM_BINDING_TEMPLATE_PATHS; i++) {
+		size_t length = (uint8_t)str[0];
+		paths[i] = std::string(str + 1, length);
+		str += length + 1;
+	}
+	CHECK(*str == '\0');
+}
+
+TEST_CASE("bindings_template_strings")
+{
+	static std::string paths[NUM_BINDING_TEMPLATE_PATHS];
+	unpack_path_table(paths);
+
+	for (size_t i = 0; i < NUM_PROFILE_TEMPLATES; i++) {
+		struct profile_template *templ = &profile_templates[i];
+
+		CAPTURE(templ->path);
+		for (size_t x = 0; x < templ->binding_count; x++) {
+			const struct binding_template *t = &templ->bindings[x];
+			const char *subaction_path = binding_template_subaction_path(t);
+
+			CAPTURE(subaction_path);
+			CHECK(binding_template_localized_name(t)[0] != '\0');
+			CHECK(binding_template_steamvr_path(t)[0] == '/');
+			CHECK(binding_template_path_count(t) > 0);
+			CHECK(binding_template_path_count(t) <= PATHS_PER_BINDING_TEMPLATE);
+
+			// Every path lives under the subaction path of the binding.
+			for (size_t y = 0; y < binding_template_path_count(t); y++) {
+				const std::string &path = paths[binding_template_path_index(t, y)];
+				CAPTURE(path);
+				CHECK(path.compare(0, strlen(subaction_path), subaction_path) == 0);
+				CHECK(oxr_verify_path_profiles(path.c_str(), path.size()).subpath != 0);
+			}
+		}
+
+		for (size_t x = 0; x < templ->dpad_count; x++) {
+			const struct dpad_emulation *t = &templ->dpads[x];
+			const char *subaction_path = dpad_emulation_subaction_path(t);
+
+			CAPTURE(subaction_path);
+			CHECK(dpad_emulation_path_count(t) > 0);
+			for (size_t y = 0; y < dpad_emulation_path_count(t); y++) {
+				const std::string &path = paths[dpad_emulation_path_index(t, y)];
+				CAPTURE(path);
+				CHECK(path.compare(0, strlen(subaction_path), subaction_path) == 0);
+			}
+		}
+	}
+}
+
+TEST_CASE("bindings_template_path_table")
+{
+	static std::string paths[NUM_BINDING_TEMPLATE_PATHS];
+	unpack_path_table(paths);
+
+	for (size_t i = 0; i < NUM_PROFILE_TEMPLATES; i++) {
+		struct profile_template *templ = &profile_templates[i];
+
+		for (size_t x = 0; x < templ->binding_count; x++) {
+			const struct binding_template *t = &templ->bindings[x];
+			const char *subaction_path = binding_template_subaction_path(t);
+			size_t index = binding_template_subaction_path_index(t);
+
+			REQUIRE(index < NUM_BINDING_TEMPLATE_PATHS);
+			CHECK(paths[index] == subaction_path);
+
+			for (size_t y = 0; y < binding_template_path_count(t); y++) {
+				index = binding_template_path_index(t, y);
+				REQUIRE(index < NUM_BINDING_TEMPLATE_PATHS);
+			}
+		}
+
+		for (size_t x = 0; x < templ->dpad_count; x++) {
+			const struct dpad_emulation *t = &templ->dpads[x];
+			size_t index = dpad_emulation_subaction_path_index(t);
+
+			REQUIRE(index < NUM_BINDING_TEMPLATE_PATHS);
+			CHECK(paths[index] == dpad_emulation_subaction_path(t));
+
+			for (size_t y = 0; y < dpad_emulation_path_count(t); y++) {
+				index = dpad_emulation_path_index(t, y);
+				REQUIRE(index < NUM_BINDING_TEMPLATE_PATHS);
+			}
+		}
+	}
+}
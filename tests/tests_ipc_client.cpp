@@ -0,0 +1,104 @@
+// Copyright 2026, agent.
+// SPDX-License-Identifier: BSL-1.0
+/*!
+ * @file
+ * @brief Generated IPC client stub tests, with the test acting as the service.
+ * @author agent <agent@local>
+ */
+
+extern "C" {
+#include "client/ipc_client.h"
+#include "ipc_client_generated.h"
+}
+
+#include <sys/socket.h>
+#include <string.h>
+#include <unistd.h>
+
+#include "catch/catch.hpp"
+
+
+namespace {
+
+struct fake_service
+{
+	int fds[2] = {-1, -1};
+	struct ipc_connection ipc_c = {};
+
+	fake_service()
+	{
+		REQUIRE(socketpair(AF_UNIX, SOCK_SEQPACKET, 0, fds) == 0);
+
+		// No channel is connected and there is no ring, like a failed open.
+		ipc_c.imc.ipc_handle = fds[0];
+		ipc_c.imc.log_level = U_LOGGING_WARN;
+		ipc_c.log_level = U_LOGGING_WARN;
+		os_mutex_init(&ipc_c.mutex);
+	}
+
+	~fake_service()
+	{
+		os_mutex_destroy(&ipc_c.mutex);
+		close(fds[0]);
+		close(fds[1]);
+	}
+
+	ipc_command_t
+	receive_cmd()
+	{
+		uint8_t buf[IPC_MAX_MSG_SIZE];
+		ssize_t len = recv(fds[1], buf, sizeof(buf), 0);
+		REQUIRE(len >= (ssize_t)sizeof(ipc_command_t));
+
+		ipc_command_t cmd;
+		memcpy(&cmd, buf, sizeof(cmd));
+		return cmd;
+	}
+
+	template <typename T>
+	void
+	reply(const T &reply)
+	{
+		REQUIRE(send(fds[1], &reply, sizeof(reply), 0) == (ssize_t)sizeof(reply));
+	}
+};
+
+} // namespace
+
+
+TEST_CASE("ipc_async_fallback_to_main")
+{
+	fake_service fs;
+
+	// The channel isn't connected, so this goes out on the main one.
+	struct ipc_compositor_predict_frame_token token = {};
+	REQUIRE(ipc_call_compositor_predict_frame_begin(&fs.ipc_c, &token) == XRT_SUCCESS);
+	CHECK(fs.receive_cmd() == IPC_COMPOSITOR_PREDICT_FRAME);
+
+	struct ipc_compositor_predict_frame_reply predict_reply = {};
+	predict_reply.result = XRT_SUCCESS;
+	predict_reply.frame_id = 42;
+	fs.reply(predict_reply);
+
+	// Queued behind the predict reply, the stub must receive that one first.
+	struct ipc_instance_get_client_id_reply id_reply = {};
+	id_reply.result = XRT_SUCCESS;
+	id_reply.client_id = 3;
+	fs.reply(id_reply);
+
+	uint32_t client_id = 0;
+	CHECK(ipc_call_instance_get_client_id(&fs.ipc_c, &client_id) == XRT_SUCCESS);
+	CHECK(client_id == 3);
+	CHECK(fs.receive_cmd() == IPC_INSTANCE_GET_CLIENT_ID);
+	CHECK(token.pending.done);
+
+	// Already received, doesn't touch the socket.
+	int64_t frame_id = 0;
+	uint64_t wake_up_time = 0;
+	uint64_t predicted_display_time = 0;
+	uint64_t predicted_display_period = 0;
+	CHECK(ipc_call_compositor_predict_frame_end(&fs.ipc_c, &token, &frame_id, &wake_up_time,
+	                                            &predicted_display_time, &predicted_display_period) == XRT_SUCCESS);
+	CHECK(frame_id == 42);
+	CHECK(fs.ipc_c.pending.first == NULL);
+}